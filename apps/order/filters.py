@@ -0,0 +1,61 @@
+import datetime
+
+from django.utils import timezone
+from django_filters import rest_framework as filters
+
+from core.constants import OrderStatus
+from core.filters import FilterSet, LabelMultipleChoiceFilter
+from apps.order.models import Order
+
+
+class OrderFilterSet(FilterSet):
+    """
+    Employee order filters, every filter composes with the others.
+    Old month, three_months and half_year params are creation windows
+    ending now
+    """
+
+    legacy_windows = {
+        'month': 30,
+        'three_months': 90,
+        'half_year': 182,
+    }
+
+    status = LabelMultipleChoiceFilter(choices=OrderStatus.choices)
+    accepted_orders = filters.CharFilter(method='filter_accepted_orders')
+    created_after = filters.DateTimeFilter(field_name='creation_datetime', lookup_expr='gte')
+    created_before = filters.DateTimeFilter(field_name='creation_datetime', lookup_expr='lt')
+    received_date = filters.DateFromToRangeFilter()
+    shop_branch = filters.NumberFilter(method='filter_shop_branch')
+    month = filters.CharFilter(method='filter_window')
+    three_months = filters.CharFilter(method='filter_window')
+    half_year = filters.CharFilter(method='filter_window')
+
+    class Meta:
+        model = Order
+        fields = [
+            'client__phone',
+            'courier__phone',
+            'courier__username',
+            'creation_datetime',
+            'sender_name',
+            'sender_phone_number',
+        ]
+
+    @staticmethod
+    def filter_accepted_orders(queryset, name, value):
+        """Exclude comma separated status labels"""
+
+        labels = value.split(',')
+        statuses = [status for status in OrderStatus if status.label in labels]
+        return queryset.exclude(status__in=statuses) if statuses else queryset
+
+    @staticmethod
+    def filter_shop_branch(queryset, name, value):
+        """Orders with products of shop branch florists, as in dispatch queue"""
+
+        return queryset.of_shop_branch(value)
+
+    def filter_window(self, queryset, name, value):
+        created_after = timezone.now() - datetime.timedelta(days=self.legacy_windows[name])
+        return queryset.filter(creation_datetime__gte=created_after)
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_cart_total_price(apps, schema_editor):
+    Cart = apps.get_model('order', 'Cart')
+    CartProduct = apps.get_model('order', 'CartProduct')
+    cart_product_total = CartProduct.objects.filter(cart=OuterRef('pk')) \
+        .values('cart').annotate(total=Sum('price')).values('total')
+    Cart.objects.update(
+        total_price=Coalesce(
+            Subquery(cart_product_total),
+            Value(0),
+            output_field=models.DecimalField(max_digits=9, decimal_places=1),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0005_auto_20220312_0240'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='total_price',
+            field=models.DecimalField(decimal_places=1, default=0, max_digits=9),
+        ),
+        migrations.RunPython(fill_cart_total_price, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.4 on 2026-10-18 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0006_cart_total_price'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['creation_datetime', 'id'], name='order_creation_datetime_id_idx'),
+        ),
+    ]
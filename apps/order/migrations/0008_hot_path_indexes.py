@@ -0,0 +1,29 @@
+# Generated by Django 3.2.4 on 2026-10-18 11:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0007_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['client', 'is_ordered'], name='cart_client_ordered_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cartproduct',
+            index=models.Index(fields=['cart', 'product'], name='cart_product_cart_product_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'creation_datetime', 'id'], name='order_status_creation_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['courier', 'status'], name='order_courier_status_idx'),
+        ),
+    ]
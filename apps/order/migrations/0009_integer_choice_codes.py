@@ -0,0 +1,59 @@
+from django.db import migrations, models
+
+
+ORDER_STATUS = {
+    1: 'На рассмотрении',
+    2: 'В ожидании курьера',
+    3: 'Курьер принял заказ',
+    4: 'Курьер едет к нам',
+    5: 'Заказ у курьера',
+    6: 'Ваш заказ в пути',
+    7: 'Доставлено',
+    8: 'Отменен',
+}
+
+
+def labels_to_codes(apps, schema_editor):
+    Order = apps.get_model('order', 'Order')
+    for code, label in ORDER_STATUS.items():
+        Order.objects.filter(status=label).update(status_code=code)
+
+
+def codes_to_labels(apps, schema_editor):
+    Order = apps.get_model('order', 'Order')
+    for code, label in ORDER_STATUS.items():
+        Order.objects.filter(status_code=code).update(status=label)
+    if schema_editor.connection.vendor == 'postgresql':
+        # Fire deferred FK checks now, the column is dropped in the same transaction
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0012_integer_choices'),
+        ('order', '0008_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_status_creation_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_courier_status_idx',
+        ),
+        # Default lets reverse migration re-add the label column on filled table
+        migrations.AlterField(
+            model_name='order',
+            name='status',
+            field=models.CharField(choices=[(label, label) for label in ORDER_STATUS.values()], default='На рассмотрении', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='status_code',
+            field=models.SmallIntegerField(null=True),
+        ),
+        migrations.RunPython(labels_to_codes, codes_to_labels),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0009_integer_choice_codes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='order',
+            name='status',
+        ),
+        migrations.RenameField(
+            model_name='order',
+            old_name='status_code',
+            new_name='status',
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='status',
+            field=models.SmallIntegerField(choices=[(1, 'На рассмотрении'), (2, 'В ожидании курьера'), (3, 'Курьер принял заказ'), (4, 'Курьер едет к нам'), (5, 'Заказ у курьера'), (6, 'Ваш заказ в пути'), (7, 'Доставлено'), (8, 'Отменен')]),
+        ),
+        migrations.AlterField(
+            model_name='cartproduct',
+            name='product',
+            field=models.ForeignKey(limit_choices_to={'status': 1}, on_delete=django.db.models.deletion.CASCADE, to='product.product'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'creation_datetime', 'id'], name='order_status_creation_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['courier', 'status'], name='order_courier_status_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.4 on 2026-10-18 12:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0010_integer_choices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='update_datetime',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='update_datetime',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
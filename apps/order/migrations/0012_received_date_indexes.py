@@ -0,0 +1,21 @@
+# Generated by Django 3.2.4 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0011_update_datetime'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['received_date', 'received_time', 'id'], name='order_received_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'received_date', 'received_time', 'id'], name='order_status_received_idx'),
+        ),
+    ]
@@ -1,5 +1,11 @@
-from django.db import models
-
+from django.db import models, transaction
+from django.db.models import Exists, F, Sum, OuterRef, Prefetch, Subquery, Value, DecimalField, ExpressionWrapper
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.constants import OrderStatus, ProductStatus
 from apps.users.models import User
 from apps.product.models import (
     Product,
@@ -7,6 +13,53 @@ from apps.product.models import (
     ProductType
 )
 
+# Payout expressions relative to CartProduct
+FLORIST_PAYOUT = ExpressionWrapper(
+    F('product__price_without_allowance') * F('product__product_type__florist_allowance') / 100,
+    output_field=DecimalField(max_digits=9, decimal_places=2),
+)
+COURIER_PAYOUT = ExpressionWrapper(
+    F('product__price_without_allowance') * F('product__product_type__courier_allowance') / 100,
+    output_field=DecimalField(max_digits=9, decimal_places=2),
+)
+
+# Order belongs to shop branches of florists who made its products
+ORDER_SHOP_BRANCH = 'cart__cartproduct__product__florist__shop_branch'
+
+
+class CartQuerySet(models.QuerySet):
+    """Cart queryset"""
+
+    def with_calculated_total_price(self):
+        """Annotate carts with the sum of their cart product prices"""
+
+        return self.annotate(
+            calculated_total_price=Coalesce(
+                Sum('cartproduct__price'),
+                Value(0),
+                output_field=DecimalField(max_digits=9, decimal_places=1),
+            )
+        )
+
+    def refresh_total_price(self):
+        """Recalculate stored total_price from cart products with a single UPDATE"""
+
+        cart_product_total = CartProduct.objects.filter(cart=OuterRef('pk')) \
+            .values('cart').annotate(total=Sum('price')).values('total')
+        return self.update(
+            total_price=Coalesce(
+                Subquery(cart_product_total),
+                Value(0),
+                output_field=DecimalField(max_digits=9, decimal_places=1),
+            ),
+            update_datetime=timezone.now(),
+        )
+
+    def add_total_price(self, amount):
+        """Move stored total_price by amount with a single UPDATE"""
+
+        return self.update(total_price=F('total_price') + amount, update_datetime=timezone.now())
+
 
 class Cart(models.Model):
     """Cart model"""
@@ -14,50 +67,99 @@ class Cart(models.Model):
     client = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     is_ordered = models.BooleanField(default=False)
     creation_datetime = models.DateTimeField(auto_now_add=True)
+    update_datetime = models.DateTimeField(auto_now=True)
+    total_price = models.DecimalField(max_digits=9, decimal_places=1, default=0)
+
+    objects = CartQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['client', 'is_ordered'], name='cart_client_ordered_idx'),
+        ]
 
     def __str__(self):
         return f'{self.client}'
 
-    @property
-    def total_price(self):
-        cart_product = CartProduct.objects.filter(cart=self.pk)
-        total_price = 0
-        for a in cart_product:
-            total_price += a.price
-        return total_price
-
 
 class CartProduct(models.Model):
     """CartProduct model"""
 
-    product = models.ForeignKey(Product, on_delete=models.CASCADE, limit_choices_to={'status': 'На продаже'})
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, limit_choices_to={'status': ProductStatus.ON_SALE})
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, limit_choices_to={'is_ordered': False})
     quantity = models.PositiveIntegerField(default=1)
     price = models.DecimalField(max_digits=9, decimal_places=1)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['cart', 'product'], name='cart_product_cart_product_idx'),
+        ]
+
     def __str__(self):
         return f'{self.product}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def save(self, *args, **kwargs):
+        """Save cart product and move the price difference into cart total_price"""
+
         self.price = self.product.price * self.quantity
-        super().save(*args, **kwargs)
+        adding = self._state.adding
+        loaded_values = getattr(self, '_loaded_values', {})
+        old_cart_id = loaded_values.get('cart_id')
+        old_price = loaded_values.get('price')
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                Cart.objects.filter(pk=self.cart_id).add_total_price(self.price)
+            elif old_cart_id is None or old_price is None:
+                Cart.objects.filter(pk__in=[old_cart_id, self.cart_id]).refresh_total_price()
+            elif old_cart_id == self.cart_id:
+                if self.price != old_price:
+                    Cart.objects.filter(pk=self.cart_id).add_total_price(self.price - old_price)
+            else:
+                Cart.objects.filter(pk=old_cart_id).add_total_price(-old_price)
+                Cart.objects.filter(pk=self.cart_id).add_total_price(self.price)
+        self._loaded_values = {'cart_id': self.cart_id, 'price': self.price}
+
+    @receiver(post_delete, sender='order.CartProduct')
+    def subtract_cart_total_price(sender, instance, **kwargs):
+        Cart.objects.filter(pk=instance.cart_id).add_total_price(-instance.price)
+
+
+class OrderQuerySet(models.QuerySet):
+    """Order queryset"""
+
+    def with_courier_payout(self):
+        """Annotate orders with courier payout read by Order.courier_percent"""
+
+        payout = CartProduct.objects.filter(cart=OuterRef('cart')) \
+            .values('cart').annotate(payout=Sum(COURIER_PAYOUT)).values('payout')
+        return self.annotate(courier_payout=Subquery(payout, output_field=DecimalField(max_digits=9, decimal_places=2)))
+
+    def of_shop_branch(self, shop_branch_id):
+        """Filter orders with products made by florists of shop branch"""
+
+        return self.filter(Exists(CartProduct.objects.filter(
+            cart=OuterRef('cart'), product__florist__shop_branch=shop_branch_id
+        )))
+
+    def with_products(self):
+        """Prefetch cart products read by Order.products"""
+
+        return self.prefetch_related(Prefetch(
+            'cart__cartproduct_set',
+            queryset=CartProduct.objects.select_related('product__product_type').order_by('id'),
+            to_attr='prefetched_cart_products',
+        ))
 
 
 class Order(models.Model):
     """Order model"""
 
-    order_status_choices = [
-        ('На рассмотрении', 'На рассмотрении'),
-        ('В ожидании курьера', 'В ожидании курьера'),
-        ('Курьер принял заказ', 'Курьер принял заказ'),
-        ('Курьер едет к нам', 'Курьер едет к нам'),
-        ('Заказ у курьера', 'Заказ у курьера'),
-        ('Ваш заказ в пути', 'Ваш заказ в пути'),
-        ('Доставлено', 'Доставлено'),
-        ('Отменен', 'Отменен'),
-
-    ]
-
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, limit_choices_to={'is_ordered': False})
     client = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='order_client')
     sender_name = models.CharField(max_length=255, null=True)
@@ -70,10 +172,24 @@ class Order(models.Model):
     money_change_status = models.BooleanField(default=False)
     client_money_value = models.DecimalField(max_digits=9, decimal_places=2, default=0)
     creation_datetime = models.DateTimeField(auto_now_add=True)
+    update_datetime = models.DateTimeField(auto_now=True)
     received_date = models.DateField()
     received_time = models.TimeField()
     courier = models.ForeignKey(User, on_delete=models.PROTECT, related_name='order_courier', null=True)
-    status = models.CharField(max_length=255, choices=order_status_choices)
+    status = models.SmallIntegerField(choices=OrderStatus.choices)
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['creation_datetime', 'id'], name='order_creation_datetime_id_idx'),
+            models.Index(fields=['status', 'creation_datetime', 'id'], name='order_status_creation_idx'),
+            models.Index(fields=['courier', 'status'], name='order_courier_status_idx'),
+            models.Index(fields=['received_date', 'received_time', 'id'], name='order_received_idx'),
+            models.Index(
+                fields=['status', 'received_date', 'received_time', 'id'], name='order_status_received_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.client}'
@@ -89,6 +205,19 @@ class Order(models.Model):
 
     @property
     def products(self):
+        cart_products = getattr(self.cart, 'prefetched_cart_products', None)
+        if cart_products is not None:
+            return [
+                {
+                    'product__id': cart_product.product.id,
+                    'product__name': cart_product.product.name,
+                    'product__product_type__title': cart_product.product.product_type.title,
+                    'product__product_type__courier_allowance': cart_product.product.product_type.courier_allowance,
+                    'product__price': cart_product.product.price,
+                    'product__price_without_allowance': cart_product.product.price_without_allowance,
+                }
+                for cart_product in cart_products
+            ]
         cart_product = CartProduct.objects.filter(cart=self.cart)
         return cart_product.values(
             'product__id',
@@ -101,10 +230,7 @@ class Order(models.Model):
 
     @property
     def courier_percent(self):
-        products = [products for products in self.products]
-        product_price = [key['product__price_without_allowance'] for key in products]
-        courier_allowance = [key['product__product_type__courier_allowance'] for key in products]
-        for courier_allowances in courier_allowance:
-            price = [product_prices for product_prices in product_price]
-            courier_percent = sum(price) / 100 * courier_allowances
-            return courier_percent
+        if hasattr(self, 'courier_payout'):
+            return self.courier_payout
+        return CartProduct.objects.filter(cart=self.cart_id) \
+            .aggregate(courier_percent=Sum(COURIER_PAYOUT))['courier_percent']
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 
+from core.fields import LabelChoiceField
 from apps.order.models import (
     Cart,
     CartProduct,
@@ -34,9 +35,41 @@ class CartProductSerializer(serializers.ModelSerializer):
         ]
 
 
+class CartProductItemSerializer(serializers.Serializer):
+    """One product line of bulk cart change, zero quantity removes product"""
+
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0)
+
+
+class CartProductBulkSerializer(serializers.Serializer):
+    """Bulk cart change serializer"""
+
+    cart = serializers.PrimaryKeyRelatedField(queryset=Cart.objects.filter(is_ordered=False))
+    items = CartProductItemSerializer(many=True, allow_empty=False)
+
+    def validate(self, attrs):
+        attrs['quantities'] = {item['product']: item['quantity'] for item in attrs['items']}
+        return attrs
+
+
+class DispatchQueueParamsSerializer(serializers.Serializer):
+    """Dispatch queue params serializer"""
+
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+
+class DispatchClaimSerializer(serializers.Serializer):
+    """Dispatch claim serializer, order is taken from queue when not given"""
+
+    order = serializers.IntegerField(required=False)
+
+
 class ClientOrderSerializer(serializers.ModelSerializer):
     """Order Serializer"""
 
+    serializer_choice_field = LabelChoiceField
+
     money_change_value = serializers.ReadOnlyField()
     products = serializers.ReadOnlyField()
     client = serializers.StringRelatedField()
@@ -90,4 +123,4 @@ class CourierHistorySerializer(serializers.Serializer):
 
     @staticmethod
     def get_total_earnings(obj):
-        return sum([obj['order'].courier_percent for obj['order'] in obj['order'].all()])
+        return obj['total_earnings'] or 0
@@ -0,0 +1,233 @@
+import datetime
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+from django.utils import timezone
+
+from core.constants import FlowerMovementType, OrderStatus, ProductStatus
+from core.streaming import EXPORT_CHUNK_SIZE, iter_chunks
+from apps.order.models import (
+    Cart,
+    CartProduct,
+    Order,
+    FLORIST_PAYOUT,
+    COURIER_PAYOUT,
+)
+from apps.product.cache import bump_catalogue_version
+from apps.product.models import Product
+from apps.product.services import move_product_flowers
+from apps.statistic.services import record_order_delivery
+from apps.users.models import EmployeeProfile
+
+ORDER_EXPORT_HEADER = (
+    'id', 'creation_datetime', 'status', 'client', 'courier', 'sender_name', 'sender_phone_number',
+    'receiver_name', 'receiver_phone_number', 'address', 'received_date', 'received_time', 'total_price',
+    'products',
+)
+
+
+class CheckoutError(Exception):
+    """Cart can not be ordered"""
+
+
+class CartError(Exception):
+    """Cart products can not be changed"""
+
+
+class DispatchError(Exception):
+    """Order can not be claimed by courier"""
+
+
+def update_cart_products(cart, quantities):
+    """
+    Add, update and remove cart products with bulk queries and move cart
+    total_price with one UPDATE
+    :param cart: Cart
+    :param quantities: dict, {product id: quantity}, zero quantity removes product
+    :return: Decimal, new cart total_price
+    """
+
+    with transaction.atomic():
+        total_price = Cart.objects.select_for_update().filter(pk=cart.pk, is_ordered=False) \
+            .values_list('total_price', flat=True).first()
+        if total_price is None:
+            raise CartError('Корзина уже оформлена')
+
+        product_ids = [product_id for product_id, quantity in quantities.items() if quantity]
+        products = Product.objects.filter(status=ProductStatus.ON_SALE).in_bulk(product_ids)
+        if len(products) != len(product_ids):
+            raise CartError('Некоторые товары уже недоступны')
+
+        cart_products = {}
+        to_delete = []
+        for cart_product in CartProduct.objects.filter(cart=cart, product__in=quantities).order_by('pk'):
+            if cart_product.product_id in cart_products:
+                to_delete.append(cart_product)
+            else:
+                cart_products[cart_product.product_id] = cart_product
+
+        to_create, to_update = [], []
+        price_difference = 0
+        for product_id, quantity in quantities.items():
+            cart_product = cart_products.get(product_id)
+            if not quantity:
+                if cart_product is not None:
+                    to_delete.append(cart_product)
+                continue
+            price = products[product_id].price * quantity
+            if cart_product is None:
+                to_create.append(CartProduct(cart_id=cart.pk, product_id=product_id, quantity=quantity, price=price))
+                price_difference += price
+            elif (cart_product.quantity, cart_product.price) != (quantity, price):
+                price_difference += price - cart_product.price
+                cart_product.quantity, cart_product.price = quantity, price
+                to_update.append(cart_product)
+
+        CartProduct.objects.bulk_create(to_create)
+        CartProduct.objects.bulk_update(to_update, ['quantity', 'price'])
+        if to_delete:
+            # post_delete receiver takes deleted prices out of cart total_price
+            CartProduct.objects.filter(pk__in=[cart_product.pk for cart_product in to_delete]).delete()
+        if price_difference:
+            Cart.objects.filter(pk=cart.pk).add_total_price(price_difference)
+        return total_price + price_difference - sum(cart_product.price for cart_product in to_delete)
+
+
+def checkout_cart(serializer, cart, **order_fields):
+    """
+    Order cart products in one transaction
+    :param serializer: ClientOrderSerializer with validated data
+    :param cart: Cart
+    :param order_fields: dict, extra Order fields passed to serializer.save()
+    :return: Order
+    """
+
+    with transaction.atomic():
+        cart = Cart.objects.select_for_update().get(pk=cart.pk)
+        if cart.is_ordered:
+            raise CheckoutError('Корзина уже оформлена')
+
+        product_ids = set(CartProduct.objects.filter(cart=cart).values_list('product_id', flat=True))
+        available_ids = list(
+            Product.objects.select_for_update()
+            .filter(pk__in=product_ids, status=ProductStatus.ON_SALE)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        if len(available_ids) != len(product_ids):
+            raise CheckoutError('Некоторые товары уже недоступны')
+
+        Product.objects.filter(pk__in=available_ids) \
+            .update(status=ProductStatus.IN_DELIVERY, update_datetime=timezone.now())
+        bump_catalogue_version()
+        Cart.objects.filter(pk=cart.pk).update(is_ordered=True, update_datetime=timezone.now())
+        return serializer.save(cart=cart, **order_fields)
+
+
+def settle_order(order):
+    """
+    Mark order products as sold, take their flowers out of stock
+    and pay florists and courier
+    :param order: Order
+    :return: dict, {user id: payout}
+    """
+
+    with transaction.atomic():
+        delivered = Order.objects.filter(pk=order.pk).exclude(status=OrderStatus.DELIVERED) \
+            .update(status=OrderStatus.DELIVERED, update_datetime=timezone.now())
+        if not delivered:
+            return {}
+
+        payouts = {}
+        florist_payouts = CartProduct.objects.filter(cart=order.cart_id) \
+            .values('product__florist') \
+            .annotate(florist_payout=Sum(FLORIST_PAYOUT),
+                      courier_payout=Sum(COURIER_PAYOUT))
+        courier_payout = 0
+        for row in florist_payouts:
+            florist_id = row['product__florist']
+            payouts[florist_id] = payouts.get(florist_id, 0) + (row['florist_payout'] or 0)
+            courier_payout += row['courier_payout'] or 0
+        if order.courier_id is not None:
+            payouts[order.courier_id] = payouts.get(order.courier_id, 0) + courier_payout
+
+        sale_datetime = datetime.datetime.now()
+        products = Product.objects.filter(cartproduct__cart=order.cart_id)
+        move_product_flowers(products, FlowerMovementType.CONSUME, f'order-{order.pk}')
+        products.update(status=ProductStatus.SOLD, sale_datetime=sale_datetime, update_datetime=sale_datetime)
+        bump_catalogue_version()
+        if payouts:
+            EmployeeProfile.objects.filter(user__in=payouts).update(
+                salary=F('salary') + Case(
+                    *[When(user=user_id, then=Value(payout)) for user_id, payout in payouts.items()],
+                    default=Value(0),
+                    output_field=DecimalField(max_digits=9, decimal_places=2),
+                )
+            )
+        record_order_delivery(order, sale_datetime.date())
+        return payouts
+
+
+def export_orders(queryset):
+    """
+    Order export rows read from database in chunks, product names of
+    every chunk are loaded with one query
+    :param queryset: Order queryset
+    :return: generator of row tuples
+    """
+
+    statuses = dict(OrderStatus.choices)
+    rows = queryset.order_by('pk').values_list(
+        'id', 'creation_datetime', 'status', 'client__phone', 'courier__phone', 'sender_name',
+        'sender_phone_number', 'receiver_name', 'receiver_phone_number', 'address', 'received_date',
+        'received_time', 'total_price', 'cart',
+    )
+    for chunk in iter_chunks(rows.iterator(chunk_size=EXPORT_CHUNK_SIZE), EXPORT_CHUNK_SIZE):
+        products = {}
+        cart_products = CartProduct.objects.filter(cart__in={row[-1] for row in chunk}) \
+            .order_by('pk').values_list('cart', 'product__name')
+        for cart_id, name in cart_products:
+            products.setdefault(cart_id, []).append(name)
+        for row in chunk:
+            yield (
+                row[0], row[1].isoformat(), statuses.get(row[2]), *row[3:-1], '; '.join(products.get(row[-1], ())),
+            )
+
+
+def get_dispatch_queue(shop_branch_id):
+    """
+    Unclaimed orders in delivery order, served by order_courier_status_idx.
+    Order belongs to shop branch of florists who made its products
+    :param shop_branch_id: int or None for courier without shop branch
+    :return: Order queryset
+    """
+
+    queryset = Order.objects.filter(status=OrderStatus.WAITING_FOR_COURIER, courier__isnull=True)
+    if shop_branch_id is not None:
+        queryset = queryset.of_shop_branch(shop_branch_id)
+    return queryset.order_by('received_date', 'received_time', 'id')
+
+
+def claim_order(courier, order_id=None):
+    """
+    Assign given order or the first one of dispatch queue to courier.
+    Orders locked by claims of other couriers are skipped instead of waited for
+    :param courier: User
+    :param order_id: int or None to claim next order in queue
+    :return: Order
+    """
+
+    queue = get_dispatch_queue(courier.shop_branch_id)
+    if order_id is not None:
+        queue = queue.filter(pk=order_id)
+    with transaction.atomic():
+        order = queue.select_for_update(skip_locked=True).first()
+        if order is None:
+            raise DispatchError('Заказ уже принят другим курьером' if order_id else 'Нет свободных заказов')
+        # Condition keeps claim safe where backend ignores row locks
+        claimed = Order.objects.filter(pk=order.pk, status=OrderStatus.WAITING_FOR_COURIER, courier__isnull=True) \
+            .update(courier=courier.pk, status=OrderStatus.COURIER_ACCEPTED, update_datetime=timezone.now())
+        if not claimed:
+            raise DispatchError('Заказ уже принят другим курьером')
+    order.courier_id, order.status = courier.pk, OrderStatus.COURIER_ACCEPTED
+    return order
@@ -0,0 +1,83 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from core.constants import ProductSize
+from apps.order.models import Cart, CartProduct
+from apps.product.models import Product
+from apps.product.tests.factory import ProductTypeFactory
+from apps.users.tests.factory import UserFactory
+
+
+class CartTotalPriceTests(TestCase):
+    """Test stored cart total price"""
+
+    def setUp(self):
+        self.florist = UserFactory()
+        self.product_type = ProductTypeFactory()
+        self.first_product = Product.objects.create(
+            name='Розы', description='Розы', product_type=self.product_type,
+            price=100, size=ProductSize.SMALL, florist=self.florist,
+        )
+        self.second_product = Product.objects.create(
+            name='Тюльпаны', description='Тюльпаны', product_type=self.product_type,
+            price=250, size=ProductSize.MEDIUM, florist=self.florist,
+        )
+        self.cart = Cart.objects.create()
+
+    def test_total_price_follows_cart_products(self):
+        """
+        Test cart total price is updated on cart product create, update and delete
+        :return: None
+        """
+
+        first = CartProduct.objects.create(cart=self.cart, product=self.first_product, quantity=2)
+        CartProduct.objects.create(cart=self.cart, product=self.second_product)
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.total_price, Decimal('450'))
+
+        first = CartProduct.objects.get(pk=first.pk)
+        first.quantity = 1
+        first.save()
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.total_price, Decimal('350'))
+
+        first.delete()
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.total_price, Decimal('250'))
+
+        CartProduct.objects.filter(cart=self.cart).delete()
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.total_price, Decimal('0'))
+
+    def test_total_price_moves_between_carts(self):
+        """
+        Test cart product moved to another cart changes both totals
+        :return: None
+        """
+
+        other_cart = Cart.objects.create()
+        cart_product = CartProduct.objects.create(cart=self.cart, product=self.first_product)
+        cart_product = CartProduct.objects.get(pk=cart_product.pk)
+        cart_product.cart = other_cart
+        cart_product.save()
+
+        self.cart.refresh_from_db()
+        other_cart.refresh_from_db()
+        self.assertEqual(self.cart.total_price, Decimal('0'))
+        self.assertEqual(other_cart.total_price, Decimal('100'))
+
+    def test_stored_total_price_matches_annotation(self):
+        """
+        Test stored total price matches calculated annotation and refresh
+        :return: None
+        """
+
+        CartProduct.objects.create(cart=self.cart, product=self.first_product, quantity=3)
+        CartProduct.objects.create(cart=self.cart, product=self.second_product)
+        Cart.objects.filter(pk=self.cart.pk).update(total_price=0)
+        Cart.objects.filter(pk=self.cart.pk).refresh_total_price()
+
+        cart = Cart.objects.with_calculated_total_price().get(pk=self.cart.pk)
+        self.assertEqual(cart.total_price, Decimal('550'))
+        self.assertEqual(cart.calculated_total_price, cart.total_price)
@@ -0,0 +1,230 @@
+import datetime
+import unittest
+
+from django.db import connection
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+
+from core.constants import OrderStatus, ProductFreshness, ProductSize, ProductStatus, UserType
+from core.pagination import KeysetPagination
+from apps.order.filters import OrderFilterSet
+from apps.order.services import get_dispatch_queue
+from apps.order.models import Cart, CartProduct, Order
+from apps.product.models import Product
+from apps.product.tests.factory import ProductTypeFactory
+from apps.users.models import ShopBranch
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Query plans are checked on PostgreSQL')
+class HotPathQueryPlanTests(TestCase):
+    """Test hot path queries are served by indexes"""
+
+    rows = 20000
+
+    @classmethod
+    def setUpTestData(cls):
+        user_model = get_user_model()
+        cls.shop_branch, other_branch = ShopBranch.objects.bulk_create([
+            ShopBranch(
+                title=title, address=title, contacts='0555555555', working_schedule='пн-пт с 9.00-22.00',
+            )
+            for title in ('Юнусалиева 123', 'Киевская 45')
+        ])
+        florists = user_model.objects.bulk_create([
+            user_model(username=f'florist{i}', phone=f'0555001{i:03}', user_type=UserType.FLORIST)
+            for i in range(20)
+        ])
+        couriers = user_model.objects.bulk_create([
+            user_model(
+                username=f'courier{i}', phone=f'0555002{i:03}', user_type=UserType.COURIER,
+                shop_branch=cls.shop_branch if i % 2 else other_branch,
+            )
+            for i in range(20)
+        ])
+        clients = user_model.objects.bulk_create([
+            user_model(username=f'client{i}', phone=f'0555003{i:03}') for i in range(500)
+        ])
+        cls.florist, cls.courier, cls.client_user = florists[0], couriers[1], clients[0]
+        product_type = ProductTypeFactory()
+
+        # Shop history of a few years, most products are sold and most
+        # orders are delivered, only recent ones are still open
+        open_rows = cls.rows // 50
+        products = Product.objects.bulk_create([
+            Product(
+                name=f'Букет {i}', description='Букет', size=ProductSize.SMALL, product_type=product_type,
+                florist=florists[i % len(florists)],
+                status=ProductStatus.ON_SALE if i >= cls.rows - open_rows else
+                ProductStatus.DELETED if i % 10 == 0 else ProductStatus.SOLD,
+                freshness=ProductFreshness.BLOOMING if i >= cls.rows - open_rows * 2 else ProductFreshness.WILTED,
+            )
+            for i in range(cls.rows)
+        ])
+        carts = Cart.objects.bulk_create([
+            Cart(client=clients[i % len(clients)], is_ordered=i < cls.rows - len(clients))
+            for i in range(cls.rows)
+        ])
+        CartProduct.objects.bulk_create([
+            CartProduct(cart=cart, product=product, price=0) for cart, product in zip(carts, products)
+        ])
+        closed_statuses = (OrderStatus.DELIVERED, OrderStatus.CANCELED)
+        open_statuses = [status for status in OrderStatus if status not in closed_statuses]
+        unclaimed_statuses = (OrderStatus.UNDER_REVIEW, OrderStatus.WAITING_FOR_COURIER, OrderStatus.CANCELED)
+        orders = []
+        for i, cart in enumerate(carts):
+            if i >= cls.rows - open_rows:
+                order_status = open_statuses[i % len(open_statuses)]
+            else:
+                order_status = OrderStatus.CANCELED if i % 20 == 0 else OrderStatus.DELIVERED
+            orders.append(Order(
+                cart=cart, client=cart.client, address='Юнусалиева 123', total_price=0,
+                received_date=datetime.date.today(), received_time=datetime.time(12, 0),
+                courier=None if order_status in unclaimed_statuses else couriers[i % len(couriers)],
+                status=order_status,
+            ))
+        orders = Order.objects.bulk_create(orders)
+        with connection.cursor() as cursor:
+            # One product and one order an hour, received the next day
+            cursor.execute(
+                'UPDATE product_product SET creation_date = now() - (%s - id) * interval \'1 hour\', '
+                'wilts_at = now() - (%s - id) * interval \'1 hour\' + interval \'5 days\'',
+                [products[-1].pk, products[-1].pk],
+            )
+            cursor.execute(
+                'UPDATE product_product SET sale_datetime = creation_date + interval \'1 day\' WHERE status = %s',
+                [ProductStatus.SOLD],
+            )
+            cursor.execute(
+                'UPDATE order_order SET creation_datetime = now() - (%s - id) * interval \'1 hour\', '
+                'received_date = (now() - (%s - id) * interval \'1 hour\' + interval \'1 day\')::date',
+                [orders[-1].pk, orders[-1].pk],
+            )
+            cursor.execute('ANALYZE')
+
+    def assertIndexScan(self, queryset, index):
+        plan = queryset.explain()
+        table = queryset.model._meta.db_table
+        self.assertNotIn(f'Seq Scan on {table}', plan, plan)
+        self.assertIn(index, plan, plan)
+
+    def test_product_queries_use_indexes(self):
+        """
+        Test product view, history and statistic queries use their indexes
+        :return: None
+        """
+
+        week_ago = datetime.datetime.now() - datetime.timedelta(days=7)
+        querysets = [
+            (
+                Product.objects.filter(status=ProductStatus.ON_SALE).order_by('-creation_date', '-id')[:20],
+                'product_on_sale_idx',
+            ),
+            (
+                Product.objects.filter(florist=self.florist).order_by('-creation_date', '-id')[:20],
+                'product_creation_date_id_idx',
+            ),
+            (Product.objects.filter(florist=self.florist, status=ProductStatus.SOLD), 'product_florist_status_idx'),
+            (Product.objects.filter(status=ProductStatus.SOLD, sale_datetime__gte=week_ago), 'product_sold_idx'),
+            (
+                Product.objects.filter(status=ProductStatus.ON_SALE, freshness=ProductFreshness.BLOOMING)
+                .order_by('-creation_date', '-id')[:20],
+                'product_on_sale_freshness_idx',
+            ),
+            (
+                Product.objects.filter(freshness=ProductFreshness.BLOOMING, wilts_at__lte=datetime.datetime.now()),
+                'product_blooming_wilts_at_idx',
+            ),
+        ]
+        for queryset, index in querysets:
+            with self.subTest(query=str(queryset.query)):
+                self.assertIndexScan(queryset, index)
+
+    def test_deep_keyset_page_uses_index_range(self):
+        """
+        Test deep product list page starts index scan at cursor position
+        :return: None
+        """
+
+        ordering = ('-creation_date', '-id')
+        last_seen = Product.objects.order_by(*ordering)[self.rows - 100]
+        position = [last_seen.creation_date, last_seen.id]
+        queryset = Product.objects.order_by(*ordering) \
+            .filter(KeysetPagination.get_keyset_filter(ordering, position))[:21]
+
+        plan = queryset.explain()
+        self.assertIn('product_creation_date_id_idx', plan, plan)
+        self.assertRegex(plan, r'Index Cond: \(creation_date <= ', plan)
+        self.assertEqual(len(queryset), 21)
+
+    def test_order_queries_use_indexes(self):
+        """
+        Test order, cart and cart product queries use their indexes
+        :return: None
+        """
+
+        month_ago = datetime.datetime.now() - datetime.timedelta(days=30)
+        cart = Cart.objects.first()
+        querysets = [
+            (
+                Order.objects.filter(status=OrderStatus.WAITING_FOR_COURIER)
+                .order_by('-creation_datetime', '-id')[:20],
+                'order_status_creation_idx',
+            ),
+            (
+                Order.objects.filter(courier=self.courier, status=OrderStatus.COURIER_ACCEPTED),
+                'order_courier_status_idx',
+            ),
+            (Order.objects.filter(courier=self.courier), 'order_order_courier_id'),
+            (
+                Order.objects.filter(creation_datetime__gte=month_ago).order_by('-creation_datetime', '-id')[:20],
+                'order_creation_datetime_id_idx',
+            ),
+            (
+                Order.objects.filter(client=self.client_user).order_by('-creation_datetime', '-id')[:20],
+                'order_order_client_id',
+            ),
+            (Cart.objects.filter(client=self.client_user, is_ordered=False), 'cart_client_ordered_idx'),
+            (CartProduct.objects.filter(cart=cart), 'cart_product_cart_product_idx'),
+        ]
+        for queryset, index in querysets:
+            with self.subTest(query=str(queryset.query)):
+                self.assertIndexScan(queryset, index)
+
+    def test_order_filters_use_indexes(self):
+        """
+        Test employee order filter combinations use the index of their
+        most selective filter
+        :return: None
+        """
+
+        today = datetime.date.today()
+        week_ago = (today - datetime.timedelta(days=7)).isoformat()
+        tomorrow = (today + datetime.timedelta(days=1)).isoformat()
+        received_today = {'received_date_after': today.isoformat()}
+        filters = [
+            ({'created_after': week_ago}, 'order_creation_datetime_id_idx'),
+            ({'created_after': week_ago, 'created_before': tomorrow}, 'order_creation_datetime_id_idx'),
+            ({'status': ['На рассмотрении']}, 'order_status_creation_idx'),
+            ({'status': ['На рассмотрении', 'Отменен']}, 'order_creation_datetime_id_idx'),
+            ({'status': ['На рассмотрении', 'Отменен'], 'created_after': week_ago}, 'order_status_creation_idx'),
+            ({**received_today, 'received_date_before': tomorrow}, 'order_received_idx'),
+            ({**received_today, 'status': ['В ожидании курьера']}, 'order_status_received_idx'),
+            ({'accepted_orders': 'Доставлено,Отменен', 'month': 'True'}, 'order_creation_datetime_id_idx'),
+            ({'shop_branch': self.shop_branch.pk, 'status': ['Доставлено']}, 'order_creation_datetime_id_idx'),
+            ({'shop_branch': self.shop_branch.pk, 'created_after': week_ago}, 'order_creation_datetime_id_idx'),
+        ]
+        for params, index in filters:
+            queryset = OrderFilterSet(params, queryset=Order.objects.all()).qs
+            with self.subTest(params=params):
+                self.assertIndexScan(queryset.order_by('-creation_datetime', '-id')[:20], index)
+
+    def test_dispatch_queue_uses_index(self):
+        """
+        Test dispatch queue reads unclaimed orders from courier and status index
+        :return: None
+        """
+
+        for shop_branch_id in (None, self.shop_branch.pk):
+            queryset = get_dispatch_queue(shop_branch_id)[:10]
+            with self.subTest(shop_branch=shop_branch_id):
+                self.assertIndexScan(queryset, 'order_courier_status_idx')
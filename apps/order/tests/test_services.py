@@ -0,0 +1,273 @@
+import datetime
+import threading
+import unittest
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from core.constants import OrderStatus, ProductSize, ProductStatus, UserType
+from apps.order.models import Cart, CartProduct, Order
+from apps.order.serializers import ClientOrderSerializer
+from apps.order.services import CheckoutError, DispatchError, checkout_cart, claim_order, settle_order
+from apps.product.cache import get_catalogue_version
+from apps.product.models import Product
+from apps.product.tests.factory import ProductTypeFactory
+from apps.users.models import EmployeeProfile
+from apps.users.tests.factory import ShopBranchFactory, UserFactory
+
+
+def create_product(florist, name='Букет'):
+    return Product.objects.create(
+        name=name, description=name, product_type=ProductTypeFactory(),
+        price=100, price_without_allowance=100, size=ProductSize.SMALL, florist=florist,
+    )
+
+
+def order_data(cart):
+    return {
+        'cart': cart.pk,
+        'address': 'Юнусалиева 123',
+        'received_date': datetime.date.today(),
+        'received_time': datetime.time(12, 0),
+    }
+
+
+class CheckoutTests(TestCase):
+    """Test cart checkout"""
+
+    def setUp(self):
+        self.florist = UserFactory()
+        self.products = [create_product(self.florist, f'Букет {i}') for i in range(5)]
+        self.cart = Cart.objects.create()
+        for product in self.products:
+            CartProduct.objects.create(cart=self.cart, product=product)
+
+    def test_checkout_updates_products_in_constant_queries(self):
+        """
+        Test checkout flips product statuses and creates order with constant query count
+        :return: None
+        """
+
+        serializer = ClientOrderSerializer(data=order_data(self.cart))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with self.assertNumQueries(8):
+            order = checkout_cart(serializer, self.cart, status=OrderStatus.UNDER_REVIEW)
+
+        self.assertEqual(order.total_price, 500)
+        self.assertTrue(Cart.objects.get(pk=self.cart.pk).is_ordered)
+        self.assertEqual(
+            Product.objects.filter(status=ProductStatus.IN_DELIVERY).count(), len(self.products)
+        )
+
+    def test_checkout_rejects_unavailable_products(self):
+        """
+        Test checkout fails without changes when a product is not on sale
+        :return: None
+        """
+
+        Product.objects.filter(pk=self.products[0].pk).update(status=ProductStatus.SOLD)
+        serializer = ClientOrderSerializer(data=order_data(self.cart))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with self.assertRaises(CheckoutError):
+            checkout_cart(serializer, self.cart, status=OrderStatus.UNDER_REVIEW)
+
+        self.assertFalse(Cart.objects.get(pk=self.cart.pk).is_ordered)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Product.objects.filter(status=ProductStatus.ON_SALE).count(), len(self.products) - 1)
+
+
+class SettleOrderTests(TestCase):
+    """Test delivered order settlement"""
+
+    def setUp(self):
+        self.florists = UserFactory.create_batch(2)
+        self.courier = UserFactory(user_type=UserType.COURIER)
+
+    def create_order(self, products_quantity):
+        cart = Cart.objects.create()
+        for i in range(products_quantity):
+            product = create_product(self.florists[i % 2], f'Букет {i}')
+            CartProduct.objects.create(cart=cart, product=product)
+        return Order.objects.create(
+            cart=cart, address='Юнусалиева 123', received_date=datetime.date.today(),
+            received_time=datetime.time(12, 0), courier=self.courier, status=OrderStatus.COURIER_HAS_ORDER,
+        )
+
+    def test_settlement_pays_florists_and_courier_once(self):
+        """
+        Test settlement pays florist per product and courier once per order
+        :return: None
+        """
+
+        order = self.create_order(3)
+        settle_order(order)
+
+        salaries = dict(EmployeeProfile.objects.values_list('user', 'salary'))
+        self.assertEqual(salaries[self.florists[0].pk], 20)
+        self.assertEqual(salaries[self.florists[1].pk], 10)
+        self.assertEqual(salaries[self.courier.pk], 30)
+        self.assertEqual(Product.objects.filter(status=ProductStatus.SOLD, sale_datetime__isnull=False).count(), 3)
+
+        settle_order(Order.objects.get(pk=order.pk))
+        self.assertEqual(EmployeeProfile.objects.get(user=self.courier).salary, 30)
+
+    def test_settlement_bumps_catalogue_version(self):
+        """
+        Test sold products invalidate cached catalogue responses
+        :return: None
+        """
+
+        order = self.create_order(2)
+        version = get_catalogue_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            settle_order(order)
+
+        self.assertNotEqual(get_catalogue_version(), version)
+
+    def test_settlement_query_count_does_not_depend_on_order_size(self):
+        """
+        Test settlement query count is the same for small and large orders
+        :return: None
+        """
+
+        small_order = self.create_order(2)
+        large_order = self.create_order(20)
+
+        with self.assertNumQueries(11):
+            settle_order(small_order)
+        with self.assertNumQueries(11):
+            settle_order(large_order)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Row locking requires PostgreSQL')
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """Test parallel checkouts of one product"""
+
+    checkouts = 20
+
+    def test_only_one_checkout_claims_product(self):
+        """
+        Test parallel checkouts of carts with the same product create only one order
+        :return: None
+        """
+
+        product = create_product(UserFactory())
+        carts = []
+        for _ in range(self.checkouts):
+            cart = Cart.objects.create()
+            CartProduct.objects.create(cart=cart, product=product)
+            carts.append(cart)
+
+        barrier = threading.Barrier(self.checkouts)
+        results = []
+
+        def checkout(cart):
+            try:
+                serializer = ClientOrderSerializer(data=order_data(cart))
+                serializer.is_valid(raise_exception=True)
+                barrier.wait()
+                try:
+                    checkout_cart(serializer, cart, status=OrderStatus.UNDER_REVIEW)
+                    results.append(True)
+                except CheckoutError:
+                    results.append(False)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout, args=(cart,)) for cart in carts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(results.count(False), self.checkouts - 1)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(Cart.objects.filter(is_ordered=True).count(), 1)
+        product.refresh_from_db()
+        self.assertEqual(product.status, ProductStatus.IN_DELIVERY)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Row locking requires PostgreSQL')
+class ConcurrentDispatchTests(TransactionTestCase):
+    """Test parallel couriers claiming orders of one dispatch queue"""
+
+    couriers = 10
+    orders = 30
+
+    def setUp(self):
+        shop_branch = ShopBranchFactory()
+        florist = UserFactory(shop_branch=shop_branch)
+        self.courier_users = UserFactory.create_batch(
+            self.couriers, user_type=UserType.COURIER, shop_branch=shop_branch
+        )
+        for i in range(self.orders):
+            cart = Cart.objects.create()
+            CartProduct.objects.create(cart=cart, product=create_product(florist))
+            Order.objects.create(
+                cart=cart, address='Юнусалиева 123', status=OrderStatus.WAITING_FOR_COURIER,
+                received_date=datetime.date.today(), received_time=datetime.time(8 + i % 12, 0),
+            )
+
+    def run_couriers(self, claim):
+        barrier = threading.Barrier(self.couriers)
+        claims = []
+
+        def run(courier):
+            try:
+                barrier.wait()
+                claim(courier, claims)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(courier,)) for courier in self.courier_users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return claims
+
+    def test_parallel_claims_never_assign_twice(self):
+        """
+        Test couriers claiming next orders until queue is empty take every order exactly once
+        :return: None
+        """
+
+        def claim(courier, claims):
+            while True:
+                try:
+                    claims.append((claim_order(courier).pk, courier.pk))
+                except DispatchError:
+                    return
+
+        claims = self.run_couriers(claim)
+
+        self.assertEqual(len(claims), self.orders)
+        self.assertEqual(len({order_id for order_id, _ in claims}), self.orders)
+        self.assertEqual(
+            set(Order.objects.values_list('pk', 'courier')), set(claims)
+        )
+        self.assertFalse(Order.objects.filter(status=OrderStatus.WAITING_FOR_COURIER).exists())
+
+    def test_parallel_claims_of_one_order(self):
+        """
+        Test couriers claiming the same order give it to exactly one of them
+        :return: None
+        """
+
+        order_id = Order.objects.order_by('pk').values_list('pk', flat=True).first()
+
+        def claim(courier, claims):
+            try:
+                claim_order(courier, order_id)
+                claims.append(courier.pk)
+            except DispatchError:
+                pass
+
+        claims = self.run_couriers(claim)
+
+        self.assertEqual(len(claims), 1)
+        self.assertEqual(Order.objects.get(pk=order_id).courier_id, claims[0])
@@ -0,0 +1,447 @@
+import csv
+import datetime
+import io
+import zipfile
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core.constants import OrderStatus, ProductSize, ProductStatus, UserType
+from apps.order.models import Cart, CartProduct, Order
+from apps.product.models import Product
+from apps.product.tests.factory import ProductTypeFactory
+from apps.users.tests.factory import ClientFactory, ShopBranchFactory, UserFactory
+
+
+class CartViewTests(TestCase):
+    """Test cart views"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = ClientFactory()
+        florist = UserFactory()
+        product_type = ProductTypeFactory()
+        self.products = [
+            Product.objects.create(
+                name=f'Букет {i}', description='Букет', product_type=product_type,
+                price=100, size=ProductSize.SMALL, florist=florist,
+            )
+            for i in range(10)
+        ]
+        self.client.force_authenticate(self.user)
+
+    def test_cart_list_query_count_does_not_depend_on_cart_products(self):
+        """
+        Test cart list runs one list query regardless of cart products quantity
+        :return: None
+        """
+
+        cart = Cart.objects.create(client=self.user)
+        for product in self.products:
+            CartProduct.objects.create(cart=cart, product=product)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/cart/list/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['total_price'], 1000)
+
+    def test_cart_list_not_modified(self):
+        """
+        Test cart list returns 304 until cart products change
+        :return: None
+        """
+
+        cart = Cart.objects.create(client=self.user)
+        CartProduct.objects.create(cart=cart, product=self.products[0])
+        etag = self.client.get('/cart/list/')['ETag']
+
+        response = self.client.get('/cart/list/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        CartProduct.objects.create(cart=cart, product=self.products[1])
+        response = self.client.get('/cart/list/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['total_price'], 200)
+
+    def test_client_order_list_not_modified(self):
+        """
+        Test client order list returns 304 until orders change
+        :return: None
+        """
+
+        cart = Cart.objects.create(client=self.user)
+        order = Order.objects.create(
+            cart=cart, client=self.user, address='Юнусалиева 123', received_date=datetime.date.today(),
+            received_time=datetime.time(12, 0), status=OrderStatus.UNDER_REVIEW,
+        )
+        etag = self.client.get('/order/client/')['ETag']
+
+        response = self.client.get('/order/client/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        order.address = 'Киевская 1'
+        order.save()
+        response = self.client.get('/order/client/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class CartProductBulkTests(TestCase):
+    """Test bulk cart product changes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = ClientFactory()
+        florist = UserFactory()
+        product_type = ProductTypeFactory()
+        self.products = [
+            Product.objects.create(
+                name=f'Букет {i}', description='Букет', product_type=product_type,
+                price=100, size=ProductSize.SMALL, florist=florist,
+            )
+            for i in range(15)
+        ]
+        self.cart = Cart.objects.create(client=self.user)
+        self.client.force_authenticate(self.user)
+
+    def change_cart(self, items, cart=None):
+        return self.client.post('/cart/cart-product/bulk/', {
+            'cart': (cart or self.cart).pk,
+            'items': [{'product': product.pk, 'quantity': quantity} for product, quantity in items],
+        }, format='json')
+
+    def test_fill_cart_query_count(self):
+        """
+        Test filling cart with 15 products takes a fixed number of queries
+        :return: None
+        """
+
+        with self.assertNumQueries(9):
+            response = self.change_cart([(product, 1) for product in self.products])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_price'], 1500)
+        self.assertEqual(len(response.data['cart_products']), 15)
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.total_price, 1500)
+
+    def test_add_update_remove(self):
+        """
+        Test one request adds, updates and removes cart products
+        :return: None
+        """
+
+        self.change_cart([(self.products[0], 1), (self.products[1], 1)])
+        response = self.change_cart([(self.products[0], 3), (self.products[1], 0), (self.products[2], 2)])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_price'], 500)
+        self.assertEqual(
+            list(CartProduct.objects.filter(cart=self.cart).order_by('product').values_list('product', 'quantity')),
+            [(self.products[0].pk, 3), (self.products[2].pk, 2)],
+        )
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.total_price, 500)
+
+    def test_unavailable_product(self):
+        """
+        Test products not on sale reject the whole change
+        :return: None
+        """
+
+        Product.objects.filter(pk=self.products[1].pk).update(status=ProductStatus.SOLD)
+
+        response = self.change_cart([(self.products[0], 1), (self.products[1], 1)])
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(CartProduct.objects.exists())
+
+    def test_other_client_cart(self):
+        """
+        Test client can not change other client cart
+        :return: None
+        """
+
+        other = ClientFactory()
+        response = self.change_cart([(self.products[0], 1)], cart=Cart.objects.create(client=other))
+        self.assertEqual(response.status_code, 403)
+
+
+class OrderExportTests(TestCase):
+    """Test streaming order export"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = UserFactory(user_type=UserType.ADMIN)
+        self.florist = UserFactory()
+        self.product_type = ProductTypeFactory()
+        self.client.force_authenticate(self.admin)
+
+    def create_orders(self, quantity, order_status=OrderStatus.UNDER_REVIEW):
+        for i in range(quantity):
+            cart = Cart.objects.create()
+            for name in ('Розы', 'Тюльпаны'):
+                product = Product.objects.create(
+                    name=name, description='Букет', product_type=self.product_type,
+                    price=100, size=ProductSize.SMALL, florist=self.florist,
+                )
+                CartProduct.objects.create(cart=cart, product=product)
+            cart.refresh_from_db()
+            Order.objects.create(
+                cart=cart, address=f'Юнусалиева {i}', received_date=datetime.date.today(),
+                received_time=datetime.time(12, 0), status=order_status, sender_name='Айбек',
+            )
+
+    def export(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/order/employee/export/', params)
+            content = b''.join(response.streaming_content)
+        return response, content, len(queries)
+
+    def test_csv_export(self):
+        """
+        Test orders are streamed with their products and a fixed number of queries
+        :return: None
+        """
+
+        self.create_orders(2)
+        _, _, small_export_queries = self.export()
+        self.create_orders(30)
+
+        response, content, queries = self.export()
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(queries, small_export_queries)
+        rows = list(csv.reader(io.StringIO(content.decode('utf-8'))))
+        self.assertEqual(len(rows), 33)
+        row = dict(zip(rows[0], rows[1]))
+        self.assertEqual(row['status'], 'На рассмотрении')
+        self.assertEqual(row['products'], 'Розы; Тюльпаны')
+        self.assertEqual(row['total_price'], '200.0')
+
+    def test_export_filters(self):
+        """
+        Test export takes employee order filters
+        :return: None
+        """
+
+        self.create_orders(2)
+        self.create_orders(1, order_status=OrderStatus.DELIVERED)
+
+        _, content, _ = self.export(status='Доставлено')
+        self.assertEqual(len(content.decode('utf-8').splitlines()), 2)
+        _, content, _ = self.export(accepted_orders='Доставлено')
+        self.assertEqual(len(content.decode('utf-8').splitlines()), 3)
+
+    def test_xlsx_export(self):
+        """
+        Test orders are streamed as XLSX workbook
+        :return: None
+        """
+
+        self.create_orders(2)
+
+        response, content, _ = self.export(file_format='xlsx')
+
+        self.assertIn('attachment; filename="orders.xlsx"', response['Content-Disposition'])
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertIn('xl/workbook.xml', archive.namelist())
+            sheet = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertEqual(sheet.count('<row>'), 3)
+        self.assertIn('<t>Розы; Тюльпаны</t>', sheet)
+        self.assertIn('<v>200.0</v>', sheet)
+
+
+class EmployeeOrderFilterTests(TestCase):
+    """Test employee order filters compose"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = UserFactory(user_type=UserType.ADMIN)
+        self.shop_branch = ShopBranchFactory()
+        self.courier = UserFactory(user_type=UserType.COURIER, shop_branch=self.shop_branch)
+        self.florist = UserFactory(shop_branch=self.shop_branch)
+        self.product_type = ProductTypeFactory()
+        today = datetime.date.today()
+        self.orders = {
+            'new': self.create_order(OrderStatus.UNDER_REVIEW, today, days_ago=1),
+            'old': self.create_order(OrderStatus.UNDER_REVIEW, today - datetime.timedelta(days=60), days_ago=60),
+            'delivered': self.create_order(OrderStatus.DELIVERED, today, days_ago=2, florist=self.florist),
+            'canceled': self.create_order(
+                OrderStatus.CANCELED, today + datetime.timedelta(days=1), days_ago=3, courier=self.courier
+            ),
+        }
+        self.client.force_authenticate(self.admin)
+
+    def create_order(self, order_status, received_date, days_ago, courier=None, florist=None):
+        cart = Cart.objects.create()
+        if florist is not None:
+            product = Product.objects.create(
+                name='Букет', description='Букет', price=100, size=ProductSize.SMALL,
+                product_type=self.product_type, florist=florist,
+            )
+            CartProduct.objects.create(cart=cart, product=product)
+        order = Order.objects.create(
+            cart=cart, address='Юнусалиева 123', received_date=received_date,
+            received_time=datetime.time(12, 0), status=order_status, courier=courier,
+        )
+        creation_datetime = order.creation_datetime - datetime.timedelta(days=days_ago)
+        Order.objects.filter(pk=order.pk).update(creation_datetime=creation_datetime)
+        return order.pk
+
+    def get_orders(self, params):
+        response = self.client.get('/order/employee/', params)
+        self.assertEqual(response.status_code, 200)
+        return {name for name, pk in self.orders.items() if pk in {order['id'] for order in response.data['results']}}
+
+    def test_filters(self):
+        """
+        Test every order filter alone and combined with others
+        :return: None
+        """
+
+        today = datetime.date.today()
+        cases = [
+            ({'status': ['На рассмотрении', 'Отменен']}, {'new', 'old', 'canceled'}),
+            ({'accepted_orders': 'Доставлено,Отменен', 'month': 'True'}, {'new'}),
+            ({'created_after': (today - datetime.timedelta(days=10)).isoformat()}, {'new', 'delivered', 'canceled'}),
+            ({'created_before': (today - datetime.timedelta(days=10)).isoformat()}, {'old'}),
+            ({'received_date_after': today.isoformat(), 'received_date_before': today.isoformat()}, {'new', 'delivered'}),
+            ({'received_date_after': today.isoformat(), 'status': 'Отменен'}, {'canceled'}),
+            ({'shop_branch': self.shop_branch.pk, 'half_year': 'True'}, {'delivered'}),
+        ]
+        for params, expected in cases:
+            with self.subTest(params=params):
+                self.assertEqual(self.get_orders(params), expected)
+
+    def test_invalid_status(self):
+        """
+        Test unknown status label is rejected
+        :return: None
+        """
+
+        response = self.client.get('/order/employee/', {'status': 'Потерян'})
+        self.assertEqual(response.status_code, 400)
+
+
+class DispatchQueueTests(TestCase):
+    """Test courier dispatch queue offers and claims orders of courier shop branch"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.shop_branch = ShopBranchFactory()
+        self.other_shop_branch = ShopBranchFactory(title='Ахунбаева 1', address='Ахунбаева 1')
+        self.product_type = ProductTypeFactory()
+        self.florist = UserFactory(shop_branch=self.shop_branch)
+        self.other_florist = UserFactory(shop_branch=self.other_shop_branch)
+        self.courier = UserFactory(user_type=UserType.COURIER, shop_branch=self.shop_branch)
+        self.other_courier = UserFactory(user_type=UserType.COURIER, shop_branch=self.shop_branch)
+        today = datetime.date.today()
+        self.orders = {
+            'late': self.create_order(today, datetime.time(18, 0)),
+            'early': self.create_order(today, datetime.time(9, 0)),
+            'tomorrow': self.create_order(today + datetime.timedelta(days=1), datetime.time(8, 0)),
+            'other_branch': self.create_order(today, datetime.time(7, 0), florist=self.other_florist),
+            'claimed': self.create_order(today, datetime.time(7, 0), courier=self.other_courier),
+            'under_review': self.create_order(today, datetime.time(7, 0), order_status=OrderStatus.UNDER_REVIEW),
+        }
+        self.client.force_authenticate(self.courier)
+
+    def create_order(self, received_date, received_time, florist=None, courier=None,
+                     order_status=OrderStatus.WAITING_FOR_COURIER):
+        cart = Cart.objects.create()
+        product = Product.objects.create(
+            name='Букет', description='Букет', price=100, size=ProductSize.SMALL,
+            product_type=self.product_type, florist=florist or self.florist,
+        )
+        CartProduct.objects.create(cart=cart, product=product)
+        return Order.objects.create(
+            cart=cart, address='Юнусалиева 123', received_date=received_date,
+            received_time=received_time, status=order_status, courier=courier,
+        ).pk
+
+    def get_queue(self, **params):
+        response = self.client.get('/order/courier/dispatch/', params)
+        self.assertEqual(response.status_code, 200)
+        names = {pk: name for name, pk in self.orders.items()}
+        return [names[order['id']] for order in response.data]
+
+    def test_queue(self):
+        """
+        Test queue offers unclaimed orders of courier shop branch by received date and time
+        :return: None
+        """
+
+        self.assertEqual(self.get_queue(), ['early', 'late', 'tomorrow'])
+        self.assertEqual(self.get_queue(limit=2), ['early', 'late'])
+        response = self.client.get('/order/courier/dispatch/', {'limit': 0})
+        self.assertEqual(response.status_code, 400)
+
+    def test_queue_query_count(self):
+        """
+        Test queue runs a fixed number of queries whatever orders quantity
+        :return: None
+        """
+
+        with CaptureQueriesContext(connection) as few:
+            self.get_queue()
+        for _ in range(5):
+            self.orders[f'extra {_}'] = self.create_order(datetime.date.today(), datetime.time(20, 0))
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(len(self.get_queue()), 8)
+        self.assertEqual(len(few), len(many))
+
+    def test_claim(self):
+        """
+        Test courier claims next order in queue or given order once
+        :return: None
+        """
+
+        response = self.client.post('/order/courier/dispatch/', {}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], self.orders['early'])
+        self.assertEqual(response.data['status'], 'Курьер принял заказ')
+        self.assertEqual(Order.objects.get(pk=self.orders['early']).courier, self.courier)
+
+        response = self.client.post('/order/courier/dispatch/', {'order': self.orders['tomorrow']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_queue(), ['late'])
+
+        self.client.force_authenticate(self.other_courier)
+        for order in ('early', 'claimed', 'other_branch', 'under_review'):
+            with self.subTest(order=order):
+                response = self.client.post('/order/courier/dispatch/', {'order': self.orders[order]}, format='json')
+                self.assertEqual(response.status_code, 409)
+        self.assertEqual(Order.objects.get(pk=self.orders['early']).courier, self.courier)
+
+        self.assertEqual(self.client.post('/order/courier/dispatch/', {}, format='json').status_code, 200)
+        self.assertEqual(self.client.post('/order/courier/dispatch/', {}, format='json').status_code, 409)
+
+    def test_employee_order_update_claims_once(self):
+        """
+        Test courier taking order by employee order update can not take claimed order
+        :return: None
+        """
+
+        response = self.client.patch(
+            f"/order/employee/{self.orders['early']}/", {'status': 'Курьер принял заказ'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Order.objects.get(pk=self.orders['early']).courier, self.courier)
+
+        response = self.client.patch(
+            f"/order/employee/{self.orders['claimed']}/", {'status': 'Курьер принял заказ'}, format='json'
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Order.objects.get(pk=self.orders['claimed']).courier, self.other_courier)
+
+    def test_only_couriers(self):
+        """
+        Test queue is available only to couriers
+        :return: None
+        """
+
+        self.client.force_authenticate(self.florist)
+        self.assertEqual(self.client.get('/order/courier/dispatch/').status_code, 403)
+        self.assertEqual(self.client.post('/order/courier/dispatch/', {}, format='json').status_code, 403)
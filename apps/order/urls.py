@@ -5,10 +5,12 @@ from rest_framework.routers import DefaultRouter, SimpleRouter
 from apps.order.views import (
     CartView,
     CartProductView,
+    CartProductBulkView,
     ClientOrderView,
     EmployeeOrderView,
     CourierOrderView,
-    OrderStatisticView,
+    DispatchQueueView,
+    OrderExportView,
 )
 
 app_name = 'apps.order'
@@ -23,8 +25,10 @@ router2.register('order/employee', EmployeeOrderView)
 router2.register('order/courier', CourierOrderView)
 
 urlpatterns = [
+    path('cart/cart-product/bulk/', CartProductBulkView.as_view()),
+    path('order/employee/export/', OrderExportView.as_view()),
+    path('order/courier/dispatch/', DispatchQueueView.as_view()),
     path('cart/', include(router.urls)),
     path('', include(router2.urls)),
-    path('statistic/order/', OrderStatisticView.as_view(), name="order_statistic"),
 
 ]
@@ -1,36 +1,55 @@
-import datetime
-from django.db.models import Count
+from django.db import transaction
 
-from django.db.models.functions import TruncMonth, TruncWeek
-from django_filters.rest_framework import DjangoFilterBackend
 
-from rest_framework.generics import ListAPIView
+from rest_framework.generics import GenericAPIView
 from rest_framework.viewsets import ModelViewSet, GenericViewSet
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework import mixins, status
 
+from core.constants import OrderStatus, ProductStatus, UserType
+from core.filters import DjangoFilterBackend
+from core.mixins import ConditionalListMixin
+from core.pagination import KeysetPagination
+from core.streaming import STREAM_FORMATS, get_streaming_response
 from apps.users.permissions import (
     IsClient,
     IsCourier,
     IsAdmin,
     IsOrderClient,
 )
-from apps.users.models import EmployeeProfile
+from apps.order.filters import OrderFilterSet
 from apps.order.models import (
     Cart,
     CartProduct,
     Order,
 )
+from apps.order.services import (
+    ORDER_EXPORT_HEADER,
+    CartError,
+    CheckoutError,
+    DispatchError,
+    checkout_cart,
+    claim_order,
+    export_orders,
+    get_dispatch_queue,
+    settle_order,
+    update_cart_products,
+)
 from apps.order.serializers import (
     CartSerializer,
     CartProductSerializer,
+    CartProductBulkSerializer,
+    DispatchQueueParamsSerializer,
+    DispatchClaimSerializer,
     ClientOrderSerializer,
     AdminOrderSerializer,
     CourierOrderSerializer,
 )
+from apps.product.services import StockError
 
 
-class CartView(ModelViewSet):
+class CartView(ConditionalListMixin, ModelViewSet):
     """Cart view"""
 
     serializer_class = CartSerializer
@@ -70,12 +89,43 @@ class CartProductView(ModelViewSet):
             return self.queryset.filter(cart__is_ordered=False, cart__client=self.request.user)
 
 
-class ClientOrderView(ModelViewSet):
+class CartProductBulkView(APIView):
+    """
+    Bulk cart products view, sets quantities of many cart products
+    in one request and returns new cart total price
+    """
+
+    permission_classes = (IsClient,)
+
+    def post(self, request):
+        serializer = CartProductBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cart = serializer.validated_data['cart']
+        client_id = request.user.pk if request.user.is_authenticated else None
+        if cart.client_id != client_id:
+            return Response({'Вы используете корзину другого клиента'}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            total_price = update_cart_products(cart, serializer.validated_data['quantities'])
+        except CartError as error:
+            return Response({str(error)}, status=status.HTTP_409_CONFLICT)
+
+        cart_products = CartProduct.objects.filter(cart=cart).order_by('pk')
+        return Response({
+            'cart': cart.pk,
+            'total_price': total_price,
+            'cart_products': CartProductSerializer(cart_products, many=True).data,
+        })
+
+
+class ClientOrderView(ConditionalListMixin, ModelViewSet):
     """Client order View"""
 
     serializer_class = ClientOrderSerializer
     queryset = Order.objects.all()
     permission_classes = (IsOrderClient,)
+    pagination_class = KeysetPagination
+    ordering = ('-creation_datetime', '-id')
 
     def get_queryset(self):
         """Filter order by current client"""
@@ -87,29 +137,21 @@ class ClientOrderView(ModelViewSet):
             return self.queryset.filter(client=self.request.user)
 
     def create(self, request, *args, **kwargs):
+        """Order cart products in one transaction"""
+
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
             cart = serializer.validated_data['cart']
-            cart_product = CartProduct.objects.filter(cart=cart)
+            order_fields = {'status': OrderStatus.UNDER_REVIEW}
             if self.request.user.is_authenticated:
-                if cart.client == self.request.user:
-                    for cart_products in cart_product:
-                        cart_products.product.status = 'В процессе доставки'
-                        cart_products.product.save()
-                    cart.is_ordered = True
-                    cart.save()
-                    serializer.save(client=self.request.user, status='На рассмотрении')
-                    return Response(serializer.data)
-                elif cart.client != self.request.user:
+                if cart.client_id != self.request.user.pk:
                     return Response({'Вы используете корзину другого клиента'}, status=status.HTTP_403_FORBIDDEN)
-            else:
-                for cart_products in cart_product:
-                    cart_products.product.status = 'В процессе доставки'
-                    cart_products.product.save()
-                cart.is_ordered = True
-                cart.save()
-                serializer.save(status='На рассмотрении')
-                return Response(serializer.data)
+                order_fields['client'] = self.request.user
+            try:
+                checkout_cart(serializer, cart, **order_fields)
+            except CheckoutError as error:
+                return Response({str(error)}, status=status.HTTP_409_CONFLICT)
+            return Response(serializer.data)
         return Response(serializer.errors)
 
     def update(self, request, *args, **kwargs):
@@ -118,7 +160,7 @@ class ClientOrderView(ModelViewSet):
         serializer = self.serializer_class(instance, data=request.data, partial=partial)
         if serializer.is_valid():
             serializer.save()
-            if instance.status == 'На рассмотрении':
+            if instance.status == OrderStatus.UNDER_REVIEW:
                 instance.save()
                 return Response(serializer.data)
             return Response(serializer.errors)
@@ -132,62 +174,37 @@ class EmployeeOrderView(mixins.RetrieveModelMixin,
 
     def get_serializer_class(self):
         user = self.request.user
-        if user.user_type == 'courier':
+        if user.user_type == UserType.COURIER:
             return CourierOrderSerializer
-        elif user.user_type == 'admin':
+        elif user.user_type == UserType.ADMIN:
             return AdminOrderSerializer
 
     serializer_class = get_serializer_class
     queryset = Order.objects.all()
     permission_classes = (IsAdmin | IsCourier,)
+    pagination_class = KeysetPagination
+    ordering = ('-creation_datetime', '-id')
     filter_backends = [DjangoFilterBackend]
-    filter_fields = [
-        'status',
-        'client__phone',
-        'courier__phone',
-        'courier__username',
-        'creation_datetime',
-        'sender_name',
-        'sender_phone_number',
-    ]
+    filterset_class = OrderFilterSet
 
     def get_queryset(self):
         """Filter order queryset by current employee type"""
 
         user = self.request.user
 
-        if user.user_type == 'courier':
-            return self.queryset.filter(status='В ожидании курьера')
-        elif user.user_type == 'admin':
-            if self.request.query_params.get('accepted_orders'):
-                accepted_orders = self.request.query_params.get('accepted_orders').split(',')
-                if accepted_orders:
-                    queryset = self.queryset.exclude(status__in=accepted_orders)
-                    return queryset
-            elif self.request.query_params.get('half_year'):
-                period = self.request.query_params.get('half_year', 'True')
-                today = datetime.datetime.today()
-                new_end = today - datetime.timedelta(days=182)
-                if period is not None:
-                    return self.queryset.filter(creation_datetime__gte=new_end)
-            elif self.request.query_params.get('three_months'):
-                period = self.request.query_params.get('three_months', 'True')
-                today = datetime.datetime.today()
-                new_end = today - datetime.timedelta(days=90)
-                if period is not None:
-                    return self.queryset.filter(creation_datetime__gte=new_end)
-            elif self.request.query_params.get('month'):
-                period = self.request.query_params.get('month', 'True')
-                today = datetime.datetime.today()
-                new_end = today - datetime.timedelta(days=30)
-                if period is not None:
-                    return self.queryset.filter(creation_datetime__gte=new_end)
+        if user.user_type == UserType.COURIER:
+            return self.queryset.filter(status=OrderStatus.WAITING_FOR_COURIER)
+        elif user.user_type == UserType.ADMIN:
             return self.queryset.all()
 
     def perform_update(self, serializer):
-        """update courier field value only if request user is courier"""
+        """
+        Courier takes order with dispatch claim, so one order never gets
+        two couriers
+        """
 
-        if self.request.user.user_type == 'courier':
+        if self.request.user.user_type == UserType.COURIER:
+            claim_order(self.request.user, serializer.instance.pk)
             serializer.save(courier=self.request.user)
         else:
             serializer.save()
@@ -200,18 +217,71 @@ class EmployeeOrderView(mixins.RetrieveModelMixin,
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         if serializer.is_valid():
             order_status = serializer.validated_data['status']
-            self.perform_update(serializer)
-            if order_status == 'Отменен':
+            try:
+                with transaction.atomic():
+                    self.perform_update(serializer)
+            except DispatchError as error:
+                return Response({str(error)}, status=status.HTTP_409_CONFLICT)
+            if order_status == OrderStatus.CANCELED:
                 instance.cart.is_ordered = False
                 instance.cart.save()
                 cart_product = CartProduct.objects.filter(cart=instance.cart)
                 for cart_products in cart_product:
-                    cart_products.product.status = 'На продаже'
+                    cart_products.product.status = ProductStatus.ON_SALE
                     cart_products.product.save()
             return Response(serializer.data)
         return Response(serializer.errors)
 
 
+class DispatchQueueView(GenericAPIView):
+    """
+    Courier dispatch queue view. GET offers next unclaimed orders of courier
+    shop branch by received date and time, POST claims given order or the
+    next one in queue, so one order never gets two couriers
+    """
+
+    serializer_class = CourierOrderSerializer
+    permission_classes = (IsCourier,)
+
+    def get(self, request):
+        params = DispatchQueueParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        orders = get_dispatch_queue(request.user.shop_branch_id) \
+            .select_related('client', 'courier').with_courier_payout().with_products()
+        serializer = self.get_serializer(orders[:params.validated_data['limit']], many=True)
+        return Response(serializer.data)
+
+    def post(self, request):
+        serializer = DispatchClaimSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            order = claim_order(request.user, serializer.validated_data.get('order'))
+        except DispatchError as error:
+            return Response({str(error)}, status=status.HTTP_409_CONFLICT)
+
+        order = Order.objects.select_related('client', 'courier').with_courier_payout().with_products().get(pk=order.pk)
+        return Response(self.get_serializer(order).data)
+
+
+class OrderExportView(GenericAPIView):
+    """
+    Order export view for accounting, streams CSV, JSON lines or XLSX file
+    chosen by file_format param, orders are filtered by OrderFilterSet
+    """
+
+    queryset = Order.objects.all()
+    permission_classes = (IsAdmin,)
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = OrderFilterSet
+
+    def get(self, request):
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in STREAM_FORMATS:
+            return Response({'Поддерживаются только форматы csv, jsonl и xlsx'}, status=status.HTTP_400_BAD_REQUEST)
+        orders = self.filter_queryset(self.get_queryset())
+        return get_streaming_response(ORDER_EXPORT_HEADER, export_orders(orders), file_format, 'orders')
+
+
 class CourierOrderView(mixins.RetrieveModelMixin,
                        mixins.UpdateModelMixin,
                        mixins.ListModelMixin,
@@ -236,49 +306,12 @@ class CourierOrderView(mixins.RetrieveModelMixin,
         serializer = self.serializer_class(instance, data=request.data, partial=partial)
         if serializer.is_valid():
             order_status = serializer.validated_data['status']
-            serializer.save()
-            if order_status == 'Доставлено':
-                cart_product = CartProduct.objects.filter(cart=instance.cart)
-                for cart_products in cart_product:
-                    cart_products.product.status = 'Продан'
-                    cart_products.product.sale_datetime = datetime.datetime.now()
-                    cart_products.product.save()
-
-                    courier = EmployeeProfile.objects.filter(user=self.request.user)
-                    for i in courier:
-                        i.salary += instance.courier_percent
-                        i.save()
-                    florist = EmployeeProfile.objects.filter(user=cart_products.product.florist)
-                    for i in florist:
-                        i.salary += cart_products.product.florist_percent
-                        i.save()
-
+            try:
+                with transaction.atomic():
+                    if order_status == OrderStatus.DELIVERED:
+                        settle_order(instance)
+                    serializer.save()
+            except StockError as error:
+                return Response({str(error)}, status=status.HTTP_409_CONFLICT)
             return Response(serializer.data)
         return Response(serializer.errors)
-
-
-class OrderStatisticView(ListAPIView):
-    """Order statistic view"""
-
-    def list(self, request, *args, **kwargs):
-        month = self.request.query_params.get('month')
-        three_month = self.request.query_params.get('three_month')
-        half_year = self.request.query_params.get('half_year')
-        if month:
-            duration = datetime.datetime.today() - datetime.timedelta(days=30)
-            queryset = Order.objects.filter(creation_datetime__gte=duration, status='Доставлено')\
-                .annotate(week=TruncWeek("creation_datetime")).values("week").annotate(total_orders=Count("id"))
-            return Response(queryset)
-
-        if three_month:
-            duration = datetime.date.today() - datetime.timedelta(days=90)
-            queryset = Order.objects.filter(creation_datetime__gte=duration, status='Доставлено')\
-                .annotate(week=TruncWeek("creation_datetime")).values("week").annotate(total_orders=Count("id"))
-            return Response(queryset)
-
-        if half_year:
-            duration = datetime.date.today() - datetime.timedelta(days=182)
-            queryset = Order.objects.filter(creation_datetime__gte=duration, status='Доставлено')\
-                .annotate(week=TruncMonth("creation_datetime")).values("week").annotate(total_orders=Count("id"))
-            return Response(queryset)
-        return Response('Статистика заказов магазинов')
@@ -5,6 +5,7 @@ from apps.product.models import (
     ProductType,
     ProductImage,
     Flower,
+    FlowerMovement,
     ProductFlower,
     FavoriteProduct,
 )
@@ -14,6 +15,7 @@ admin.site.register(Product)
 admin.site.register(ProductType)
 admin.site.register(ProductImage)
 admin.site.register(Flower)
+admin.site.register(FlowerMovement)
 admin.site.register(ProductFlower)
 admin.site.register(FavoriteProduct)
 
@@ -0,0 +1,148 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import http_date, parse_http_date
+from rest_framework.response import Response
+
+from core.constants import UserType
+from core.mixins import get_not_modified_response
+
+VERSION_KEY = 'catalogue:version'
+HITS_KEY = 'catalogue:hits'
+MISSES_KEY = 'catalogue:misses'
+
+
+def get_catalogue_version():
+    """
+    Current catalogue version, part of every catalogue cache key
+    :return: int
+    """
+
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from current time, so an evicted version never matches old keys
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalogue_version():
+    """
+    Invalidate every cached catalogue response after current transaction commits
+    :return: None
+    """
+
+    transaction.on_commit(_incr_version)
+
+
+def _incr_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def _incr_counter(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_catalogue_cache_stats():
+    """
+    Catalogue cache hit and miss counters
+    :return: dict
+    """
+
+    stats = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = stats.get(HITS_KEY, 0), stats.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0,
+    }
+
+
+def reset_catalogue_cache_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
+
+
+def get_catalogue_cache_key(name, request, params):
+    """
+    Build cache key from view name, catalogue version and query params
+    :param name: str, view name
+    :param request: Request
+    :param params: tuple of query params the response depends on
+    :return: str
+    """
+
+    query = urlencode(sorted(
+        (param, value)
+        for param in params
+        for value in request.query_params.getlist(param)
+    ))
+    # Host is part of the key since pagination links are absolute
+    digest = hashlib.md5(f'{request.get_host()}?{query}'.encode('utf-8')).hexdigest()
+    return f'catalogue:{get_catalogue_version()}:{name}:{digest}'
+
+
+class CatalogueCacheMixin:
+    """
+    Read-through cache of list responses shared by every anonymous user,
+    client and courier. Cached responses are dropped by catalogue version
+    bump on product changes
+    """
+
+    catalogue_cache_params = ('status', 'product_type__title', 'freshness', 'cursor', 'page_size')
+
+    def is_catalogue_cached(self):
+        if not settings.CATALOGUE_CACHE_TIMEOUT:
+            return False
+        user = self.request.user
+        return user.is_anonymous or user.user_type in (UserType.CLIENT, UserType.COURIER)
+
+    def list(self, request, *args, **kwargs):
+        if not self.is_catalogue_cached():
+            return super().list(request, *args, **kwargs)
+
+        key = get_catalogue_cache_key(self.__class__.__name__, request, self.catalogue_cache_params)
+        cached = cache.get(key)
+        if cached is not None:
+            _incr_counter(HITS_KEY)
+            data, headers = cached
+            if 'ETag' in headers:
+                response = get_not_modified_response(request, headers['ETag'], headers.get('Last-Modified'))
+                if response is not None:
+                    return response
+            response = Response(data)
+            for header, value in headers.items():
+                response[header] = http_date(value) if header == 'Last-Modified' else value
+            return response
+
+        _incr_counter(MISSES_KEY)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            headers = {}
+            if response.has_header('ETag'):
+                headers['ETag'] = response['ETag']
+            if response.has_header('Last-Modified'):
+                headers['Last-Modified'] = parse_http_date(response['Last-Modified'])
+            cache.set(key, (response.data, headers), settings.CATALOGUE_CACHE_TIMEOUT)
+        return response
+
+    def get_etag_seed(self):
+        """
+        Cached responses are shared, so is their ETag. Catalogue version
+        changes with product types, florists and shop branches rendered in
+        the list, which leave product update stamps untouched
+        """
+
+        seed = 'catalogue' if self.is_catalogue_cached() else super().get_etag_seed()
+        return f'{get_catalogue_version()}:{seed}'
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.product.cache import get_catalogue_cache_stats, reset_catalogue_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show catalogue cache hit and miss counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset counters after showing them')
+
+    def handle(self, *args, **options):
+        stats = get_catalogue_cache_stats()
+        self.stdout.write(
+            f"Hits: {stats['hits']}, misses: {stats['misses']}, hit ratio: {stats['hit_ratio']:.2%}"
+        )
+        if options['reset']:
+            reset_catalogue_cache_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from apps.product.models import Product
+from apps.product.services import reprice_products
+
+
+class Command(BaseCommand):
+    help = 'Recalculate prices of products on sale from flowers and product type allowances'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--product-type', type=int, help='Reprice products of given product type id only')
+
+    def handle(self, *args, **options):
+        products = Product.objects.all()
+        if options['product_type']:
+            products = products.filter(product_type=options['product_type'])
+
+        changed = reprice_products(products)
+        self.stdout.write(self.style.SUCCESS(
+            f"Changed {changed['product_flower_price']} product flower prices, "
+            f"{changed['price_without_allowance']} prices without allowance and {changed['price']} prices"
+        ))
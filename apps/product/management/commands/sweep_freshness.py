@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.product.services import sweep_freshness
+
+
+class Command(BaseCommand):
+    help = 'Mark blooming products past their wilts_at as wilted'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Repeat every given seconds instead of running once, e.g. 600',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            wilted = sweep_freshness()
+            self.stdout.write(self.style.SUCCESS(f'Marked {wilted} products as wilted'))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.4 on 2026-10-18 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0008_alter_product_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['creation_date', 'id'], name='product_creation_date_id_idx'),
+        ),
+    ]
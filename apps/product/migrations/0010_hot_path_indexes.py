@@ -0,0 +1,25 @@
+# Generated by Django 3.2.4 on 2026-10-18 11:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0009_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('status', 'На продаже')), fields=['creation_date', 'id'], name='product_on_sale_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['florist', 'status'], name='product_florist_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('status', 'Продан')), fields=['sale_datetime'], name='product_sold_idx'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+from django.db import migrations, models
+
+
+PRODUCT_STATUS = {
+    1: 'На продаже',
+    2: 'Продан',
+    3: 'В процессе доставки',
+    4: 'Удален',
+}
+PRODUCT_SIZE = {
+    1: 'Маленький',
+    2: 'Средний',
+    3: 'Большой',
+}
+
+
+def labels_to_codes(apps, schema_editor):
+    Product = apps.get_model('product', 'Product')
+    for code, label in PRODUCT_STATUS.items():
+        Product.objects.filter(status=label).update(status_code=code)
+    for code, label in PRODUCT_SIZE.items():
+        Product.objects.filter(size=label).update(size_code=code)
+
+
+def codes_to_labels(apps, schema_editor):
+    Product = apps.get_model('product', 'Product')
+    for code, label in PRODUCT_STATUS.items():
+        Product.objects.filter(status_code=code).update(status=label)
+    for code, label in PRODUCT_SIZE.items():
+        Product.objects.filter(size_code=code).update(size=label)
+    if schema_editor.connection.vendor == 'postgresql':
+        # Fire deferred FK checks now, the column is dropped in the same transaction
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0010_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_on_sale_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_sold_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_florist_status_idx',
+        ),
+        # Default lets reverse migration re-add the label column on filled table
+        migrations.AlterField(
+            model_name='product',
+            name='size',
+            field=models.CharField(choices=[('Маленький', 'Маленький'), ('Средний', 'Средний'), ('Большой', 'Большой')], default='Средний', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='status_code',
+            field=models.SmallIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='size_code',
+            field=models.SmallIntegerField(null=True),
+        ),
+        migrations.RunPython(labels_to_codes, codes_to_labels),
+    ]
@@ -0,0 +1,57 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0011_integer_choice_codes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='product',
+            name='status',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='size',
+        ),
+        migrations.RenameField(
+            model_name='product',
+            old_name='status_code',
+            new_name='status',
+        ),
+        migrations.RenameField(
+            model_name='product',
+            old_name='size_code',
+            new_name='size',
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='size',
+            field=models.SmallIntegerField(choices=[(1, 'Маленький'), (2, 'Средний'), (3, 'Большой')]),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='status',
+            field=models.SmallIntegerField(choices=[(1, 'На продаже'), (2, 'Продан'), (3, 'В процессе доставки'), (4, 'Удален')], default=1),
+        ),
+        migrations.AlterField(
+            model_name='productflower',
+            name='product',
+            field=models.ForeignKey(limit_choices_to={'status': 1}, on_delete=django.db.models.deletion.CASCADE, to='product.product'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('status', 1)), fields=['creation_date', 'id'], name='product_on_sale_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('status', 2)), fields=['sale_datetime'], name='product_sold_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['florist', 'status'], name='product_florist_status_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.4 on 2026-10-18 12:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0012_integer_choices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='update_datetime',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,56 @@
+import datetime
+
+from django.db import migrations, models
+from django.db.models import Case, DateTimeField, ExpressionWrapper, F, Value, When
+from django.utils import timezone
+
+
+# Lifetimes of the former freshness_status property
+FRESHNESS_DAYS = {
+    'Букет': 4,
+    'Комнатное': 217,
+}
+BLOOMING = 1
+WILTED = 2
+
+
+def set_freshness(apps, schema_editor):
+    ProductType = apps.get_model('product', 'ProductType')
+    Product = apps.get_model('product', 'Product')
+    current_datetime = timezone.now()
+    for title, freshness_days in FRESHNESS_DAYS.items():
+        ProductType.objects.filter(title=title).update(freshness_days=freshness_days)
+        freshness_period = datetime.timedelta(days=freshness_days)
+        Product.objects.filter(product_type__title=title).update(
+            wilts_at=ExpressionWrapper(F('creation_date') + freshness_period, output_field=DateTimeField()),
+            freshness=Case(
+                When(creation_date__lte=current_datetime - freshness_period, then=Value(WILTED)),
+                default=Value(BLOOMING),
+            ),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0013_update_datetime'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producttype',
+            name='freshness_days',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='freshness',
+            field=models.SmallIntegerField(blank=True, choices=[(1, 'Цветущий'), (2, 'Увядший')], null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='wilts_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(set_freshness, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0014_product_freshness'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('status', 1)), fields=['freshness', 'creation_date', 'id'], name='product_on_sale_freshness_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('freshness', 1)), fields=['wilts_at'], name='product_blooming_wilts_at_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 3.2.4 on 2026-10-18 12:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def reserve_assembled_flowers(apps, schema_editor):
+    """
+    Flowers of bouquets on sale or in delivery were taken from total_quantity,
+    now they stay in total_quantity as reserved
+    """
+
+    Flower = apps.get_model('product', 'Flower')
+    ProductFlower = apps.get_model('product', 'ProductFlower')
+    reserved = ProductFlower.objects.filter(flower=OuterRef('pk'), product__status__in=(1, 3)) \
+        .order_by().values('flower').annotate(quantity=Sum('quantity')).values('quantity')
+    Flower.objects.update(reserved_quantity=Coalesce(Subquery(reserved), Value(0)))
+    Flower.objects.update(total_quantity=F('total_quantity') + F('reserved_quantity'))
+
+
+def release_assembled_flowers(apps, schema_editor):
+    Flower = apps.get_model('product', 'Flower')
+    Flower.objects.update(total_quantity=F('total_quantity') - F('reserved_quantity'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0015_product_freshness_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlowerMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('movement_type', models.SmallIntegerField(choices=[(1, 'Резерв'), (2, 'Снятие резерва'), (3, 'Продажа')])),
+                ('quantity', models.PositiveIntegerField()),
+                ('idempotency_key', models.CharField(max_length=255, unique=True)),
+                ('creation_datetime', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='flower',
+            name='reserved_quantity',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='flowermovement',
+            name='flower',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='product.flower'),
+        ),
+        migrations.AddField(
+            model_name='flowermovement',
+            name='product_flower',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='product.productflower'),
+        ),
+        migrations.RunPython(reserve_assembled_flowers, release_assembled_flowers),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0016_flower_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='flower',
+            constraint=models.CheckConstraint(check=models.Q(reserved_quantity__lte=F('total_quantity')), name='flower_reserved_lte_total'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.4 on 2026-10-18 12:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0017_flower_reserved_constraint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='flowermovement',
+            name='movement_type',
+            field=models.SmallIntegerField(choices=[(1, 'Резерв'), (2, 'Снятие резерва'), (3, 'Продажа'), (4, 'Поступление'), (5, 'Списание')]),
+        ),
+    ]
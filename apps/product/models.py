@@ -1,35 +1,46 @@
+import datetime
+
 from django.db import models
+from django.db.models import F, Q
 from django.utils import timezone
 
+from core.constants import FlowerMovementType, ProductFreshness, ProductStatus, ProductSize
 from apps.users.models import User, EmployeeProfile
 
 
 class Product(models.Model):
     """Product model"""
 
-    product_status = [
-        ('На продаже', 'На продаже'),
-        ('Продан', 'Продан'),
-        ('В процессе доставки', 'В процессе доставки'),
-        ('Удален', 'Удален')
-    ]
-
-    size_choice = [
-        ('Маленький', 'Маленький'),
-        ('Средний', 'Средний'),
-        ('Большой', 'Большой'),
-    ]
-
     name = models.CharField(max_length=255)
     description = models.TextField()
     product_type = models.ForeignKey('ProductType', on_delete=models.PROTECT)
     price = models.DecimalField(max_digits=9, decimal_places=1, default=0)
     price_without_allowance = models.DecimalField(max_digits=9, decimal_places=1, default=0)
-    size = models.CharField(max_length=255, choices=size_choice)
+    size = models.SmallIntegerField(choices=ProductSize.choices)
     creation_date = models.DateTimeField(auto_now_add=True)
+    update_datetime = models.DateTimeField(auto_now=True)
     florist = models.ForeignKey(User, on_delete=models.PROTECT)
-    status = models.CharField(max_length=255, choices=product_status, default='На продаже')
+    status = models.SmallIntegerField(choices=ProductStatus.choices, default=ProductStatus.ON_SALE)
     sale_datetime = models.DateTimeField(null=True)
+    freshness = models.SmallIntegerField(choices=ProductFreshness.choices, null=True, blank=True)
+    wilts_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['creation_date', 'id'], name='product_creation_date_id_idx'),
+            models.Index(
+                fields=['creation_date', 'id'], name='product_on_sale_idx', condition=Q(status=ProductStatus.ON_SALE)
+            ),
+            models.Index(fields=['florist', 'status'], name='product_florist_status_idx'),
+            models.Index(fields=['sale_datetime'], name='product_sold_idx', condition=Q(status=ProductStatus.SOLD)),
+            models.Index(
+                fields=['freshness', 'creation_date', 'id'], name='product_on_sale_freshness_idx',
+                condition=Q(status=ProductStatus.ON_SALE),
+            ),
+            models.Index(
+                fields=['wilts_at'], name='product_blooming_wilts_at_idx', condition=Q(freshness=ProductFreshness.BLOOMING)
+            ),
+        ]
 
     def __str__(self):
         return f'{self.name}'
@@ -39,8 +50,24 @@ class Product(models.Model):
         if product_type.title == 'Комнатное':
             total_allowance = product_type.florist_allowance + product_type.courier_allowance + product_type.allowance
             self.price = self.price_without_allowance + self.price_without_allowance / 100 * total_allowance
+        self.set_freshness()
         super().save(*args, **kwargs)
 
+    def set_freshness(self):
+        """Set wilts_at and freshness from product type freshness_days"""
+
+        freshness_days = self.product_type.freshness_days
+        if freshness_days is None:
+            self.wilts_at = None
+            self.freshness = None
+            return
+        current_datetime = timezone.now()
+        self.wilts_at = (self.creation_date or current_datetime) + datetime.timedelta(days=freshness_days)
+        if self.wilts_at <= current_datetime:
+            self.freshness = ProductFreshness.WILTED
+        else:
+            self.freshness = ProductFreshness.BLOOMING
+
     @property
     def florist_percent(self):
         return self.price_without_allowance / 100 * self.product_type.florist_allowance
@@ -51,19 +78,7 @@ class Product(models.Model):
 
     @property
     def freshness_status(self):
-        current_datetime = timezone.now()
-        time_difference = current_datetime - self.creation_date
-        day = time_difference.total_seconds() // 86400
-        month = day // 31
-
-        if self.product_type.title == 'Букет' and day <= 3:
-            return "Цветущий"
-        elif self.product_type.title == 'Букет' and day > 3:
-            return "Увядший"
-        if self.product_type.title == 'Комнатное' and month <= 6:
-            return "Цветущий"
-        elif self.product_type.title == 'Комнатное' and month > 6:
-            return "Увядший"
+        return self.get_freshness_display() if self.freshness else None
 
 
 class ProductType(models.Model):
@@ -73,10 +88,17 @@ class ProductType(models.Model):
     allowance = models.PositiveIntegerField(null=True)
     florist_allowance = models.PositiveIntegerField(null=True)
     courier_allowance = models.PositiveIntegerField(null=True)
+    freshness_days = models.PositiveIntegerField(null=True, blank=True)
 
     def __str__(self):
         return f'{self.title}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
 
 class ProductImage(models.Model):
     """Product image model"""
@@ -94,16 +116,34 @@ class Flower(models.Model):
     name = models.CharField(max_length=255)
     price = models.DecimalField(max_digits=9, decimal_places=1, default=0)
     total_quantity = models.PositiveIntegerField()
+    reserved_quantity = models.PositiveIntegerField(default=0)
     image = models.ImageField(null=True)
 
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                check=Q(reserved_quantity__lte=F('total_quantity')), name='flower_reserved_lte_total'
+            ),
+        ]
+
     def __str__(self):
         return f'{self.name}'
 
+    @property
+    def available_quantity(self):
+        return self.total_quantity - self.reserved_quantity
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
 
 class ProductFlower(models.Model):
     """Product Flower model"""
 
-    product = models.ForeignKey(Product, on_delete=models.CASCADE, limit_choices_to={'status': 'На продаже'})
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, limit_choices_to={'status': ProductStatus.ON_SALE})
     flower = models.ForeignKey(Flower, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=9, decimal_places=1, default=0)
@@ -116,6 +156,20 @@ class ProductFlower(models.Model):
         super().save(*args, **kwargs)
 
 
+class FlowerMovement(models.Model):
+    """Flower stock movement ledger"""
+
+    flower = models.ForeignKey(Flower, on_delete=models.CASCADE)
+    movement_type = models.SmallIntegerField(choices=FlowerMovementType.choices)
+    quantity = models.PositiveIntegerField()
+    idempotency_key = models.CharField(max_length=255, unique=True)
+    product_flower = models.ForeignKey(ProductFlower, on_delete=models.SET_NULL, null=True, blank=True)
+    creation_datetime = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.flower} {self.get_movement_type_display()} {self.quantity}'
+
+
 class FavoriteProduct(models.Model):
     """User favorite product model"""
 
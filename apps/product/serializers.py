@@ -2,6 +2,8 @@ from rest_framework import serializers
 
 from drf_extra_fields.relations import PresentablePrimaryKeyRelatedField
 
+from core.constants import ProductStatus
+from core.fields import LabelChoiceField
 from apps.users.serializers import UserSerializer
 from apps.users.models import EmployeeProfile, User
 from apps.product.models import (
@@ -25,6 +27,8 @@ class ProductTypeSerializer(serializers.ModelSerializer):
 class ProductSerializer(serializers.ModelSerializer):
     """Product serializer"""
 
+    serializer_choice_field = LabelChoiceField
+
     florist = PresentablePrimaryKeyRelatedField(
         queryset=User.objects.all(),
         presentation_serializer=UserSerializer
@@ -49,6 +53,8 @@ class ProductSerializer(serializers.ModelSerializer):
             'shop_branch',
             'status',
             'price',
+            'freshness',
+            'wilts_at',
         ]
 
 
@@ -63,6 +69,8 @@ class ProductAdminSerializer(ProductSerializer):
             'is_sold',
             'shop_branch',
             'price',
+            'freshness',
+            'wilts_at',
         ]
 
 
@@ -82,9 +90,17 @@ class ProductImageSerializer(serializers.ModelSerializer):
 class FlowerSerializer(serializers.ModelSerializer):
     """Flower serializer"""
 
+    available_quantity = serializers.IntegerField(read_only=True)
+
     class Meta:
         model = Flower
         fields = '__all__'
+        read_only_fields = ['reserved_quantity']
+
+    def validate_total_quantity(self, value):
+        if self.instance is not None and value < self.instance.reserved_quantity:
+            raise serializers.ValidationError('Количество меньше зарезервированного в букетах')
+        return value
 
 
 class ProductFlowerSerializer(serializers.ModelSerializer):
@@ -104,6 +120,49 @@ class ProductFlowerSerializer(serializers.ModelSerializer):
         read_only_fields = ['price']
 
 
+class BouquetFlowerSerializer(serializers.Serializer):
+    """One flower line of bouquet assembly"""
+
+    flower = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class BouquetAssemblySerializer(serializers.Serializer):
+    """
+    Bouquet assembly serializer, validates stock of every flower line
+    with one query
+    """
+
+    product = serializers.PrimaryKeyRelatedField(queryset=Product.objects.filter(status=ProductStatus.ON_SALE))
+    flowers = BouquetFlowerSerializer(many=True, allow_empty=False)
+
+    def validate(self, attrs):
+        quantities = {}
+        for line in attrs['flowers']:
+            quantities[line['flower']] = quantities.get(line['flower'], 0) + line['quantity']
+
+        flowers = Flower.objects.in_bulk(quantities)
+        missing = sorted(set(quantities) - set(flowers))
+        if missing:
+            raise serializers.ValidationError({'flowers': f'Цветы не найдены: {missing}'})
+        short = sorted(
+            flower.name for flower_id, flower in flowers.items() if flower.available_quantity < quantities[flower_id]
+        )
+        if short:
+            raise serializers.ValidationError({'flowers': f'Недостаточно цветов на складе: {", ".join(short)}'})
+
+        attrs['quantities'] = {flowers[flower_id]: quantity for flower_id, quantity in quantities.items()}
+        return attrs
+
+
+class BouquetFlowerLineSerializer(serializers.ModelSerializer):
+    """Flat product-flower serializer of assembled bouquet"""
+
+    class Meta:
+        model = ProductFlower
+        fields = ('id', 'flower', 'quantity', 'price')
+
+
 class FavoriteProductSerializer(serializers.ModelSerializer):
     """Favorite product serializer"""
 
@@ -126,4 +185,4 @@ class FloristHistorySerializer(serializers.Serializer):
 
     @staticmethod
     def get_total_earnings(obj):
-        return sum([obj['products'].florist_percent for obj['products'] in obj['products'].all()])
+        return obj['total_earnings'] or 0
@@ -0,0 +1,266 @@
+import datetime
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Case,
+    DateTimeField,
+    DecimalField,
+    Exists,
+    ExpressionWrapper,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from core.constants import FlowerMovementType, ProductFreshness, ProductStatus
+from apps.product.cache import bump_catalogue_version
+from apps.product.models import Flower, FlowerMovement, Product, ProductFlower, ProductType
+
+PRICE_FIELD = DecimalField(max_digits=9, decimal_places=1)
+
+
+def refresh_product_type_freshness(product_type):
+    """
+    Recalculate wilts_at and freshness of product type products with one UPDATE
+    :param product_type: ProductType
+    :return: int, quantity of updated products
+    """
+
+    current_datetime = timezone.now()
+    if product_type.freshness_days is None:
+        values = {'wilts_at': None, 'freshness': None}
+    else:
+        freshness_period = datetime.timedelta(days=product_type.freshness_days)
+        values = {
+            'wilts_at': ExpressionWrapper(F('creation_date') + freshness_period, output_field=DateTimeField()),
+            'freshness': Case(
+                When(creation_date__lte=current_datetime - freshness_period, then=Value(ProductFreshness.WILTED)),
+                default=Value(ProductFreshness.BLOOMING),
+            ),
+        }
+    updated = Product.objects.filter(product_type=product_type) \
+        .update(update_datetime=current_datetime, **values)
+    bump_catalogue_version()
+    return updated
+
+
+def sweep_freshness(current_datetime=None):
+    """
+    Flip blooming products past their wilts_at to wilted with one UPDATE
+    :param current_datetime: datetime, defaults to now
+    :return: int, quantity of wilted products
+    """
+
+    current_datetime = current_datetime or timezone.now()
+    wilted = Product.objects.filter(freshness=ProductFreshness.BLOOMING, wilts_at__lte=current_datetime) \
+        .update(freshness=ProductFreshness.WILTED, update_datetime=current_datetime)
+    if wilted:
+        bump_catalogue_version()
+    return wilted
+
+
+def get_price_expression(product_type):
+    """
+    Price of product type products built from price_without_allowance
+    :param product_type: ProductType
+    :return: expression
+    """
+
+    total_allowance = sum(
+        allowance or 0
+        for allowance in (product_type.allowance, product_type.florist_allowance, product_type.courier_allowance)
+    )
+    # Cast rounds to the stored precision, so unchanged prices compare equal
+    return Cast(
+        F('price_without_allowance') + F('price_without_allowance') * Value(total_allowance) / Value(100),
+        output_field=PRICE_FIELD,
+    )
+
+
+def reprice_products(products):
+    """
+    Recalculate product flower prices, price_without_allowance and price of
+    products on sale with set-based UPDATEs in one transaction.
+    Products built from flowers take price_without_allowance from their
+    flowers, price adds product type allowances to price_without_allowance
+    :param products: Product queryset
+    :return: dict, quantity of changed rows by UPDATE
+    """
+
+    current_datetime = timezone.now()
+    products = Product.objects.filter(pk__in=products.filter(status=ProductStatus.ON_SALE).values('pk'))
+    flower_price = Subquery(Flower.objects.filter(pk=OuterRef('flower')).values('price')[:1])
+    new_flower_price = ExpressionWrapper(flower_price * F('quantity'), output_field=PRICE_FIELD)
+    flowers_price = ProductFlower.objects.filter(product=OuterRef('pk')) \
+        .order_by().values('product').annotate(total=Sum('price')).values('total')
+    new_price_without_allowance = Coalesce(Subquery(flowers_price, output_field=PRICE_FIELD), Value(0))
+
+    with transaction.atomic():
+        changed = {
+            'product_flower_price': ProductFlower.objects.filter(product__in=products)
+            .exclude(price=new_flower_price)
+            .update(price=new_flower_price),
+            'price_without_allowance': products
+            .filter(Exists(ProductFlower.objects.filter(product=OuterRef('pk'))))
+            .exclude(price_without_allowance=new_price_without_allowance)
+            .update(price_without_allowance=new_price_without_allowance, update_datetime=current_datetime),
+            'price': 0,
+        }
+        for product_type in ProductType.objects.filter(product__in=products).distinct():
+            new_price = get_price_expression(product_type)
+            changed['price'] += products.filter(product_type=product_type, price_without_allowance__gt=0) \
+                .exclude(price=new_price) \
+                .update(price=new_price, update_datetime=current_datetime)
+        if any(changed.values()):
+            bump_catalogue_version()
+    return changed
+
+
+class StockError(Exception):
+    """Flower stock can not cover movement"""
+
+
+def get_stock_update(movement_type, quantity):
+    """
+    Conditional filter and F() increments of flower stock movement
+    :param movement_type: FlowerMovementType
+    :param quantity: int
+    :return: tuple, filter kwargs and update kwargs
+    """
+
+    if movement_type == FlowerMovementType.RESERVE:
+        return (
+            {'total_quantity__gte': F('reserved_quantity') + quantity},
+            {'reserved_quantity': F('reserved_quantity') + quantity},
+        )
+    if movement_type == FlowerMovementType.RELEASE:
+        return (
+            {'reserved_quantity__gte': quantity},
+            {'reserved_quantity': F('reserved_quantity') - quantity},
+        )
+    return (
+        {'reserved_quantity__gte': quantity},
+        {'total_quantity': F('total_quantity') - quantity, 'reserved_quantity': F('reserved_quantity') - quantity},
+    )
+
+
+def move_flower_stock(flower_id, movement_type, quantity, idempotency_key, product_flower=None):
+    """
+    Record flower stock movement and apply it with one conditional UPDATE.
+    Movement with already used idempotency key is not applied again
+    :param flower_id: int
+    :param movement_type: FlowerMovementType
+    :param quantity: int
+    :param idempotency_key: str, unique key of movement
+    :param product_flower: ProductFlower or None
+    :return: tuple, FlowerMovement and whether it was applied
+    """
+
+    try:
+        with transaction.atomic():
+            movement = FlowerMovement.objects.create(
+                flower_id=flower_id, movement_type=movement_type, quantity=quantity,
+                idempotency_key=idempotency_key, product_flower=product_flower,
+            )
+    except IntegrityError:
+        return FlowerMovement.objects.get(idempotency_key=idempotency_key), False
+
+    condition, values = get_stock_update(movement_type, quantity)
+    if not Flower.objects.filter(pk=flower_id, **condition).update(**values):
+        raise StockError('Недостаточно цветов на складе')
+    return movement, True
+
+
+def move_product_flowers(products, movement_type, key_prefix):
+    """
+    Release or consume reserved flowers of products with one conditional
+    UPDATE. Movements with already used idempotency keys are not applied
+    again
+    :param products: Product queryset
+    :param movement_type: FlowerMovementType, RELEASE or CONSUME
+    :param key_prefix: str, idempotency key prefix of movements
+    :return: int, quantity of updated flowers
+    """
+
+    quantities = dict(
+        ProductFlower.objects.filter(product__in=products)
+        .order_by().values('flower').annotate(total=Sum('quantity')).values_list('flower', 'total')
+    )
+    keys = {flower_id: f'{key_prefix}-flower-{flower_id}' for flower_id in quantities}
+    moved_flowers = FlowerMovement.objects.filter(idempotency_key__in=keys.values()).values_list('flower', flat=True)
+    for flower_id in moved_flowers:
+        del quantities[flower_id]
+    if not quantities:
+        return 0
+
+    with transaction.atomic():
+        FlowerMovement.objects.bulk_create([
+            FlowerMovement(
+                flower_id=flower_id, movement_type=movement_type, quantity=quantity,
+                idempotency_key=keys[flower_id],
+            )
+            for flower_id, quantity in quantities.items()
+        ])
+        moved = Case(
+            *[When(pk=flower_id, then=Value(quantity)) for flower_id, quantity in quantities.items()],
+            default=Value(0),
+        )
+        values = {'reserved_quantity': F('reserved_quantity') - moved}
+        if movement_type == FlowerMovementType.CONSUME:
+            values['total_quantity'] = F('total_quantity') - moved
+        updated = Flower.objects.filter(reduce(or_, (
+            Q(pk=flower_id, reserved_quantity__gte=quantity) for flower_id, quantity in quantities.items()
+        ))).update(**values)
+        if updated != len(quantities):
+            raise StockError('Зарезервированных цветов меньше, чем в букетах')
+    return updated
+
+
+def assemble_bouquet(product, quantities, idempotency_key):
+    """
+    Add flower lines to bouquet with bulk inserts, reserve their flowers
+    with one conditional UPDATE and reprice the product once.
+    Assembly with already used idempotency key is not applied again
+    :param product: Product
+    :param quantities: dict, {Flower: quantity}
+    :param idempotency_key: str, unique key of assembly
+    :return: bool, whether assembly was applied
+    """
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                FlowerMovement.objects.bulk_create([
+                    FlowerMovement(
+                        flower=flower, movement_type=FlowerMovementType.RESERVE, quantity=quantity,
+                        idempotency_key=f'{idempotency_key}-flower-{flower.pk}',
+                    )
+                    for flower, quantity in quantities.items()
+                ])
+        except IntegrityError:
+            return False
+
+        reserved = Flower.objects.filter(reduce(or_, (
+            Q(pk=flower.pk, total_quantity__gte=F('reserved_quantity') + quantity)
+            for flower, quantity in quantities.items()
+        ))).update(reserved_quantity=F('reserved_quantity') + Case(
+            *[When(pk=flower.pk, then=Value(quantity)) for flower, quantity in quantities.items()],
+            default=Value(0),
+        ))
+        if reserved != len(quantities):
+            raise StockError('Недостаточно цветов на складе')
+
+        ProductFlower.objects.bulk_create([
+            ProductFlower(product=product, flower=flower, quantity=quantity, price=flower.price * quantity)
+            for flower, quantity in quantities.items()
+        ])
+        reprice_products(Product.objects.filter(pk=product.pk))
+    return True
@@ -0,0 +1,60 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.constants import UserType
+from apps.product.cache import bump_catalogue_version
+from apps.product.services import refresh_product_type_freshness, reprice_products
+from apps.product.models import (
+    Flower,
+    Product,
+    ProductFlower,
+    ProductImage,
+    ProductType,
+)
+from apps.users.models import ShopBranch, User
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductFlower)
+@receiver([post_save, post_delete], sender=ProductImage)
+@receiver([post_save, post_delete], sender=ProductType)
+@receiver([post_save, post_delete], sender=ShopBranch)
+def invalidate_catalogue_cache(sender, **kwargs):
+    bump_catalogue_version()
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_florist_catalogue_cache(sender, instance, **kwargs):
+    if instance.user_type == UserType.FLORIST:
+        bump_catalogue_version()
+
+
+def pop_changed_fields(instance, fields):
+    """
+    Compare fields with values loaded from database and remember current ones
+    :param instance: model instance loaded by from_db
+    :param fields: tuple of field names
+    :return: set of changed field names
+    """
+
+    loaded_values = getattr(instance, '_loaded_values', {})
+    changed = {field for field in fields if loaded_values.get(field) != getattr(instance, field)}
+    instance._loaded_values = {**loaded_values, **{field: getattr(instance, field) for field in fields}}
+    return changed
+
+
+@receiver(post_save, sender=ProductType)
+def refresh_product_type_products(sender, instance, created, **kwargs):
+    changed = pop_changed_fields(instance, ('freshness_days', 'allowance', 'florist_allowance', 'courier_allowance'))
+    if created:
+        return
+    if 'freshness_days' in changed:
+        refresh_product_type_freshness(instance)
+    if changed & {'allowance', 'florist_allowance', 'courier_allowance'}:
+        reprice_products(Product.objects.filter(product_type=instance))
+
+
+@receiver(post_save, sender=Flower)
+def reprice_flower_products(sender, instance, created, **kwargs):
+    if 'price' in pop_changed_fields(instance, ('price',)) and not created:
+        reprice_products(Product.objects.filter(productflower__flower=instance))
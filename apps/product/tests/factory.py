@@ -0,0 +1,15 @@
+import factory
+
+from apps.product import models
+
+
+class ProductTypeFactory(factory.django.DjangoModelFactory):
+    """Fake ProductType model"""
+
+    class Meta:
+        model = models.ProductType
+
+    title = 'Букет'
+    allowance = 10
+    florist_allowance = 10
+    courier_allowance = 10
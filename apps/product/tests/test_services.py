@@ -0,0 +1,450 @@
+import datetime
+import threading
+import unittest
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.constants import FlowerMovementType, OrderStatus, ProductFreshness, ProductSize, ProductStatus, UserType
+from apps.order.models import Cart, CartProduct, Order
+from apps.order.services import settle_order
+from apps.product.models import Flower, FlowerMovement, Product, ProductFlower
+from apps.product.services import (
+    StockError,
+    move_flower_stock,
+    move_product_flowers,
+    reprice_products,
+    sweep_freshness,
+)
+from apps.product.tests.factory import ProductTypeFactory
+from apps.users.tests.factory import UserFactory
+
+
+class ProductFreshnessTests(TestCase):
+    """Test stored product freshness"""
+
+    def setUp(self):
+        self.product_type = ProductTypeFactory(freshness_days=4)
+        self.florist = UserFactory()
+
+    def create_product(self, days_ago=0, product_type=None):
+        product = Product.objects.create(
+            name='Букет', description='Букет', price=100, size=ProductSize.SMALL,
+            product_type=product_type or self.product_type, florist=self.florist,
+        )
+        if days_ago:
+            creation_date = timezone.now() - datetime.timedelta(days=days_ago)
+            Product.objects.filter(pk=product.pk).update(
+                creation_date=creation_date, wilts_at=creation_date + datetime.timedelta(days=4)
+            )
+            product.refresh_from_db()
+        return product
+
+    def test_save_sets_wilts_at(self):
+        """
+        Test product save stores wilts_at and freshness from product type
+        :return: None
+        """
+
+        product = self.create_product()
+        self.assertEqual(product.freshness, ProductFreshness.BLOOMING)
+        self.assertEqual(product.freshness_status, 'Цветущий')
+        self.assertAlmostEqual(
+            product.wilts_at, product.creation_date + datetime.timedelta(days=4), delta=datetime.timedelta(seconds=1)
+        )
+
+        other_type = ProductTypeFactory(title='Корзина')
+        product = self.create_product(product_type=other_type)
+        self.assertIsNone(product.freshness)
+        self.assertIsNone(product.wilts_at)
+
+    def test_sweep_wilts_expired_products(self):
+        """
+        Test sweeper flips only blooming products past wilts_at with one query
+        :return: None
+        """
+
+        fresh = self.create_product(days_ago=1)
+        expired = [self.create_product(days_ago=5) for _ in range(3)]
+
+        with self.assertNumQueries(1):
+            self.assertEqual(sweep_freshness(), 3)
+        self.assertEqual(sweep_freshness(), 0)
+
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.freshness, ProductFreshness.BLOOMING)
+        self.assertEqual(
+            Product.objects.filter(pk__in=[product.pk for product in expired], freshness=ProductFreshness.WILTED).count(),
+            3,
+        )
+
+    def test_freshness_days_change_refreshes_products(self):
+        """
+        Test product type freshness_days change recalculates its products
+        :return: None
+        """
+
+        product = self.create_product(days_ago=5)
+        self.product_type.freshness_days = 10
+        self.product_type.save()
+
+        product.refresh_from_db()
+        self.assertEqual(product.wilts_at, product.creation_date + datetime.timedelta(days=10))
+        self.assertEqual(product.freshness, ProductFreshness.BLOOMING)
+
+    def test_product_list_freshness_filter(self):
+        """
+        Test product list filters by freshness label
+        :return: None
+        """
+
+        self.create_product(days_ago=1)
+        self.create_product(days_ago=5)
+        sweep_freshness()
+
+        response = APIClient().get('/product/list/', {'freshness': 'Увядший'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['freshness_status'], 'Увядший')
+
+
+class RepricingTests(TestCase):
+    """Test set-based product repricing"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.product_type = ProductTypeFactory()
+        self.florist = UserFactory()
+        self.flower = Flower.objects.create(name='Роза', price=50, total_quantity=100)
+
+    def create_bouquet(self, quantity=2, status=ProductStatus.ON_SALE):
+        product = Product.objects.create(
+            name='Букет', description='Букет', size=ProductSize.SMALL, status=status,
+            product_type=self.product_type, florist=self.florist,
+        )
+        ProductFlower.objects.create(product=product, flower=self.flower, quantity=quantity)
+        reprice_products(Product.objects.filter(pk=product.pk))
+        product.refresh_from_db()
+        return product
+
+    def test_reprice_product_flowers(self):
+        """
+        Test product price comes from its flowers and product type allowances
+        :return: None
+        """
+
+        product = self.create_bouquet()
+
+        self.assertEqual(product.price_without_allowance, 100)
+        self.assertEqual(product.price, 130)
+        self.assertEqual(
+            reprice_products(Product.objects.all()),
+            {'product_flower_price': 0, 'price_without_allowance': 0, 'price': 0},
+        )
+
+    def test_allowance_change_reprices_products_on_sale(self):
+        """
+        Test product type allowance change reprices products on sale only
+        :return: None
+        """
+
+        products = [self.create_bouquet() for _ in range(3)]
+        sold = self.create_bouquet(status=ProductStatus.SOLD)
+        Product.objects.filter(pk=sold.pk).update(price=130)
+
+        self.product_type.allowance = 30
+        self.product_type.save()
+
+        self.assertEqual(
+            set(Product.objects.filter(pk__in=[product.pk for product in products]).values_list('price', flat=True)),
+            {150},
+        )
+        sold.refresh_from_db()
+        self.assertEqual(sold.price, 130)
+
+    def test_flower_price_change_reprices_products(self):
+        """
+        Test flower price change reprices product flowers and products
+        :return: None
+        """
+
+        product = self.create_bouquet(quantity=3)
+        self.flower.price = 100
+        self.flower.save()
+
+        product.refresh_from_db()
+        self.assertEqual(product.productflower_set.get().price, 300)
+        self.assertEqual(product.price_without_allowance, 300)
+        self.assertEqual(product.price, 390)
+
+    def test_reprice_query_count(self):
+        """
+        Test repricing runs a fixed number of queries for thousands of products
+        :return: None
+        """
+
+        products = Product.objects.bulk_create([
+            Product(
+                name='Букет', description='Букет', size=ProductSize.SMALL,
+                product_type=self.product_type, florist=self.florist,
+            )
+            for _ in range(2000)
+        ])
+        products = Product.objects.all()
+        ProductFlower.objects.bulk_create([
+            ProductFlower(product=product, flower=self.flower, quantity=1, price=10) for product in products
+        ])
+
+        with self.assertNumQueries(6):
+            changed = reprice_products(products)
+
+        self.assertEqual(changed, {'product_flower_price': 2000, 'price_without_allowance': 2000, 'price': 2000})
+        self.assertEqual(set(products.values_list('price', flat=True)), {65})
+
+    def test_product_flower_view(self):
+        """
+        Test adding and removing product flowers reprices product
+        :return: None
+        """
+
+        product = Product.objects.create(
+            name='Букет', description='Букет', size=ProductSize.SMALL,
+            product_type=self.product_type, florist=self.florist,
+        )
+        self.client.force_authenticate(self.florist)
+
+        response = self.client.post('/product/flower/', {
+            'product': product.pk, 'flower': self.flower.pk, 'quantity': 2,
+        })
+        product.refresh_from_db()
+        self.assertEqual(product.price, 130)
+        self.flower.refresh_from_db()
+        self.assertEqual(self.flower.available_quantity, 98)
+
+        self.client.delete(f"/product/flower/{response.data['id']}/")
+        product.refresh_from_db()
+        self.assertEqual((product.price_without_allowance, product.price), (0, 0))
+
+
+class FlowerStockTests(TestCase):
+    """Test flower stock ledger"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.product_type = ProductTypeFactory()
+        self.florist = UserFactory()
+        self.flower = Flower.objects.create(name='Роза', price=50, total_quantity=10)
+        self.product = Product.objects.create(
+            name='Букет', description='Букет', size=ProductSize.SMALL,
+            product_type=self.product_type, florist=self.florist,
+        )
+        self.client.force_authenticate(self.florist)
+
+    def add_flowers(self, quantity, idempotency_key=None):
+        headers = {'HTTP_IDEMPOTENCY_KEY': idempotency_key} if idempotency_key else {}
+        return self.client.post('/product/flower/', {
+            'product': self.product.pk, 'flower': self.flower.pk, 'quantity': quantity,
+        }, **headers)
+
+    def test_reserve_and_release(self):
+        """
+        Test assembled flowers are reserved and deleted ones are released
+        :return: None
+        """
+
+        response = self.add_flowers(4)
+        self.assertEqual(response.status_code, 200)
+        self.flower.refresh_from_db()
+        self.assertEqual((self.flower.total_quantity, self.flower.reserved_quantity), (10, 4))
+        self.assertEqual(self.flower.available_quantity, 6)
+
+        self.client.delete(f"/product/flower/{response.data['id']}/")
+        self.flower.refresh_from_db()
+        self.assertEqual((self.flower.total_quantity, self.flower.reserved_quantity), (10, 0))
+        self.assertEqual(
+            list(FlowerMovement.objects.order_by('pk').values_list('movement_type', 'quantity')),
+            [(FlowerMovementType.RESERVE, 4), (FlowerMovementType.RELEASE, 4)],
+        )
+
+    def test_oversell_is_rejected(self):
+        """
+        Test assembly above available quantity is rejected with nothing saved
+        :return: None
+        """
+
+        self.add_flowers(8)
+        response = self.add_flowers(3)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(ProductFlower.objects.count(), 1)
+        self.assertEqual(FlowerMovement.objects.count(), 1)
+        self.flower.refresh_from_db()
+        self.assertEqual(self.flower.reserved_quantity, 8)
+        with self.assertRaises(StockError):
+            move_flower_stock(self.flower.pk, FlowerMovementType.RESERVE, 3, 'manual')
+
+    def test_idempotent_assembly(self):
+        """
+        Test repeated request with the same idempotency key reserves once
+        :return: None
+        """
+
+        first = self.add_flowers(2, idempotency_key='assembly-1')
+        second = self.add_flowers(2, idempotency_key='assembly-1')
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data['id'], first.data['id'])
+        self.assertEqual(ProductFlower.objects.count(), 1)
+        self.flower.refresh_from_db()
+        self.assertEqual(self.flower.reserved_quantity, 2)
+
+    def test_client_key_does_not_collide(self):
+        """
+        Test client idempotency keys never match server or other florist keys
+        :return: None
+        """
+
+        first = self.add_flowers(2)
+        second = self.add_flowers(3, idempotency_key=f"product-flower-{first.data['id']}-release")
+        self.assertNotEqual(second.data['id'], first.data['id'])
+
+        self.assertEqual(self.client.delete(f"/product/flower/{first.data['id']}/").status_code, 204)
+        self.flower.refresh_from_db()
+        self.assertEqual(self.flower.reserved_quantity, 3)
+
+        other = UserFactory()
+        other_product = Product.objects.create(
+            name='Букет', description='Букет', size=ProductSize.SMALL,
+            product_type=self.product_type, florist=other,
+        )
+        self.client.force_authenticate(other)
+        response = self.client.post('/product/flower/', {
+            'product': other_product.pk, 'flower': self.flower.pk, 'quantity': 1,
+        }, HTTP_IDEMPOTENCY_KEY=f"product-flower-{first.data['id']}-release")
+        self.assertEqual(response.data['product']['id'], other_product.pk)
+        self.flower.refresh_from_db()
+        self.assertEqual(self.flower.reserved_quantity, 4)
+
+    def test_sold_flowers_leave_stock(self):
+        """
+        Test settled order consumes reserved flowers of its products
+        :return: None
+        """
+
+        self.add_flowers(3)
+        cart = Cart.objects.create()
+        CartProduct.objects.create(cart=cart, product=self.product)
+        order = Order.objects.create(
+            cart=cart, address='Юнусалиева 123', received_date=datetime.date.today(),
+            received_time=datetime.time(12, 0), status=OrderStatus.COURIER_HAS_ORDER,
+        )
+
+        settle_order(order)
+        settle_order(order)
+
+        self.flower.refresh_from_db()
+        self.assertEqual((self.flower.total_quantity, self.flower.reserved_quantity), (7, 0))
+        self.assertEqual(FlowerMovement.objects.filter(movement_type=FlowerMovementType.CONSUME).get().quantity, 3)
+
+    def test_repeated_release_is_applied_once(self):
+        """
+        Test product flowers moved again with the same key prefix are skipped
+        :return: None
+        """
+
+        self.add_flowers(3)
+        products = Product.objects.filter(pk=self.product.pk)
+
+        self.assertEqual(move_product_flowers(products, FlowerMovementType.RELEASE, 'release-1'), 1)
+        self.assertEqual(move_product_flowers(products, FlowerMovementType.RELEASE, 'release-1'), 0)
+
+        self.flower.refresh_from_db()
+        self.assertEqual((self.flower.total_quantity, self.flower.reserved_quantity), (10, 0))
+        self.assertEqual(FlowerMovement.objects.filter(movement_type=FlowerMovementType.RELEASE).count(), 1)
+
+    def test_drifted_reservation_is_rejected(self):
+        """
+        Test flowers reserved below product flowers are not moved
+        :return: None
+        """
+
+        response = self.add_flowers(3)
+        Flower.objects.filter(pk=self.flower.pk).update(reserved_quantity=1)
+
+        with self.assertRaises(StockError):
+            move_product_flowers(Product.objects.filter(pk=self.product.pk), FlowerMovementType.CONSUME, 'order-1')
+        self.assertFalse(FlowerMovement.objects.filter(movement_type=FlowerMovementType.CONSUME).exists())
+
+        response = self.client.delete(f"/product/flower/{response.data['id']}/")
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(ProductFlower.objects.exists())
+        self.flower.refresh_from_db()
+        self.assertEqual((self.flower.total_quantity, self.flower.reserved_quantity), (10, 1))
+
+    def test_total_below_reserved_is_rejected(self):
+        """
+        Test admin can not set flower total quantity below reserved
+        :return: None
+        """
+
+        self.add_flowers(6)
+        admin = UserFactory(user_type=UserType.ADMIN)
+        self.client.force_authenticate(admin)
+
+        response = self.client.patch(f'/flower/{self.flower.pk}/', {'total_quantity': 5})
+        self.assertEqual(response.status_code, 400)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Parallel assembly requires PostgreSQL')
+class ConcurrentAssemblyTests(TransactionTestCase):
+    """Test parallel bouquet assembly from one flower"""
+
+    assemblies = 20
+
+    def test_parallel_assembly_never_oversells(self):
+        """
+        Test parallel assemblies reserve exactly the flower stock and reject the rest
+        :return: None
+        """
+
+        product_type = ProductTypeFactory()
+        florist = UserFactory()
+        flower = Flower.objects.create(name='Роза', price=50, total_quantity=50)
+        products = [
+            Product.objects.create(
+                name='Букет', description='Букет', size=ProductSize.SMALL,
+                product_type=product_type, florist=florist,
+            )
+            for _ in range(self.assemblies)
+        ]
+
+        barrier = threading.Barrier(self.assemblies)
+        results = []
+
+        def assemble(product):
+            try:
+                client = APIClient()
+                client.force_authenticate(florist)
+                barrier.wait()
+                response = client.post('/product/flower/', {
+                    'product': product.pk, 'flower': flower.pk, 'quantity': 5,
+                })
+                results.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=assemble, args=(product,)) for product in products]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count(200), 10)
+        self.assertEqual(results.count(409), self.assemblies - 10)
+        flower.refresh_from_db()
+        self.assertEqual((flower.total_quantity, flower.reserved_quantity), (50, 50))
+        self.assertEqual(ProductFlower.objects.count(), 10)
+        self.assertEqual(FlowerMovement.objects.count(), 10)
@@ -0,0 +1,657 @@
+import datetime
+import json
+import tempfile
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core.constants import FlowerMovementType, OrderStatus, ProductSize, ProductStatus, UserType
+from apps.order.models import Cart, CartProduct, Order
+from apps.order.services import settle_order
+from apps.product.cache import get_catalogue_cache_stats, reset_catalogue_cache_stats
+from apps.product.models import FavoriteProduct, Flower, FlowerMovement, Product, ProductFlower, ProductImage, ProductType
+from apps.product.tests.factory import ProductTypeFactory
+from apps.users.tests.factory import ClientFactory, ShopBranchFactory, UserFactory
+
+
+@override_settings(CATALOGUE_CACHE_TIMEOUT=0)
+class ProductListQueryCountTests(TestCase):
+    """Test product list query count does not depend on products quantity"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.shop_branch = ShopBranchFactory()
+        self.product_types = [ProductTypeFactory(title=title) for title in ('Букет', 'Комнатное')]
+        self.florists = UserFactory.create_batch(3, shop_branch=self.shop_branch)
+
+    def create_products(self, quantity):
+        return Product.objects.bulk_create([
+            Product(
+                name=f'Букет {i}', description='Букет', price=100, size=ProductSize.SMALL,
+                product_type=self.product_types[i % 2], florist=self.florists[i % 3],
+            )
+            for i in range(quantity)
+        ])
+
+    def test_product_list_query_count(self):
+        """
+        Test product list runs a fixed number of queries for 1, 10 and 1000 products
+        :return: None
+        """
+
+        created = 0
+        for quantity in (1, 10, 1000):
+            self.create_products(quantity - created)
+            created = quantity
+            # page query, ETag is built from page rows
+            with self.subTest(quantity=quantity), self.assertNumQueries(1):
+                response = self.client.get('/product/list/')
+                self.assertEqual(response.status_code, 200)
+
+    def test_new_product_list_query_count(self):
+        """
+        Test new product list runs one query
+        :return: None
+        """
+
+        self.create_products(20)
+        with self.assertNumQueries(1):
+            response = self.client.get('/new-product/')
+        self.assertEqual(len(response.data), 10)
+
+    def test_product_image_and_favorite_list_query_count(self):
+        """
+        Test product image and favorite product lists run a fixed number of queries
+        :return: None
+        """
+
+        client = ClientFactory()
+        self.create_products(10)
+        for product in Product.objects.all():
+            ProductImage.objects.create(product=product)
+            FavoriteProduct.objects.create(product=product, client=client)
+
+        with self.assertNumQueries(1):
+            self.client.get('/product/image/')
+
+        self.client.force_authenticate(client)
+        with self.assertNumQueries(1):
+            response = self.client.get('/product/favorite/')
+        self.assertEqual(len(response.data), 10)
+
+
+@override_settings(CATALOGUE_CACHE_TIMEOUT=0)
+class ProductPaginationTests(TestCase):
+    """Test product list keyset pagination"""
+
+    def setUp(self):
+        self.client = APIClient()
+        product_type = ProductTypeFactory()
+        florist = UserFactory()
+        Product.objects.bulk_create([
+            Product(name=f'Букет {i}', description='Букет', size=ProductSize.SMALL, product_type=product_type, florist=florist)
+            for i in range(45)
+        ])
+        # Same creation date for a part of products to check ordering by id inside one date
+        first_products = Product.objects.order_by('id')[:10]
+        Product.objects.filter(id__in=first_products.values('id')).update(creation_date=first_products[0].creation_date)
+
+    def test_next_and_previous_pages_cover_all_products_once(self):
+        """
+        Test walking next and previous links returns every product once
+        :return: None
+        """
+
+        expected = list(Product.objects.order_by('-creation_date', '-id').values_list('id', flat=True))
+        pages = []
+        url = '/product/list/?page_size=10'
+        while url:
+            response = self.client.get(url)
+            pages.append([product['id'] for product in response.data['results']])
+            url = response.data['next']
+
+        self.assertEqual([len(page) for page in pages], [10, 10, 10, 10, 5])
+        self.assertEqual(sum(pages, []), expected)
+
+        response = self.client.get(response.data['previous'])
+        self.assertEqual([product['id'] for product in response.data['results']], pages[-2])
+
+    def test_invalid_cursor(self):
+        """
+        Test invalid cursor returns 404
+        :return: None
+        """
+
+        response = self.client.get('/product/list/?cursor=invalid')
+        self.assertEqual(response.status_code, 404)
+
+
+class ProductChoiceLabelTests(TestCase):
+    """Test integer coded choices keep their labels in API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.product_type = ProductTypeFactory()
+        self.florist = UserFactory()
+        for status in (ProductStatus.ON_SALE, ProductStatus.SOLD):
+            Product.objects.create(
+                name='Букет', description='Букет', price=100, size=ProductSize.LARGE,
+                product_type=self.product_type, florist=self.florist, status=status,
+            )
+
+    def test_list_filters_and_emits_labels(self):
+        """
+        Test product list accepts status label filter and returns labels
+        :return: None
+        """
+
+        self.client.force_authenticate(self.florist)
+        response = self.client.get('/product/list/', {'status': 'Продан'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['status'], 'Продан')
+        self.assertEqual(response.data['results'][0]['size'], 'Большой')
+
+    def test_create_accepts_label(self):
+        """
+        Test product create accepts size label and stores its code
+        :return: None
+        """
+
+        self.client.force_authenticate(self.florist)
+        response = self.client.post('/product/list/', {
+            'name': 'Букет', 'description': 'Букет', 'price_without_allowance': 100, 'size': 'Средний',
+            'product_type': self.product_type.pk, 'florist': self.florist.pk,
+        })
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['size'], 'Средний')
+        self.assertEqual(Product.objects.get(pk=response.data['id']).size, ProductSize.MEDIUM)
+
+
+class EmployeeHistoryTests(TestCase):
+    """Test employee history totals, pagination and query count"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.shop_branch = ShopBranchFactory()
+        self.product_type = ProductTypeFactory(courier_allowance=5)
+        self.florist = UserFactory(username='florist', shop_branch=self.shop_branch)
+        self.courier = UserFactory(username='courier', user_type=UserType.COURIER, shop_branch=self.shop_branch)
+
+    def deliver_orders(self, quantity, products_per_order=2):
+        for _ in range(quantity):
+            cart = Cart.objects.create()
+            for _ in range(products_per_order):
+                product = Product.objects.create(
+                    name='Букет', description='Букет', price=100, price_without_allowance=100,
+                    size=ProductSize.SMALL, product_type=self.product_type, florist=self.florist,
+                )
+                CartProduct.objects.create(cart=cart, product=product)
+            order = Order.objects.create(
+                cart=cart, address='Юнусалиева 123', received_date=datetime.date.today(),
+                received_time=datetime.time(12, 0), courier=self.courier, status=OrderStatus.COURIER_HAS_ORDER,
+            )
+            settle_order(order)
+
+    def test_florist_history(self):
+        """
+        Test florist history pages sold products and sums all earnings
+        :return: None
+        """
+
+        self.deliver_orders(15)
+        self.client.force_authenticate(self.florist)
+
+        response = self.client.get('/employee-history/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['products']), 20)
+        self.assertEqual(response.data['total_earnings'], Decimal('300'))
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['products']), 10)
+        self.assertIsNone(response.data['next'])
+
+    def test_courier_history(self):
+        """
+        Test courier history returns order products and payouts
+        :return: None
+        """
+
+        self.deliver_orders(3)
+        self.client.force_authenticate(self.courier)
+
+        response = self.client.get('/employee-history/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_earnings'], Decimal('30'))
+        self.assertEqual(len(response.data['order']), 3)
+        self.assertEqual(Decimal(response.data['order'][0]['courier_percent']), Decimal('10'))
+        self.assertEqual(len(response.data['order'][0]['products']), 2)
+
+    def test_since(self):
+        """
+        Test since param limits history and earnings
+        :return: None
+        """
+
+        self.deliver_orders(2)
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+
+        for user, key in ((self.florist, 'products'), (self.courier, 'order')):
+            self.client.force_authenticate(user)
+            response = self.client.get('/employee-history/', {'since': tomorrow.isoformat()})
+            self.assertEqual(response.data[key], [])
+            self.assertEqual(response.data['total_earnings'], 0)
+
+        response = self.client.get('/employee-history/', {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_query_count(self):
+        """
+        Test history runs a fixed number of queries whatever history size
+        :return: None
+        """
+
+        for user, queries in ((self.florist, 2), (self.courier, 4)):
+            self.client.force_authenticate(user)
+            self.deliver_orders(1)
+            with self.subTest(user=user.username), self.assertNumQueries(queries):
+                self.client.get('/employee-history/')
+            self.deliver_orders(20)
+            with self.subTest(user=user.username), self.assertNumQueries(queries):
+                self.client.get('/employee-history/')
+
+
+class CatalogueCacheTests(TestCase):
+    """Test catalogue read-through cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.product_types = [ProductTypeFactory(title=title) for title in ('Букет', 'Корзина')]
+        self.florist = UserFactory()
+        for product_type in self.product_types:
+            self.create_product(product_type)
+
+    def create_product(self, product_type):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Product.objects.create(
+                name='Букет', description='Букет', price=100, size=ProductSize.SMALL,
+                product_type=product_type, florist=self.florist,
+            )
+
+    def test_hit_and_miss(self):
+        """
+        Test repeated anonymous request is served from cache and counted
+        :return: None
+        """
+
+        reset_catalogue_cache_stats()
+        self.client.get('/product/list/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/product/list/')
+
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(get_catalogue_cache_stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_keyed_by_filter_params(self):
+        """
+        Test filter params get their own cache entries
+        :return: None
+        """
+
+        self.client.get('/product/list/')
+        response = self.client.get('/product/list/', {'product_type__title': 'Букет'})
+
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_product_changes_invalidate_cache(self):
+        """
+        Test product, product type and image changes drop cached responses
+        :return: None
+        """
+
+        self.client.get('/product/list/')
+        product = self.create_product(self.product_types[0])
+        self.assertEqual(len(self.client.get('/product/list/').data['results']), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductType.objects.filter(pk=self.product_types[0].pk).first().save()
+        with self.assertNumQueries(1):
+            self.client.get('/product/list/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductImage.objects.create(product=product)
+        with self.assertNumQueries(1):
+            self.client.get('/product/list/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertEqual(len(self.client.get('/product/list/').data['results']), 2)
+
+    def test_employee_requests_are_not_cached(self):
+        """
+        Test florist gets own products bypassing cache
+        :return: None
+        """
+
+        self.client.get('/product/list/')
+        self.client.force_authenticate(self.florist)
+        with self.assertNumQueries(1):
+            self.client.get('/product/list/')
+
+    def test_shared_backend(self):
+        """
+        Test cache works with file based backend shared between processes
+        :return: None
+        """
+
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+        }):
+            self.client.get('/product/list/')
+            with self.assertNumQueries(0):
+                self.client.get('/product/list/')
+            self.create_product(self.product_types[1])
+            self.assertEqual(len(self.client.get('/product/list/').data['results']), 3)
+
+
+class ProductConditionalGetTests(TestCase):
+    """Test product list ETag and Last-Modified"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        product_type = ProductTypeFactory()
+        self.florist = UserFactory()
+        self.product = Product.objects.create(
+            name='Букет', description='Букет', price=100, size=ProductSize.SMALL,
+            product_type=product_type, florist=self.florist,
+        )
+
+    def test_not_modified(self):
+        """
+        Test unchanged product list returns 304 by ETag and by Last-Modified
+        :return: None
+        """
+
+        self.client.force_authenticate(self.florist)
+        response = self.client.get('/product/list/')
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/product/list/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        response = self.client.get('/product/list/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get('/product/list/', {'status': 'Продан'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_changed_product_changes_etag(self):
+        """
+        Test product update and delete change ETag
+        :return: None
+        """
+
+        self.client.force_authenticate(self.florist)
+        etag = self.client.get('/product/list/')['ETag']
+
+        self.product.name = 'Новый букет'
+        self.product.save()
+        response = self.client.get('/product/list/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        self.product.delete()
+        response = self.client.get('/product/list/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_changed_product_type_changes_etag(self):
+        """
+        Test product type and florist edits change ETag of unchanged products
+        :return: None
+        """
+
+        self.client.force_authenticate(self.florist)
+        etag = self.client.get('/product/list/')['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductType.objects.filter(pk=self.product.product_type_id).get().save()
+        response = self.client.get('/product/list/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.florist.username = 'Новый флорист'
+            self.florist.save()
+        response = self.client.get('/product/list/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['florist']['username'], 'Новый флорист')
+
+        self.client.force_authenticate(None)
+        etag = self.client.get('/product/list/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            product_type = ProductType.objects.get(pk=self.product.product_type_id)
+            product_type.title = 'Корзина'
+            product_type.save()
+        response = self.client.get('/product/list/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['product_type']['title'], 'Корзина')
+
+    def test_cached_catalogue_not_modified(self):
+        """
+        Test cached catalogue answers 304 without database queries
+        :return: None
+        """
+
+        etag = self.client.get('/product/list/')['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/product/list/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class BouquetAssemblyTests(TestCase):
+    """Test bulk bouquet assembly"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.product_type = ProductTypeFactory()
+        self.florist = UserFactory()
+        self.product = Product.objects.create(
+            name='Букет', description='Букет', size=ProductSize.SMALL,
+            product_type=self.product_type, florist=self.florist,
+        )
+        self.flowers = Flower.objects.bulk_create([
+            Flower(name=f'Роза {i}', price=10, total_quantity=5) for i in range(20)
+        ])
+        self.flowers = list(Flower.objects.order_by('pk'))
+        self.client.force_authenticate(self.florist)
+
+    def assemble(self, lines, idempotency_key=None):
+        headers = {'HTTP_IDEMPOTENCY_KEY': idempotency_key} if idempotency_key else {}
+        return self.client.post('/product/flower/bulk/', {
+            'product': self.product.pk,
+            'flowers': [{'flower': flower.pk, 'quantity': quantity} for flower, quantity in lines],
+        }, format='json', **headers)
+
+    def test_assemble_bouquet(self):
+        """
+        Test whole bouquet is added, reserved and priced with a fixed number of queries
+        :return: None
+        """
+
+        with self.assertNumQueries(17):
+            response = self.assemble([(flower, 2) for flower in self.flowers])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['flowers']), 20)
+        self.assertEqual(response.data['price_without_allowance'], 400)
+        self.assertEqual(response.data['price'], 520)
+        self.assertEqual(set(Flower.objects.values_list('reserved_quantity', flat=True)), {2})
+        self.assertEqual(FlowerMovement.objects.count(), 20)
+
+    def test_insufficient_stock_rejects_whole_bouquet(self):
+        """
+        Test one short flower line rejects every line
+        :return: None
+        """
+
+        response = self.assemble([(self.flowers[0], 2), (self.flowers[1], 3), (self.flowers[1], 3)])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ProductFlower.objects.exists())
+        self.assertEqual(set(Flower.objects.values_list('reserved_quantity', flat=True)), {0})
+
+    def test_idempotent_assembly(self):
+        """
+        Test repeated assembly with the same idempotency key reserves once
+        :return: None
+        """
+
+        self.assemble([(self.flowers[0], 5)], idempotency_key='bouquet-1')
+        response = self.assemble([(self.flowers[0], 5)], idempotency_key='bouquet-1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['flowers']), 1)
+        self.flowers[0].refresh_from_db()
+        self.assertEqual(self.flowers[0].reserved_quantity, 5)
+
+        Product.objects.filter(pk=self.product.pk).update(status=ProductStatus.SOLD)
+        response = self.assemble([(self.flowers[0], 5)], idempotency_key='bouquet-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], self.product.pk)
+
+    def test_other_florist_product(self):
+        """
+        Test florist can not assemble other florist product
+        :return: None
+        """
+
+        other = UserFactory()
+        self.client.force_authenticate(other)
+
+        response = self.assemble([(self.flowers[0], 1)])
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(ProductFlower.objects.exists())
+
+
+class CatalogueTransferTests(TestCase):
+    """Test streaming product and flower import and export"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.product_type = ProductTypeFactory()
+        self.florist = UserFactory()
+        self.admin = UserFactory(user_type=UserType.ADMIN)
+
+    def upload(self, url, name, content):
+        return self.client.post(url, {'file': SimpleUploadedFile(name, content.encode('utf-8'))})
+
+    def test_csv_product_import(self):
+        """
+        Test valid rows are imported with a few batched queries and invalid rows are reported
+        :return: None
+        """
+
+        rows = ['name,description,product_type,size,price_without_allowance']
+        rows += [f'Букет {i},Розы,Букет,Маленький,100' for i in range(1000)]
+        rows += ['Букет,Розы,Корзина,Маленький,100', 'Букет,Розы,Букет,Огромный,100']
+        self.client.force_authenticate(self.florist)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.upload('/product/import/', 'products.csv', '\n'.join(rows))
+        self.assertLessEqual(len(queries), 20)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 1000)
+        self.assertEqual([error['row'] for error in response.data['errors']], [1001, 1002])
+        self.assertIn('product_type', response.data['errors'][0]['errors'])
+        self.assertIn('size', response.data['errors'][1]['errors'])
+        product = Product.objects.first()
+        self.assertEqual((product.florist, product.price), (self.florist, 130))
+
+    def test_jsonl_product_import_by_admin(self):
+        """
+        Test admin imports products of florist given by phone
+        :return: None
+        """
+
+        rows = [
+            json.dumps({'name': 'Букет', 'description': 'Розы', 'product_type': 'Букет', 'size': 'Средний',
+                        'florist': self.florist.phone}),
+            '{not json',
+            json.dumps({'name': 'Букет', 'description': 'Розы', 'product_type': 'Букет', 'size': 'Средний'}),
+        ]
+        self.client.force_authenticate(self.admin)
+
+        response = self.upload('/product/import/', 'products.jsonl', '\n'.join(rows))
+
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3])
+        self.assertIn('florist', response.data['errors'][1]['errors'])
+        self.assertEqual(Product.objects.get().florist, self.florist)
+
+    def test_flower_import(self):
+        """
+        Test flower import updates flowers found by name and reprices their products
+        :return: None
+        """
+
+        rose = Flower.objects.create(name='Роза', price=50, total_quantity=10, reserved_quantity=2)
+        product = Product.objects.create(
+            name='Букет', description='Букет', size=ProductSize.SMALL,
+            product_type=self.product_type, florist=self.florist,
+        )
+        ProductFlower.objects.create(product=product, flower=rose, quantity=2)
+        self.client.force_authenticate(self.admin)
+
+        response = self.upload('/flower/import/', 'flowers.csv', '\n'.join([
+            'name,price,total_quantity', 'Роза,100,20', 'Тюльпан,30,40', 'Роза,100,1',
+        ]))
+
+        self.assertEqual((response.data['created'], response.data['updated']), (1, 1))
+        self.assertEqual(response.data['errors'][0]['row'], 3)
+        rose.refresh_from_db()
+        self.assertEqual((rose.price, rose.total_quantity), (100, 20))
+        self.assertEqual(Flower.objects.get(name='Тюльпан').total_quantity, 40)
+        product.refresh_from_db()
+        self.assertEqual(product.price, 260)
+        self.assertEqual(
+            list(FlowerMovement.objects.values_list('flower', 'movement_type', 'quantity')),
+            [(rose.pk, FlowerMovementType.RECEIPT, 10)],
+        )
+
+    def test_export(self):
+        """
+        Test products and flowers are streamed as CSV and JSON lines
+        :return: None
+        """
+
+        for i in range(3):
+            Product.objects.create(
+                name=f'Букет {i}', description='Букет', size=ProductSize.SMALL,
+                product_type=self.product_type, florist=self.florist,
+            )
+        Flower.objects.create(name='Роза', price=50, total_quantity=10)
+        self.client.force_authenticate(self.florist)
+
+        response = self.client.get('/product/export/')
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith('id,name,description,product_type,size,status'))
+        self.assertIn('Букет 0,Букет,Букет,Маленький,На продаже', lines[1])
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/flower/export/', {'file_format': 'jsonl'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode('utf-8').splitlines()]
+        self.assertEqual(rows[0]['name'], 'Роза')
+        self.assertEqual(rows[0]['total_quantity'], 10)
@@ -0,0 +1,256 @@
+import uuid
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from rest_framework import serializers
+
+from core.constants import FlowerMovementType, ProductSize, ProductStatus, UserType
+from core.fields import LabelChoiceField
+from core.streaming import EXPORT_CHUNK_SIZE, iter_chunks
+from apps.product.cache import bump_catalogue_version
+from apps.product.models import Flower, FlowerMovement, Product, ProductType
+from apps.product.services import reprice_products
+from apps.users.models import User
+
+IMPORT_BATCH_SIZE = 500
+
+PRODUCT_EXPORT_HEADER = (
+    'id', 'name', 'description', 'product_type', 'size', 'status',
+    'price_without_allowance', 'price', 'florist', 'creation_date',
+)
+FLOWER_EXPORT_HEADER = ('id', 'name', 'price', 'total_quantity', 'reserved_quantity')
+RESERVED_ERROR = 'Количество меньше зарезервированного в букетах'
+
+
+class ProductImportSerializer(serializers.Serializer):
+    """
+    Product import row serializer, product type and florist are looked up
+    in lookups cached by import
+    """
+
+    name = serializers.CharField(max_length=255)
+    description = serializers.CharField()
+    product_type = serializers.CharField()
+    size = LabelChoiceField(ProductSize.choices)
+    price_without_allowance = serializers.DecimalField(max_digits=9, decimal_places=1, min_value=0, default=Decimal(0))
+    florist = serializers.CharField(required=False)
+
+    def validate_product_type(self, value):
+        product_type = self.context['product_types'].get(value)
+        if product_type is None:
+            raise serializers.ValidationError('Тип продукта не найден')
+        return product_type
+
+    def validate_florist(self, value):
+        florist = self.context['florist'] or self.context['florists'].get(value)
+        if florist is None:
+            raise serializers.ValidationError('Флорист не найден')
+        return florist
+
+    def validate(self, attrs):
+        attrs.setdefault('florist', self.context['florist'])
+        if attrs['florist'] is None:
+            raise serializers.ValidationError({'florist': 'Обязательное поле.'})
+        return attrs
+
+
+class FlowerImportSerializer(serializers.Serializer):
+    """Flower import row serializer"""
+
+    name = serializers.CharField(max_length=255)
+    price = serializers.DecimalField(max_digits=9, decimal_places=1, min_value=0)
+    total_quantity = serializers.IntegerField(min_value=0)
+
+
+def validate_chunk(chunk, serializer_class, context, errors):
+    """
+    Validate chunk rows, collect errors of invalid ones
+    :param chunk: list of (row number, row) tuples
+    :param serializer_class: row serializer class
+    :param context: dict, serializer context with cached lookups
+    :param errors: list, errors of invalid rows are appended to it
+    :return: list of (row number, validated data) tuples
+    """
+
+    validated = []
+    for number, row in chunk:
+        if row is None:
+            errors.append({'row': number, 'errors': {'non_field_errors': ['Неверный формат строки']}})
+            continue
+        serializer = serializer_class(data=row, context=context)
+        if serializer.is_valid():
+            validated.append((number, serializer.validated_data))
+        else:
+            errors.append({'row': number, 'errors': serializer.errors})
+    return validated
+
+
+def cache_lookup(cache, queryset, field, values):
+    """
+    Load objects missing in lookup cache with one query
+    :param cache: dict, {field value: object}
+    :param queryset: queryset of looked up objects
+    :param field: str, lookup field
+    :param values: iterable of looked up values
+    :return: None
+    """
+
+    missing = {value for value in values if value and value not in cache}
+    if missing:
+        cache.update({getattr(obj, field): obj for obj in queryset.filter(**{f'{field}__in': missing})})
+
+
+def get_product_price(price_without_allowance, product_type):
+    total_allowance = sum(
+        allowance or 0
+        for allowance in (product_type.allowance, product_type.florist_allowance, product_type.courier_allowance)
+    )
+    price = price_without_allowance + price_without_allowance * total_allowance / 100
+    return price.quantize(Decimal('0.1'))
+
+
+def import_products(rows, user, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import products from rows validated and inserted in batches.
+    Florist imports own products, admin gives florist phone in florist column
+    :param rows: iterable of dicts, None for unreadable rows
+    :param user: User importing products
+    :param batch_size: int, rows validated and inserted together
+    :return: dict, quantity of created products and row errors
+    """
+
+    context = {
+        'product_types': {},
+        'florists': {},
+        'florist': user if user.user_type == UserType.FLORIST else None,
+    }
+    florists = User.objects.filter(user_type=UserType.FLORIST)
+    result = {'created': 0, 'errors': []}
+    for chunk in iter_chunks(enumerate(rows, start=1), batch_size):
+        chunk_rows = [row for _, row in chunk if row is not None]
+        cache_lookup(context['product_types'], ProductType.objects.all(), 'title',
+                     (row.get('product_type') for row in chunk_rows))
+        if context['florist'] is None:
+            cache_lookup(context['florists'], florists, 'phone', (row.get('florist') for row in chunk_rows))
+
+        products = []
+        for _, data in validate_chunk(chunk, ProductImportSerializer, context, result['errors']):
+            product = Product(
+                name=data['name'], description=data['description'], product_type=data['product_type'],
+                size=data['size'], price_without_allowance=data['price_without_allowance'],
+                price=get_product_price(data['price_without_allowance'], data['product_type']),
+                florist=data['florist'],
+            )
+            product.set_freshness()
+            products.append(product)
+        result['created'] += len(Product.objects.bulk_create(products))
+
+    if result['created']:
+        bump_catalogue_version()
+    return result
+
+
+def write_flower_chunk(to_create, to_update, key_prefix):
+    """
+    Write adjustment movements of found flowers, apply their new total
+    quantity with one UPDATE and price with one bulk UPDATE, then insert
+    new flowers
+    :param to_create: list of Flower
+    :param to_update: dict, {flower id: (row number, Flower, validated data)}
+    :param key_prefix: str, idempotency key prefix of movements
+    :return: None
+    """
+
+    adjustments = {
+        flower_id: data['total_quantity'] - flower.total_quantity
+        for flower_id, (_, flower, data) in to_update.items()
+    }
+    FlowerMovement.objects.bulk_create([
+        FlowerMovement(
+            flower_id=flower_id, quantity=abs(quantity),
+            movement_type=FlowerMovementType.RECEIPT if quantity > 0 else FlowerMovementType.WRITE_OFF,
+            idempotency_key=f'{key_prefix}-row-{to_update[flower_id][0]}',
+        )
+        for flower_id, quantity in adjustments.items() if quantity
+    ])
+    if any(adjustments.values()):
+        Flower.objects.filter(pk__in=[flower_id for flower_id, quantity in adjustments.items() if quantity]).update(
+            total_quantity=F('total_quantity') + Case(
+                *[When(pk=flower_id, then=Value(quantity)) for flower_id, quantity in adjustments.items()],
+                default=Value(0),
+            ),
+        )
+    Flower.objects.bulk_update(
+        [Flower(pk=flower_id, price=data['price']) for flower_id, (_, _, data) in to_update.items()], ['price']
+    )
+    Flower.objects.bulk_create(to_create)
+
+
+def import_flowers(rows, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import flowers from rows validated and written in batches.
+    Flowers are matched by name and locked, found ones get new price and
+    total quantity recorded as receipt or write-off movement
+    :param rows: iterable of dicts, None for unreadable rows
+    :param batch_size: int, rows validated and written together
+    :return: dict, quantity of created and updated flowers and row errors
+    """
+
+    flowers = {}
+    repriced = set()
+    key_prefix = f'import-{uuid.uuid4().hex}'
+    result = {'created': 0, 'updated': 0, 'errors': []}
+    with transaction.atomic():
+        for chunk in iter_chunks(enumerate(rows, start=1), batch_size):
+            cache_lookup(flowers, Flower.objects.select_for_update().order_by('pk'), 'name',
+                         (row.get('name') for _, row in chunk if row is not None))
+            to_create, to_update = {}, {}
+            for number, data in validate_chunk(chunk, FlowerImportSerializer, {}, result['errors']):
+                flower = flowers.get(data['name']) or to_create.get(data['name'])
+                if flower is None:
+                    to_create[data['name']] = Flower(**data)
+                elif not flower.pk:
+                    flower.price, flower.total_quantity = data['price'], data['total_quantity']
+                elif data['total_quantity'] < flower.reserved_quantity:
+                    result['errors'].append({'row': number, 'errors': {'total_quantity': [RESERVED_ERROR]}})
+                else:
+                    to_update[flower.pk] = (number, flower, data)
+
+            write_flower_chunk(to_create.values(), to_update, key_prefix)
+
+            for _, flower, data in to_update.values():
+                if flower.price != data['price']:
+                    repriced.add(flower.pk)
+                flower.price, flower.total_quantity = data['price'], data['total_quantity']
+            result['created'] += len(to_create)
+            result['updated'] += len(to_update)
+        if repriced:
+            reprice_products(Product.objects.filter(productflower__flower__in=repriced))
+    return result
+
+
+def export_products(queryset):
+    """
+    Product export rows read from database in chunks
+    :param queryset: Product queryset
+    :return: generator of row tuples
+    """
+
+    sizes, statuses = dict(ProductSize.choices), dict(ProductStatus.choices)
+    rows = queryset.order_by('pk').values_list(
+        'id', 'name', 'description', 'product_type__title', 'size', 'status',
+        'price_without_allowance', 'price', 'florist__phone', 'creation_date',
+    )
+    for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield (*row[:4], sizes.get(row[4]), statuses.get(row[5]), *row[6:9], row[9].isoformat())
+
+
+def export_flowers(queryset):
+    """
+    Flower export rows read from database in chunks
+    :param queryset: Flower queryset
+    :return: generator of row tuples
+    """
+
+    return queryset.order_by('pk').values_list(*FLOWER_EXPORT_HEADER).iterator(chunk_size=EXPORT_CHUNK_SIZE)
@@ -11,7 +11,11 @@ from apps.product.views import (
     FavoriteProductView,
     NewProductView,
     EmployeeHistoryView,
-    RevenueStatisticView,
+    BouquetAssemblyView,
+    ProductImportView,
+    ProductExportView,
+    FlowerImportView,
+    FlowerExportView,
 )
 
 
@@ -29,10 +33,14 @@ router.register('favorite', FavoriteProductView)
 
 
 urlpatterns = [
+    path('product/flower/bulk/', BouquetAssemblyView.as_view()),
+    path('product/import/', ProductImportView.as_view()),
+    path('product/export/', ProductExportView.as_view()),
+    path('flower/import/', FlowerImportView.as_view()),
+    path('flower/export/', FlowerExportView.as_view()),
     path('product/', include(router.urls)),
     path('flower/', include(router2.urls)),
     path('new-product/', NewProductView.as_view()),
     path("employee-history/", EmployeeHistoryView.as_view(), name="employee_history"),
-    path("statistic/revenue/", RevenueStatisticView.as_view(), name="revenue_statistic"),
 
 ]
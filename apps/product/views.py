@@ -1,15 +1,34 @@
 import datetime
-import decimal
+import os
+import uuid
 
-from django.db.models import Sum
-from django.db.models.functions import TruncMonth, TruncWeek
+from django.db import transaction
+from django.db.models import DecimalField, F, Sum
+from django.utils import timezone
 
-from apps.order.models import Order
+from apps.order.models import CartProduct, Order, COURIER_PAYOUT
 from apps.order.serializers import CourierHistorySerializer
+from apps.product.cache import CatalogueCacheMixin
+from apps.product.transfer import (
+    FLOWER_EXPORT_HEADER,
+    PRODUCT_EXPORT_HEADER,
+    export_flowers,
+    export_products,
+    import_flowers,
+    import_products,
+)
+from apps.product.services import (
+    StockError,
+    assemble_bouquet,
+    move_flower_stock,
+    move_product_flowers,
+    reprice_products,
+)
 from apps.product.models import (
     Product,
     ProductType,
     Flower,
+    FlowerMovement,
     ProductFlower,
     ProductImage,
     FavoriteProduct,
@@ -23,6 +42,8 @@ from apps.product.serializers import (
     ProductImageSerializer,
     FavoriteProductSerializer,
     FloristHistorySerializer,
+    BouquetAssemblySerializer,
+    BouquetFlowerLineSerializer,
 )
 from apps.users.permissions import (
     IsClient,
@@ -31,14 +52,33 @@ from apps.users.permissions import (
     IsFloristOrReadOnly,
     IsFloristOrAdminOnlyUpdateOrReadOnly,
 )
-from django_filters.rest_framework import DjangoFilterBackend
+from core.constants import FlowerMovementType, OrderStatus, ProductStatus, UserType
+from core.filters import DjangoFilterBackend
+from core.mixins import ConditionalListMixin, EagerLoadingMixin, get_related_lookups
+from core.pagination import KeysetPagination
+from core.streaming import IMPORT_FORMATS, STREAM_FORMATS, get_streaming_response, read_rows
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
 
+def get_client_idempotency_key(request):
+    """
+    Idempotency-Key header scoped to request user, so client keys never
+    collide with keys of other users or with server movement keys
+    :param request: Request
+    :return: str or None
+    """
+
+    idempotency_key = request.headers.get('Idempotency-Key')
+    if idempotency_key:
+        return f'client-{request.user.pk}-{idempotency_key}'
+    return None
+
+
 class ProductTypeView(ModelViewSet):
     """Product type View"""
 
@@ -47,34 +87,37 @@ class ProductTypeView(ModelViewSet):
     permission_classes = (IsAdmin,)
 
 
-class ProductView(ModelViewSet):
+class ProductView(CatalogueCacheMixin, ConditionalListMixin, EagerLoadingMixin, ModelViewSet):
     """Product View"""
 
     def get_serializer_class(self):
         """Filter serializer by user type"""
 
         user = self.request.user
-        if user.is_anonymous or user.user_type == 'florist' or user.user_type == 'client':
+        if user.is_anonymous or user.user_type in (UserType.FLORIST, UserType.CLIENT, UserType.COURIER):
             return ProductSerializer
-        elif user.user_type == 'admin':
+        elif user.user_type == UserType.ADMIN:
             return ProductAdminSerializer
 
     serializer_class = get_serializer_class
     queryset = Product.objects.all().order_by('-id')
     permission_classes = (IsFloristOrAdminOnlyUpdateOrReadOnly, )
+    pagination_class = KeysetPagination
+    ordering = ('-creation_date', '-id')
     filter_backends = [DjangoFilterBackend]
-    filter_fields = ['status', 'product_type__title']
+    filter_fields = ['status', 'product_type__title', 'freshness']
 
     def get_queryset(self):
         """Filter queryset by user type"""
 
         user = self.request.user
-        if user.is_anonymous or user.user_type == 'client' or user.user_type == 'courier':
-            return self.queryset.filter(status='На продаже')
-        elif user.user_type == 'admin':
-            return self.queryset
-        elif user.user_type == 'florist':
-            return self.queryset.filter(florist=user)
+        queryset = super().get_queryset()
+        if user.is_anonymous or user.user_type == UserType.CLIENT or user.user_type == UserType.COURIER:
+            return queryset.filter(status=ProductStatus.ON_SALE)
+        elif user.user_type == UserType.ADMIN:
+            return queryset
+        elif user.user_type == UserType.FLORIST:
+            return queryset.filter(florist=user)
 
     def perform_create(self, serializer):
         serializer.save(florist=self.request.user)
@@ -82,6 +125,22 @@ class ProductView(ModelViewSet):
     def perform_update(self, serializer):
         serializer.save(florist=self.request.user)
 
+    def destroy(self, request, *args, **kwargs):
+        try:
+            return super().destroy(request, *args, **kwargs)
+        except StockError as error:
+            return Response({str(error)}, status=status.HTTP_409_CONFLICT)
+
+    def perform_destroy(self, instance):
+        """Release reserved flowers of deleted product on sale"""
+
+        with transaction.atomic():
+            if instance.status == ProductStatus.ON_SALE:
+                move_product_flowers(
+                    Product.objects.filter(pk=instance.pk), FlowerMovementType.RELEASE, f'product-{instance.pk}-release'
+                )
+            instance.delete()
+
 
 class FlowerView(ModelViewSet):
     """Flower View"""
@@ -95,7 +154,7 @@ class ProductFlowerView(ModelViewSet):
     """Product-flower View"""
 
     serializer_class = ProductFlowerSerializer
-    queryset = ProductFlower.objects.filter(product__status='На продаже')
+    queryset = ProductFlower.objects.filter(product__status=ProductStatus.ON_SALE)
     permission_classes = (IsFlorist,)
 
     def get_queryset(self):
@@ -106,53 +165,222 @@ class ProductFlowerView(ModelViewSet):
 
     def create(self, request, *args, **kwargs):
         """
-        Create product-flower with auto product price calculation
-        and count flower quantity
+        Create product-flower with auto product price calculation and
+        flower reservation. Request repeated with the same Idempotency-Key
+        header returns the first product-flower without reserving again
         """
 
+        idempotency_key = get_client_idempotency_key(request) or uuid.uuid4().hex
+        movement = FlowerMovement.objects.filter(idempotency_key=idempotency_key) \
+            .select_related('product_flower__product').first()
+        if movement is not None:
+            return self.get_replayed_response(movement)
+
         serializer = ProductFlowerSerializer(data=request.data)
         if serializer.is_valid():
-            flower = serializer.validated_data['flower']
             product = serializer.validated_data['product']
             quantity = serializer.validated_data['quantity']
-            if product.florist == self.request.user:
-                flower.total_quantity -= quantity
-                flower.save()
-                serializer.save()
-                allowance = product.product_type.allowance
-                florist_allowance = product.product_type.florist_allowance
-                courier_allowance = product.product_type.courier_allowance
-                total_allowance = florist_allowance + courier_allowance + allowance
-                product.price_without_allowance += decimal.Decimal(serializer.data['price'])
-                product.price += decimal.Decimal(serializer.data['price']) \
-                                 + (decimal.Decimal(serializer.data['price']) / 100 * total_allowance)
-                product.save()
+            if product.florist_id == self.request.user.pk:
+                try:
+                    with transaction.atomic():
+                        product_flower = serializer.save()
+                        movement, created = move_flower_stock(
+                            product_flower.flower_id, FlowerMovementType.RESERVE, quantity,
+                            idempotency_key, product_flower=product_flower,
+                        )
+                        if not created:
+                            transaction.set_rollback(True)
+                        else:
+                            reprice_products(Product.objects.filter(pk=product.pk))
+                except StockError as error:
+                    return Response({str(error)}, status=status.HTTP_409_CONFLICT)
+                if not created:
+                    return self.get_replayed_response(movement)
                 return Response(serializer.data)
 
-            elif product.florist != self.request.user:
+            elif product.florist_id != self.request.user.pk:
                 return Response({'Этот продукт принадлежит другому флористу'}, status=status.HTTP_403_FORBIDDEN)
 
         return Response(serializer.errors)
 
+    def get_replayed_response(self, movement):
+        if movement.product_flower is None:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        if movement.product_flower.product.florist_id != self.request.user.pk:
+            return Response({'Этот продукт принадлежит другому флористу'}, status=status.HTTP_403_FORBIDDEN)
+        return Response(ProductFlowerSerializer(movement.product_flower).data)
+
     def destroy(self, request, *args, **kwargs):
         """
         Delete product-flower with auto product price calculation
-        and count flower quantity
+        and release of its reserved flowers
         """
 
         instance = self.get_object()
-        instance.flower.total_quantity += instance.quantity
-        instance.flower.save()
-        product_type = instance.product.product_type
-        total_allowance = product_type.florist_allowance + product_type.courier_allowance + product_type.allowance
-        instance.product.price -= instance.price + (instance.price / 100 * total_allowance)
-        instance.product.price_without_allowance -= instance.price
-        instance.product.save()
-        self.perform_destroy(instance)
+        try:
+            with transaction.atomic():
+                movement, created = move_flower_stock(
+                    instance.flower_id, FlowerMovementType.RELEASE, instance.quantity,
+                    f'product-flower-{instance.pk}-release', product_flower=instance,
+                )
+                if not created and movement.product_flower_id != instance.pk:
+                    raise StockError('Снятие резерва с этим ключом уже записано для другой позиции')
+                self.perform_destroy(instance)
+                # Bouquet without flowers left costs nothing
+                Product.objects.filter(pk=instance.product_id) \
+                    .exclude(productflower__isnull=False) \
+                    .update(price_without_allowance=0, price=0, update_datetime=timezone.now())
+                reprice_products(Product.objects.filter(pk=instance.product_id))
+        except StockError as error:
+            return Response({str(error)}, status=status.HTTP_409_CONFLICT)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class ProductImageView(ModelViewSet):
+class BouquetAssemblyView(APIView):
+    """
+    Bouquet assembly view, adds the whole flower list to florist product
+    in one request. Request repeated with the same Idempotency-Key header
+    returns the bouquet without reserving again
+    """
+
+    permission_classes = (IsFlorist,)
+
+    def post(self, request):
+        idempotency_key = get_client_idempotency_key(request)
+        if idempotency_key and FlowerMovement.objects.filter(
+            idempotency_key__startswith=f'{idempotency_key}-flower-'
+        ).exists():
+            return self.get_replayed_response(request)
+
+        serializer = BouquetAssemblySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        product = serializer.validated_data['product']
+        if product.florist_id != request.user.pk:
+            return Response({'Этот продукт принадлежит другому флористу'}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            created = assemble_bouquet(
+                product, serializer.validated_data['quantities'], idempotency_key or uuid.uuid4().hex
+            )
+        except StockError as error:
+            return Response({str(error)}, status=status.HTTP_409_CONFLICT)
+        return self.get_bouquet_response(product.pk, status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    def get_replayed_response(self, request):
+        """
+        Bouquet of already applied assembly, stock and sale status
+        are not validated again
+        :param request: Request
+        :return: Response
+        """
+
+        try:
+            product = Product.objects.filter(pk=request.data.get('product')).values('id', 'florist').first()
+        except (TypeError, ValueError):
+            product = None
+        if product is None:
+            return Response({'Продукт не найден'}, status=status.HTTP_404_NOT_FOUND)
+        if product['florist'] != request.user.pk:
+            return Response({'Этот продукт принадлежит другому флористу'}, status=status.HTTP_403_FORBIDDEN)
+        return self.get_bouquet_response(product['id'], status.HTTP_200_OK)
+
+    @staticmethod
+    def get_bouquet_response(product_id, response_status):
+        product = Product.objects.values('id', 'price_without_allowance', 'price').get(pk=product_id)
+        flowers = ProductFlower.objects.filter(product=product_id).order_by('id')
+        return Response(
+            {**product, 'flowers': BouquetFlowerLineSerializer(flowers, many=True).data},
+            status=response_status,
+        )
+
+
+class CatalogueImportView(APIView):
+    """
+    Catalogue import view, reads uploaded CSV or JSON lines file row by row
+    and reports errors of every invalid row
+    """
+
+    import_function = None
+
+    def post(self, request):
+        file = request.FILES.get('file')
+        if file is None:
+            return Response({'Файл не передан'}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = os.path.splitext(file.name)[1].lstrip('.').lower()
+        if file_format not in IMPORT_FORMATS:
+            return Response({'Поддерживаются только файлы csv и jsonl'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.import_function(read_rows(file, file_format), **self.get_import_kwargs()))
+
+    def get_import_kwargs(self):
+        return {}
+
+
+class CatalogueExportView(APIView):
+    """
+    Catalogue export view, streams CSV, JSON lines or XLSX file chosen by
+    file_format param without holding the whole table in memory
+    """
+
+    queryset = None
+    export_function = None
+    header = ()
+    filename = None
+
+    def get(self, request):
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in STREAM_FORMATS:
+            return Response({'Поддерживаются только форматы csv, jsonl и xlsx'}, status=status.HTTP_400_BAD_REQUEST)
+        rows = self.export_function(self.get_queryset())
+        return get_streaming_response(self.header, rows, file_format, self.filename)
+
+    def get_queryset(self):
+        return self.queryset.all()
+
+
+class ProductImportView(CatalogueImportView):
+    """Product import view for florists and admins"""
+
+    permission_classes = (IsFlorist | IsAdmin,)
+    import_function = staticmethod(import_products)
+
+    def get_import_kwargs(self):
+        return {'user': self.request.user}
+
+
+class ProductExportView(CatalogueExportView):
+    """Product export view, florists export their own products"""
+
+    permission_classes = (IsFlorist | IsAdmin,)
+    queryset = Product.objects.all()
+    export_function = staticmethod(export_products)
+    header = PRODUCT_EXPORT_HEADER
+    filename = 'products'
+
+    def get_queryset(self):
+        products = super().get_queryset()
+        if self.request.user.user_type == UserType.FLORIST:
+            products = products.filter(florist=self.request.user)
+        return products
+
+
+class FlowerImportView(CatalogueImportView):
+    """Flower import view"""
+
+    permission_classes = (IsAdmin,)
+    import_function = staticmethod(import_flowers)
+
+
+class FlowerExportView(CatalogueExportView):
+    """Flower export view"""
+
+    permission_classes = (IsAdmin,)
+    queryset = Flower.objects.all()
+    export_function = staticmethod(export_flowers)
+    header = FLOWER_EXPORT_HEADER
+    filename = 'flowers'
+
+
+class ProductImageView(EagerLoadingMixin, ModelViewSet):
     """Product Image View"""
 
     serializer_class = ProductImageSerializer
@@ -162,7 +390,7 @@ class ProductImageView(ModelViewSet):
     filter_fields = ['product__id']
 
 
-class FavoriteProductView(ModelViewSet):
+class FavoriteProductView(EagerLoadingMixin, ModelViewSet):
     """Favorite product view"""
 
     serializer_class = FavoriteProductSerializer
@@ -172,7 +400,7 @@ class FavoriteProductView(ModelViewSet):
     def get_queryset(self):
         """Filter favorite products by current client"""
 
-        queryset = self.queryset.filter(client=self.request.user)
+        queryset = super().get_queryset().filter(client=self.request.user)
         return queryset
 
     def perform_create(self, serializer):
@@ -181,51 +409,71 @@ class FavoriteProductView(ModelViewSet):
         serializer.save(client=self.request.user)
 
 
-class NewProductView(ListAPIView):
+class NewProductView(CatalogueCacheMixin, EagerLoadingMixin, ListAPIView):
     """New product view"""
 
     serializer_class = ProductSerializer
-    queryset = Product.objects.order_by('-creation_date')[:10]
+    queryset = Product.objects.order_by('-creation_date')
     permission_classes = (IsClient,)
 
+    def get_queryset(self):
+        """Take ten newest products"""
+
+        return super().get_queryset()[:10]
+
 
 class EmployeeHistoryView(APIView):
-    """Employee history view"""
+    """
+    Employee history view.
+    History is paginated by KeysetPagination, total earnings are summed by
+    database, optional since param (YYYY-MM-DD) limits both
+    """
 
     def get(self, request):
         user = self.request.user
-        if user.user_type == 'florist':
-            products = Product.objects.filter(florist=user, status='Продан')
-            serializer = FloristHistorySerializer({'products': products})
-            return Response(serializer.data)
-        elif user.user_type == 'courier':
-            order = Order.objects.filter(courier=user, status='Доставлено')
-            serializer = CourierHistorySerializer({'order': order})
-            return Response(serializer.data)
-
-
-class RevenueStatisticView(ListAPIView):
-    """Revenue statistic view"""
-
-    def list(self, request, *args, **kwargs):
-        month = self.request.query_params.get('month')
-        three_month = self.request.query_params.get('three_month')
-        half_year = self.request.query_params.get('half_year')
-        if month:
-            duration = datetime.datetime.today() - datetime.timedelta(days=30)
-            queryset = Product.objects.filter(sale_datetime__gte=duration, status='Продан')\
-                .annotate(week=TruncWeek("sale_datetime")).values("week").annotate(total_revenue=Sum("price"))
-            return Response(queryset)
-
-        if three_month:
-            duration = datetime.date.today() - datetime.timedelta(days=90)
-            queryset = Product.objects.filter(sale_datetime__gte=duration, status='Продан')\
-                .annotate(week=TruncWeek("sale_datetime")).values("week").annotate(total_revenue=Sum("price"))
-            return Response(queryset)
-
-        if half_year:
-            duration = datetime.date.today() - datetime.timedelta(days=182)
-            queryset = Product.objects.filter(sale_datetime__gte=duration, status='Продан')\
-                .annotate(week=TruncMonth("sale_datetime")).values("week").annotate(total_revenue=Sum("price"))
-            return Response(queryset)
-        return Response('Статистика выручки магазина')
+        since = self.get_since()
+        if user.user_type == UserType.FLORIST:
+            self.ordering = ('-id',)
+            products = Product.objects.filter(florist=user, status=ProductStatus.SOLD)
+            if since:
+                products = products.filter(sale_datetime__date__gte=since)
+            total_earnings = products.aggregate(total_earnings=Sum(
+                F('price_without_allowance') * F('product_type__florist_allowance') / 100,
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ))['total_earnings']
+
+            select_related, _ = get_related_lookups(ProductSerializer, Product)
+            paginator = KeysetPagination()
+            page = paginator.paginate_queryset(products.select_related(*select_related), request, view=self)
+            serializer = FloristHistorySerializer({'products': page, 'total_earnings': total_earnings})
+            return self.get_paginated_history(paginator, serializer.data)
+        elif user.user_type == UserType.COURIER:
+            self.ordering = ('-creation_datetime', '-id')
+            order = Order.objects.filter(courier=user, status=OrderStatus.DELIVERED)
+            if since:
+                order = order.filter(received_date__gte=since)
+            total_earnings = CartProduct.objects.filter(cart__order__in=order) \
+                .aggregate(total_earnings=Sum(COURIER_PAYOUT))['total_earnings']
+
+            order = order.select_related('client', 'courier').with_courier_payout().with_products()
+            paginator = KeysetPagination()
+            page = paginator.paginate_queryset(order, request, view=self)
+            serializer = CourierHistorySerializer({'order': page, 'total_earnings': total_earnings})
+            return self.get_paginated_history(paginator, serializer.data)
+
+    @staticmethod
+    def get_paginated_history(paginator, data):
+        return Response({
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+            **data,
+        })
+
+    def get_since(self):
+        since = self.request.query_params.get('since')
+        if not since:
+            return None
+        try:
+            return datetime.date.fromisoformat(since)
+        except ValueError:
+            raise ValidationError({'since': 'Неверный формат даты, используйте YYYY-MM-DD'})
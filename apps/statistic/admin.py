@@ -0,0 +1,9 @@
+from django.contrib import admin
+
+from apps.statistic.models import (
+    DailyOrderStatistic,
+    DailyRevenueStatistic,
+)
+
+admin.site.register(DailyOrderStatistic)
+admin.site.register(DailyRevenueStatistic)
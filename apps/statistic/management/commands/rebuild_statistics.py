@@ -0,0 +1,25 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.statistic.services import rebuild_statistics
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily order and revenue statistics from order history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help='First day to rebuild, YYYY-MM-DD')
+        parser.add_argument('--date-to', help='Last day to rebuild, YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        try:
+            date_from = options['date_from'] and datetime.date.fromisoformat(options['date_from'])
+            date_to = options['date_to'] and datetime.date.fromisoformat(options['date_to'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        orders, revenue = rebuild_statistics(date_from, date_to)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {orders} order and {revenue} revenue statistic rows'
+        ))
@@ -0,0 +1,45 @@
+# Generated by Django 3.2.4 on 2026-10-18 11:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('users', '0006_alter_user_shop_branch'),
+        ('product', '0009_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRevenueStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('sold_products', models.PositiveIntegerField(default=0)),
+                ('total_revenue', models.DecimalField(decimal_places=1, default=0, max_digits=12)),
+                ('product_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='product.producttype')),
+                ('shop_branch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='users.shopbranch')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyOrderStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total_orders', models.PositiveIntegerField(default=0)),
+                ('shop_branch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='users.shopbranch')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrevenuestatistic',
+            constraint=models.UniqueConstraint(fields=('date', 'shop_branch', 'product_type'), name='daily_revenue_statistic_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyorderstatistic',
+            constraint=models.UniqueConstraint(fields=('date', 'shop_branch'), name='daily_order_statistic_unique'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicates(model, dimensions, values):
+    duplicates = model.objects.filter(shop_branch__isnull=True) \
+        .values(*dimensions) \
+        .annotate(rows=Count('id'), keep_id=Min('id'), **{value: Sum(value) for value in values}) \
+        .filter(rows__gt=1)
+    for row in duplicates:
+        lookup = {dimension: row[dimension] for dimension in dimensions}
+        rows = model.objects.filter(shop_branch__isnull=True, **lookup)
+        rows.filter(pk=row['keep_id']).update(**{value: row[value] for value in values})
+        rows.exclude(pk=row['keep_id']).delete()
+
+
+def merge_branchless_duplicates(apps, schema_editor):
+    merge_duplicates(apps.get_model('statistic', 'DailyOrderStatistic'), ['date'], ['total_orders'])
+    merge_duplicates(
+        apps.get_model('statistic', 'DailyRevenueStatistic'), ['date', 'product_type'], ['sold_products', 'total_revenue']
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('statistic', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_branchless_duplicates, migrations.RunPython.noop),
+    ]
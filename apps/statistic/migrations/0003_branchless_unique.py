@@ -0,0 +1,21 @@
+# Generated by Django 3.2.4 on 2026-10-18 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('statistic', '0002_merge_branchless_duplicates'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='dailyorderstatistic',
+            constraint=models.UniqueConstraint(condition=models.Q(('shop_branch__isnull', True)), fields=('date',), name='daily_order_statistic_no_branch_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrevenuestatistic',
+            constraint=models.UniqueConstraint(condition=models.Q(('shop_branch__isnull', True)), fields=('date', 'product_type'), name='daily_revenue_statistic_no_branch_unique'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import models
+from django.db.models import Q
+
+from apps.users.models import ShopBranch
+from apps.product.models import ProductType
+
+
+class DailyOrderStatistic(models.Model):
+    """Delivered orders rollup per day and shop branch of order florists"""
+
+    date = models.DateField()
+    shop_branch = models.ForeignKey(ShopBranch, on_delete=models.CASCADE, null=True, blank=True)
+    total_orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'shop_branch'], name='daily_order_statistic_unique'),
+            # NULLs are distinct in unique constraints, branchless rows need their own
+            models.UniqueConstraint(
+                fields=['date'], condition=Q(shop_branch__isnull=True), name='daily_order_statistic_no_branch_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.date} {self.shop_branch}'
+
+
+class DailyRevenueStatistic(models.Model):
+    """Sold products rollup per day, florist shop branch and product type"""
+
+    date = models.DateField()
+    shop_branch = models.ForeignKey(ShopBranch, on_delete=models.CASCADE, null=True, blank=True)
+    product_type = models.ForeignKey(ProductType, on_delete=models.CASCADE)
+    sold_products = models.PositiveIntegerField(default=0)
+    total_revenue = models.DecimalField(max_digits=12, decimal_places=1, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'shop_branch', 'product_type'], name='daily_revenue_statistic_unique'
+            ),
+            models.UniqueConstraint(
+                fields=['date', 'product_type'], condition=Q(shop_branch__isnull=True),
+                name='daily_revenue_statistic_no_branch_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.date} {self.shop_branch} {self.product_type}'
@@ -0,0 +1,40 @@
+import datetime
+
+from rest_framework import serializers
+
+
+class StatisticParamsSerializer(serializers.Serializer):
+    """Statistic query params serializer"""
+
+    period_choices = ['day', 'week', 'month', 'year']
+    legacy_windows = {
+        'month': (30, 'week'),
+        'three_month': (90, 'week'),
+        'half_year': (182, 'month'),
+    }
+
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    period = serializers.ChoiceField(choices=period_choices, required=False)
+    shop_branch = serializers.IntegerField(required=False)
+    product_type = serializers.IntegerField(required=False)
+
+    def to_internal_value(self, data):
+        """Map old month, three_month and half_year params to date range and period"""
+
+        data = data.dict() if hasattr(data, 'dict') else dict(data)
+        for param, (days, period) in self.legacy_windows.items():
+            if data.get(param) and not data.get('date_from'):
+                data['date_from'] = datetime.date.today() - datetime.timedelta(days=days)
+                data.setdefault('period', period)
+                break
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        today = datetime.date.today()
+        attrs.setdefault('date_to', today)
+        attrs.setdefault('date_from', attrs['date_to'] - datetime.timedelta(days=30))
+        attrs.setdefault('period', 'week')
+        if attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError('date_from должна быть раньше date_to')
+        return attrs
@@ -0,0 +1,224 @@
+from django.db import connection, transaction
+from django.db.models import Count, DateField, DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Trunc, TruncDate
+
+from core.constants import OrderStatus, ProductStatus
+from apps.order.models import CartProduct, Order, COURIER_PAYOUT, FLORIST_PAYOUT, ORDER_SHOP_BRANCH
+from apps.product.models import Product
+from apps.statistic.models import DailyOrderStatistic, DailyRevenueStatistic
+
+
+def upsert_statistic(model, rows, dimensions, values):
+    """
+    Add grouped rows to rollup with INSERT ... ON CONFLICT DO UPDATE.
+    Rows with and without shop branch conflict on different unique
+    constraints, so each kind is written by its own statement
+    :param model: rollup model
+    :param rows: values queryset selecting shop_branch_id, dimension and value columns
+    :param dimensions: tuple of dimension columns besides shop_branch_id
+    :param values: tuple of value columns added to existing rollup row
+    :return: None
+    """
+
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = ', '.join(quote(column) for column in ('shop_branch_id', *dimensions, *values))
+    increments = ', '.join(f'{quote(value)} = {table}.{quote(value)} + EXCLUDED.{quote(value)}' for value in values)
+    sql, params = rows.query.sql_with_params()
+    targets = (
+        ('IS NOT NULL', ('shop_branch_id', *dimensions), ''),
+        ('IS NULL', dimensions, ' WHERE "shop_branch_id" IS NULL'),
+    )
+    with connection.cursor() as cursor:
+        for condition, target, target_condition in targets:
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) SELECT {columns} FROM ({sql}) rollup_rows '
+                f'WHERE "shop_branch_id" {condition} '
+                f'ON CONFLICT ({", ".join(quote(column) for column in target)}){target_condition} '
+                f'DO UPDATE SET {increments}',
+                params,
+            )
+
+
+def record_order_delivery(order, sale_date):
+    """
+    Add delivered order and its sold products to rollups with a fixed
+    number of queries whatever order size
+    :param order: Order
+    :param sale_date: date products were sold
+    :return: None
+    """
+
+    orders = Order.objects.filter(pk=order.pk).order_by().values(
+        date=Value(order.creation_datetime.date(), output_field=DateField()),
+        shop_branch_id=F(ORDER_SHOP_BRANCH),
+    ).annotate(total_orders=Count('id', distinct=True))
+    upsert_statistic(DailyOrderStatistic, orders, ('date',), ('total_orders',))
+
+    sales = CartProduct.objects.filter(cart=order.cart_id).order_by().values(
+        date=Value(sale_date, output_field=DateField()),
+        shop_branch_id=F('product__florist__shop_branch'),
+        product_type_id=F('product__product_type'),
+    ).annotate(sold_products=Count('product'), total_revenue=Coalesce(Sum('product__price'), Value(0),
+                                                                       output_field=DecimalField()))
+    upsert_statistic(DailyRevenueStatistic, sales, ('date', 'product_type_id'), ('sold_products', 'total_revenue'))
+
+
+def rebuild_statistics(date_from=None, date_to=None):
+    """
+    Recalculate rollups from delivered orders and sold products
+    :param date_from: date or None
+    :param date_to: date or None
+    :return: tuple, quantity of order and revenue rollup rows
+    """
+
+    orders = Order.objects.filter(status=OrderStatus.DELIVERED)
+    products = Product.objects.filter(status=ProductStatus.SOLD, sale_datetime__isnull=False)
+    order_statistics = DailyOrderStatistic.objects.all()
+    revenue_statistics = DailyRevenueStatistic.objects.all()
+    if date_from:
+        orders = orders.filter(creation_datetime__date__gte=date_from)
+        products = products.filter(sale_datetime__date__gte=date_from)
+        order_statistics = order_statistics.filter(date__gte=date_from)
+        revenue_statistics = revenue_statistics.filter(date__gte=date_from)
+    if date_to:
+        orders = orders.filter(creation_datetime__date__lte=date_to)
+        products = products.filter(sale_datetime__date__lte=date_to)
+        order_statistics = order_statistics.filter(date__lte=date_to)
+        revenue_statistics = revenue_statistics.filter(date__lte=date_to)
+
+    orders = orders.annotate(date=TruncDate('creation_datetime')) \
+        .values('date', ORDER_SHOP_BRANCH) \
+        .annotate(total_orders=Count('id', distinct=True)) \
+        .order_by()
+    products = products.annotate(date=TruncDate('sale_datetime')) \
+        .values('date', 'florist__shop_branch', 'product_type') \
+        .annotate(sold_products=Count('id'), total_revenue=Sum('price')) \
+        .order_by()
+
+    with transaction.atomic():
+        order_statistics.delete()
+        revenue_statistics.delete()
+        created_orders = DailyOrderStatistic.objects.bulk_create(
+            (
+                DailyOrderStatistic(
+                    date=row['date'],
+                    shop_branch_id=row[ORDER_SHOP_BRANCH],
+                    total_orders=row['total_orders'],
+                )
+                for row in orders.iterator()
+            ),
+            batch_size=1000,
+        )
+        created_revenue = DailyRevenueStatistic.objects.bulk_create(
+            (
+                DailyRevenueStatistic(
+                    date=row['date'],
+                    shop_branch_id=row['florist__shop_branch'],
+                    product_type_id=row['product_type'],
+                    sold_products=row['sold_products'],
+                    total_revenue=row['total_revenue'] or 0,
+                )
+                for row in products.iterator()
+            ),
+            batch_size=1000,
+        )
+    return len(created_orders), len(created_revenue)
+
+
+def get_statistic(queryset, values, date_from, date_to, period):
+    """
+    Sum rollup values by period
+    :param queryset: rollup queryset
+    :param values: tuple of summed fields
+    :param date_from: date
+    :param date_to: date
+    :param period: str, day, week, month or year
+    :return: ValuesQuerySet
+    """
+
+    return queryset.filter(date__gte=date_from, date__lte=date_to) \
+        .annotate(period=Trunc('date', period, output_field=DateField())) \
+        .values('period') \
+        .annotate(**{value: Sum(value) for value in values}) \
+        .order_by('period')
+
+
+def get_sold_cart_products(date_from, date_to, **lookups):
+    """
+    Cart products of delivered orders sold inside date range, carts
+    holding the same product that were never ordered are left out
+    :param date_from: date
+    :param date_to: date
+    :param lookups: extra lookups filtered on the same delivered order
+    :return: CartProduct queryset
+    """
+
+    return CartProduct.objects.filter(
+        cart__order__status=OrderStatus.DELIVERED,
+        product__status=ProductStatus.SOLD,
+        product__sale_datetime__date__gte=date_from,
+        product__sale_datetime__date__lte=date_to,
+        **lookups,
+    )
+
+
+def annotate_employee_statistic(queryset, date_from, date_to):
+    """
+    Annotate employee profiles with sold products, delivered orders and
+    earnings inside date range, so the whole list is one query
+    :param queryset: EmployeeProfile queryset
+    :param date_from: date
+    :param date_to: date
+    :return: EmployeeProfile queryset
+    """
+
+    florist_earnings = get_sold_cart_products(date_from, date_to, product__florist=OuterRef('user')) \
+        .order_by() \
+        .values('product__florist') \
+        .annotate(earnings=Sum(FLORIST_PAYOUT)) \
+        .values('earnings')
+    courier_earnings = get_sold_cart_products(date_from, date_to, cart__order__courier=OuterRef('user')) \
+        .order_by() \
+        .values('cart__order__courier') \
+        .annotate(earnings=Sum(COURIER_PAYOUT)) \
+        .values('earnings')
+    earnings_field = DecimalField(max_digits=12, decimal_places=2)
+
+    return queryset.select_related('user__shop_branch').annotate(
+        sold_products=Count(
+            'user__product', filter=Q(user__product__status=ProductStatus.SOLD), distinct=True
+        ),
+        delivered_orders=Count(
+            'user__order_courier', filter=Q(user__order_courier__status=OrderStatus.DELIVERED), distinct=True
+        ),
+        earnings=Coalesce(Subquery(florist_earnings, output_field=earnings_field), Value(0), output_field=earnings_field)
+        + Coalesce(Subquery(courier_earnings, output_field=earnings_field), Value(0), output_field=earnings_field),
+    )
+
+
+def get_employee_earnings(user_ids, date_from, date_to, period):
+    """
+    Sum employee earnings by period
+    :param user_ids: list of employee user ids
+    :param date_from: date
+    :param date_to: date
+    :param period: str, day, week, month or year
+    :return: dict, {user id: [{'period': date, 'earnings': Decimal}]}
+    """
+
+    sale_period = Trunc('product__sale_datetime', period, output_field=DateField())
+    florist_earnings = get_sold_cart_products(date_from, date_to, product__florist__in=user_ids) \
+        .annotate(period=sale_period) \
+        .values_list('product__florist', 'period') \
+        .annotate(earnings=Sum(FLORIST_PAYOUT))
+    courier_earnings = get_sold_cart_products(date_from, date_to, cart__order__courier__in=user_ids) \
+        .annotate(period=sale_period) \
+        .values_list('cart__order__courier', 'period') \
+        .annotate(earnings=Sum(COURIER_PAYOUT))
+
+    earnings = {}
+    for rows in (florist_earnings.order_by('period'), courier_earnings.order_by('period')):
+        for user_id, period_date, value in rows:
+            earnings.setdefault(user_id, []).append({'period': period_date, 'earnings': value or 0})
+    return earnings
@@ -0,0 +1,136 @@
+import datetime
+import io
+
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from core.constants import OrderStatus, ProductSize, UserType
+from apps.order.models import Cart, CartProduct, Order
+from apps.order.services import settle_order
+from apps.product.models import Product
+from apps.product.tests.factory import ProductTypeFactory
+from apps.statistic.models import DailyOrderStatistic, DailyRevenueStatistic
+from apps.users.tests.factory import ShopBranchFactory, UserFactory
+
+
+class StatisticTests(TestCase):
+    """Test statistic rollups and views"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.shop_branch = ShopBranchFactory()
+        self.florist = UserFactory(shop_branch=self.shop_branch)
+        self.courier = UserFactory(user_type=UserType.COURIER, shop_branch=self.shop_branch)
+        self.product_types = [ProductTypeFactory(title=title) for title in ('Букет', 'Корзина')]
+
+    def deliver_order(self, prices):
+        cart = Cart.objects.create()
+        for i, price in enumerate(prices):
+            product = Product.objects.create(
+                name=f'Букет {i}', description='Букет', price=price, size=ProductSize.SMALL,
+                product_type=self.product_types[i % 2], florist=self.florist,
+            )
+            CartProduct.objects.create(cart=cart, product=product)
+        order = Order.objects.create(
+            cart=cart, address='Юнусалиева 123', received_date=datetime.date.today(),
+            received_time=datetime.time(12, 0), courier=self.courier, status=OrderStatus.COURIER_HAS_ORDER,
+        )
+        settle_order(order)
+        return order
+
+    def test_delivery_updates_rollups(self):
+        """
+        Test delivered orders are added to order and revenue rollups
+        :return: None
+        """
+
+        self.deliver_order([100, 200, 300])
+        self.deliver_order([50])
+
+        order_statistic = DailyOrderStatistic.objects.get()
+        self.assertEqual(order_statistic.total_orders, 2)
+        self.assertEqual(order_statistic.shop_branch, self.shop_branch)
+        revenue = dict(DailyRevenueStatistic.objects.values_list('product_type', 'total_revenue'))
+        self.assertEqual(revenue, {self.product_types[0].pk: 450, self.product_types[1].pk: 200})
+
+    def test_branchless_rollups_are_unique(self):
+        """
+        Test deliveries of employees without shop branch share one rollup row
+        :return: None
+        """
+
+        get_user_model().objects.filter(pk__in=[self.florist.pk, self.courier.pk]).update(shop_branch=None)
+        self.deliver_order([100, 200, 300])
+        self.deliver_order([50])
+
+        order_statistic = DailyOrderStatistic.objects.get()
+        self.assertEqual((order_statistic.shop_branch, order_statistic.total_orders), (None, 2))
+        revenue = dict(DailyRevenueStatistic.objects.values_list('product_type', 'total_revenue'))
+        self.assertEqual(revenue, {self.product_types[0].pk: 450, self.product_types[1].pk: 200})
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DailyOrderStatistic.objects.create(date=order_statistic.date, shop_branch=None)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DailyRevenueStatistic.objects.create(
+                date=order_statistic.date, shop_branch=None, product_type=self.product_types[0]
+            )
+
+    def test_rebuild_matches_incremental_rollups(self):
+        """
+        Test rebuild command recreates the same rollups from history
+        :return: None
+        """
+
+        self.deliver_order([100, 200, 300])
+        self.deliver_order([50])
+        fields = ('date', 'shop_branch', 'product_type', 'sold_products', 'total_revenue')
+        incremental = sorted(DailyRevenueStatistic.objects.values_list(*fields))
+        DailyOrderStatistic.objects.all().delete()
+        DailyRevenueStatistic.objects.all().delete()
+
+        call_command('rebuild_statistics', stdout=io.StringIO())
+
+        self.assertEqual(sorted(DailyRevenueStatistic.objects.values_list(*fields)), incremental)
+        self.assertEqual(DailyOrderStatistic.objects.get().total_orders, 2)
+
+    def test_order_rollups_use_florist_shop_branch(self):
+        """
+        Test orders are counted for shop branch of their florists, not of courier,
+        incrementally and on rebuild
+        :return: None
+        """
+
+        get_user_model().objects.filter(pk=self.courier.pk).update(shop_branch=None)
+        self.deliver_order([100, 200])
+        self.assertEqual(
+            list(DailyOrderStatistic.objects.values_list('shop_branch', 'total_orders')), [(self.shop_branch.pk, 1)]
+        )
+
+        call_command('rebuild_statistics', stdout=io.StringIO())
+        self.assertEqual(
+            list(DailyOrderStatistic.objects.values_list('shop_branch', 'total_orders')), [(self.shop_branch.pk, 1)]
+        )
+
+    def test_statistic_views_read_rollups(self):
+        """
+        Test statistic views group rollups by requested period
+        :return: None
+        """
+
+        self.deliver_order([100, 200])
+        today = datetime.date.today()
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/statistic/order/', {'period': 'day', 'date_from': today})
+        self.assertEqual(list(response.data), [{'period': today, 'total_orders': 1}])
+
+        response = self.client.get(
+            '/statistic/revenue/', {'month': 'True', 'product_type': self.product_types[1].pk}
+        )
+        self.assertEqual(response.data[0]['total_revenue'], 200)
+
+        response = self.client.get('/statistic/revenue/', {'period': 'hour'})
+        self.assertEqual(response.status_code, 400)
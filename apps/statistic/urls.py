@@ -0,0 +1,14 @@
+from django.urls import path
+
+from apps.statistic.views import (
+    OrderStatisticView,
+    RevenueStatisticView,
+)
+
+
+app_name = 'apps.statistic'
+
+urlpatterns = [
+    path('statistic/order/', OrderStatisticView.as_view(), name="order_statistic"),
+    path('statistic/revenue/', RevenueStatisticView.as_view(), name="revenue_statistic"),
+]
@@ -0,0 +1,50 @@
+from rest_framework.generics import ListAPIView
+from rest_framework.response import Response
+
+from apps.statistic.models import (
+    DailyOrderStatistic,
+    DailyRevenueStatistic,
+)
+from apps.statistic.serializers import StatisticParamsSerializer
+from apps.statistic.services import get_statistic
+
+
+class StatisticView(ListAPIView):
+    """
+    Base statistic view reading daily rollups.
+    Accepts date_from, date_to, period (day, week, month, year) and
+    shop_branch params.
+    """
+
+    queryset = None
+    statistic_values = ()
+    filter_params = ('shop_branch',)
+
+    def list(self, request, *args, **kwargs):
+        params = StatisticParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        params = params.validated_data
+
+        queryset = self.queryset.all()
+        for param in self.filter_params:
+            if param in params:
+                queryset = queryset.filter(**{param: params[param]})
+        statistic = get_statistic(
+            queryset, self.statistic_values, params['date_from'], params['date_to'], params['period']
+        )
+        return Response(statistic)
+
+
+class OrderStatisticView(StatisticView):
+    """Order statistic view"""
+
+    queryset = DailyOrderStatistic.objects.all()
+    statistic_values = ('total_orders',)
+
+
+class RevenueStatisticView(StatisticView):
+    """Revenue statistic view"""
+
+    queryset = DailyRevenueStatistic.objects.all()
+    statistic_values = ('total_revenue', 'sold_products')
+    filter_params = ('shop_branch', 'product_type')
@@ -0,0 +1,20 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from apps.users.tokens import USER_CLAIMS, get_token_user, is_token_revoked
+
+
+class JWTClaimsAuthentication(JWTAuthentication):
+    """
+    JWT authentication resolving user from token claims without database
+    query. Tokens issued without user claims or before user claims changed
+    load user from database
+    """
+
+    def get_user(self, validated_token):
+        if not all(claim in validated_token for claim in USER_CLAIMS) or is_token_revoked(validated_token):
+            return super().get_user(validated_token)
+        if not validated_token['is_active']:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return get_token_user(validated_token)
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class EmployeePasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 hasher with iterations read from EMPLOYEE_PASSWORD_ITERATIONS
+    setting. Algorithm name is kept, so existing hashes still verify and
+    are rehashed with new cost on next login
+    """
+
+    @property
+    def iterations(self):
+        return settings.EMPLOYEE_PASSWORD_ITERATIONS
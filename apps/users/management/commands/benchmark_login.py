@@ -0,0 +1,43 @@
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.constants import UserType
+from apps.users.models import User
+from apps.users.services import login_client, login_employee
+from apps.users.tokens import UserRefreshToken
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+
+class Command(BaseCommand):
+    help = 'Measure employee and client logins per second, benchmark users are rolled back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='Users of each kind to create')
+        parser.add_argument('--logins', type=int, default=200, help='Logins of each kind to run')
+
+    def run_logins(self, label, phones, logins, login):
+        started = time.perf_counter()
+        for i in range(logins):
+            user = login(phones[i % len(phones)])
+            str(UserRefreshToken.for_user(user).access_token)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'{label}: {logins} logins in {elapsed:.2f}s, {logins / elapsed:.1f} logins/s')
+
+    def handle(self, *args, **options):
+        users, logins = max(options['users'], 1), max(options['logins'], 1)
+        password = make_password(BENCHMARK_PASSWORD)
+        with transaction.atomic():
+            User.objects.bulk_create(
+                [User(username=f'benchmark florist {i}', phone=f'benchmark-florist-{i}',
+                      user_type=UserType.FLORIST, password=password) for i in range(users)]
+                + [User(username=f'benchmark client {i}', phone=f'benchmark-client-{i}',
+                        user_type=UserType.CLIENT) for i in range(users)]
+            )
+            self.run_logins('Employee', [f'benchmark-florist-{i}' for i in range(users)], logins,
+                            lambda phone: login_employee(phone, BENCHMARK_PASSWORD))
+            self.run_logins('Client', [f'benchmark-client-{i}' for i in range(users)], logins, login_client)
+            transaction.set_rollback(True)
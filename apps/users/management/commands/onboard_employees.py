@@ -0,0 +1,43 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.streaming import IMPORT_FORMATS, read_rows
+from apps.users.models import ShopBranch
+from apps.users.services import ONBOARDING_WORKERS, onboard_employees
+
+
+class Command(BaseCommand):
+    help = 'Register employees from CSV or JSON lines file with username, phone, password, user_type, shop_branch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='Path to csv or jsonl file')
+        parser.add_argument('--shop-branch', type=int, help='Shop branch id of rows without one')
+        parser.add_argument('--workers', type=int, default=ONBOARDING_WORKERS, help='Password hashing threads')
+
+    def handle(self, *args, **options):
+        file_format = os.path.splitext(options['file'])[1].lstrip('.').lower()
+        if file_format not in IMPORT_FORMATS:
+            raise CommandError('Only csv and jsonl files are supported')
+
+        shop_branch = None
+        if options['shop_branch']:
+            shop_branch = ShopBranch.objects.filter(pk=options['shop_branch']).first()
+            if shop_branch is None:
+                raise CommandError(f"Shop branch {options['shop_branch']} not found")
+
+        try:
+            with open(options['file'], 'rb') as file:
+                # Empty CSV cells mean missing values
+                rows = [
+                    row and {key: value for key, value in row.items() if value not in ('', None)}
+                    for row in read_rows(file, file_format)
+                ]
+        except OSError as error:
+            raise CommandError(error)
+
+        result = onboard_employees(rows, shop_branch, options['workers'])
+        for row in result['results']:
+            if 'errors' in row:
+                self.stderr.write(f"Row {row['row']}: {row['errors']}")
+        self.stdout.write(self.style.SUCCESS(f"Registered {result['created']} of {len(rows)} employees"))
@@ -0,0 +1,40 @@
+from django.db import migrations, models
+
+
+USER_TYPE = {
+    1: 'client',
+    2: 'florist',
+    3: 'courier',
+    4: 'admin',
+}
+
+
+def labels_to_codes(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    for code, label in USER_TYPE.items():
+        User.objects.filter(user_type=label).update(user_type_code=code)
+
+
+def codes_to_labels(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    for code, label in USER_TYPE.items():
+        User.objects.filter(user_type_code=code).update(user_type=label)
+    if schema_editor.connection.vendor == 'postgresql':
+        # Fire deferred FK checks now, the column is dropped in the same transaction
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_alter_user_shop_branch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='user_type_code',
+            field=models.SmallIntegerField(null=True),
+        ),
+        migrations.RunPython(labels_to_codes, codes_to_labels),
+    ]
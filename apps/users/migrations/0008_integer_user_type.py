@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_integer_user_type_codes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='user',
+            name='user_type',
+        ),
+        migrations.RenameField(
+            model_name='user',
+            old_name='user_type_code',
+            new_name='user_type',
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='user_type',
+            field=models.SmallIntegerField(choices=[(1, 'client'), (2, 'florist'), (3, 'courier'), (4, 'admin')], default=1, null=True),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from django.db.models import F
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import (
@@ -8,6 +9,11 @@ from django.contrib.auth.models import (
     PermissionsMixin,
 )
 
+from core.constants import UserType
+
+# User fields copied into token claims, tokens issued before they change are revoked
+TOKEN_CLAIM_FIELDS = ('user_type', 'is_superuser', 'shop_branch', 'shop_branch_id', 'is_active')
+
 
 class UserManager(BaseUserManager):
     def create_user(self, username, phone, **extra_fields):
@@ -47,29 +53,44 @@ class UserManager(BaseUserManager):
         user.set_password(password)
         user.is_superuser = True
         user.is_staff = True
-        user.user_type = 'admin'
+        user.user_type = UserType.ADMIN
         user.save()
         return user
 
+    def bulk_create_users(self, users, batch_size=None):
+        """
+        Create users and profiles of employees among them with one insert each,
+        as bulk_create sends no post_save signal creating profiles
+        :param users: list of unsaved User
+        :param batch_size: int, rows inserted together
+        :return: list of created User
+        """
+
+        users = self.bulk_create(users, batch_size=batch_size)
+        if any(user.pk is None for user in users):
+            # Backends not returning inserted rows, users are matched by unique phone
+            pks = dict(self.filter(phone__in=[user.phone for user in users]).values_list('phone', 'pk'))
+            for user in users:
+                user.pk = pks[user.phone]
+        EmployeeProfile.objects.bulk_create(
+            [EmployeeProfile(user=user) for user in users if user.is_employee], batch_size=batch_size
+        )
+        return users
+
 
 class User(AbstractBaseUser, PermissionsMixin):
     """User model"""
 
-    user_type_choices = [
-        ('client', 'client'),
-        ('florist', 'florist'),
-        ('courier', 'courier'),
-        ('admin', 'admin'),
-    ]
-
     username = models.CharField(max_length=255)
     phone = models.CharField(max_length=255, unique=True)
     image = models.ImageField(null=True, blank=True)
-    user_type = models.CharField(max_length=255, choices=user_type_choices, default='client', null=True)
+    user_type = models.SmallIntegerField(choices=UserType.choices, default=UserType.CLIENT, null=True)
     shop_branch = models.ForeignKey('ShopBranch', on_delete=models.SET_NULL, null=True, blank=True)
     is_staff = models.BooleanField(default=False)
     is_superuser = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
+    # Copied into token claims, bumped when other claimed fields change
+    claims_version = models.PositiveIntegerField(default=0)
     USERNAME_FIELD = "phone"
     REQUIRED_FIELDS = ["username"]
 
@@ -78,6 +99,38 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return f'{self.phone}'
 
+    @property
+    def is_employee(self):
+        """Superusers and every user except clients have employee profile"""
+
+        return self.is_superuser or self.user_type != UserType.CLIENT
+
+    def refresh_from_db(self, using=None, fields=None):
+        """Load every deferred field with one query once any of them is read"""
+
+        deferred_fields = self.get_deferred_fields()
+        if fields is not None and deferred_fields and set(fields) <= deferred_fields:
+            fields = deferred_fields
+        super().refresh_from_db(using, fields)
+
+
+def revoke_token_claims(user):
+    """
+    Bump claims version of user, access tokens issued with older version
+    are checked against database until they expire
+    :param user: User
+    :return: None
+    """
+
+    User.objects.filter(pk=user.pk).update(claims_version=F('claims_version') + 1)
+    user.refresh_from_db(fields=['claims_version'])
+
+
+@receiver(post_save, sender=User)
+def revoke_changed_user_claims(sender, instance, created, update_fields=None, **kwargs):
+    if not created and (update_fields is None or set(update_fields) & set(TOKEN_CLAIM_FIELDS)):
+        revoke_token_claims(instance)
+
 
 class EmployeeProfile(models.Model):
     """Employee profile model"""
@@ -100,21 +153,8 @@ class EmployeeProfile(models.Model):
 
     @receiver(post_save, sender=User)
     def create_user_profile(sender, instance, created, **kwargs):
-        if created:
-            if instance.is_superuser:
-                EmployeeProfile.objects.create(user=instance)
-            elif instance.user_type != 'client':
-                EmployeeProfile.objects.create(user=instance)
-
-    @receiver(post_save, sender=User)
-    def save_user_profile(sender, instance, **kwargs):
-        if instance.is_superuser:
-            pass
-        elif instance.user_type:
-            if instance.user_type != 'client':
-                instance.employeeprofile.save()
-            else:
-                pass
+        if created and instance.is_employee:
+            EmployeeProfile.objects.create(user=instance)
 
 
 class ShopBranch(models.Model):
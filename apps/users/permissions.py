@@ -1,5 +1,17 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
+from core.constants import UserType
+
+
+def get_user_type(request):
+    """
+    User type of request user, taken from token claims for JWT requests
+    :param request: Request
+    :return: UserType or None for anonymous user
+    """
+
+    return getattr(request.user, 'user_type', None)
+
 
 class IsSuperUser(BasePermission):
     """
@@ -20,7 +32,7 @@ class IsClient(BasePermission):
     def has_permission(self, request, view):
         return bool(
             request.user.is_anonymous
-            or request.user.user_type == "client"
+            or get_user_type(request) == UserType.CLIENT
         )
 
 
@@ -36,7 +48,7 @@ class IsOrderClient(BasePermission):
     def has_permission(self, request, view):
         return bool(
             request.user.is_anonymous
-            or request.user.user_type == "client"
+            or get_user_type(request) == UserType.CLIENT
             and request.method not in self.edit_methods
 
         )
@@ -45,7 +57,7 @@ class IsOrderClient(BasePermission):
 
         if request.method in SAFE_METHODS:
             return True
-        if request.user.is_anonymous or request.user.user_type == 'client' and request.method not in self.edit_methods:
+        if request.user.is_anonymous or get_user_type(request) == UserType.CLIENT and request.method not in self.edit_methods:
             return True
         return False
 
@@ -58,7 +70,7 @@ class IsCourier(BasePermission):
     message = "Sorry but access only for couriers"
 
     def has_permission(self, request, view):
-        return bool(request.user and request.user.user_type == "courier")
+        return bool(request.user and get_user_type(request) == UserType.COURIER)
 
 
 class IsFlorist(BasePermission):
@@ -69,7 +81,7 @@ class IsFlorist(BasePermission):
     message = "Sorry but access only for florists"
 
     def has_permission(self, request, view):
-        return bool(request.user and request.user.user_type == "florist")
+        return bool(request.user and get_user_type(request) == UserType.FLORIST)
 
 
 class IsAdmin(BasePermission):
@@ -80,7 +92,7 @@ class IsAdmin(BasePermission):
     message = "Sorry but access only for admins"
 
     def has_permission(self, request, view):
-        return bool(request.user and request.user.user_type == "admin")
+        return bool(request.user and get_user_type(request) == UserType.ADMIN)
 
 
 class IsFloristOrReadOnly(BasePermission):
@@ -91,7 +103,7 @@ class IsFloristOrReadOnly(BasePermission):
     def has_permission(self, request, view):
         return bool(
             request.method in SAFE_METHODS or
-            request.user and request.user.user_type == 'florist'
+            request.user and get_user_type(request) == UserType.FLORIST
         )
 
 
@@ -103,7 +115,7 @@ class IsSuperUserOrAdminReadOnly(BasePermission):
     def has_permission(self, request, view):
         return bool(
             request.method in SAFE_METHODS or
-            request.user and request.user.is_superuser or request.user.user_type == 'admin'
+            request.user and request.user.is_superuser or get_user_type(request) == UserType.ADMIN
         )
 
 
@@ -118,8 +130,8 @@ class IsFloristOrAdminOnlyUpdateOrReadOnly(BasePermission):
         return bool(
             request.method in SAFE_METHODS or
             request.user and
-            request.user.is_authenticated and request.user.user_type == 'florist'
-            or request.user.is_authenticated and request.user.user_type == 'admin'
+            request.user.is_authenticated and get_user_type(request) == UserType.FLORIST
+            or request.user.is_authenticated and get_user_type(request) == UserType.ADMIN
             and request.method not in self.edit_methods
         )
 
@@ -127,11 +139,11 @@ class IsFloristOrAdminOnlyUpdateOrReadOnly(BasePermission):
 
         if request.method in SAFE_METHODS:
             return True
-        if obj.florist == request.user:
+        if obj.florist_id == request.user.pk:
             return True
         if request.user.is_anonymous and request.method in SAFE_METHODS:
             return True
-        if request.user.user_type == 'admin' and request.method not in self.edit_methods:
+        if get_user_type(request) == UserType.ADMIN and request.method not in self.edit_methods:
             return True
         return False
 
@@ -1,14 +1,18 @@
 from rest_framework import serializers
 
 from drf_extra_fields.relations import PresentablePrimaryKeyRelatedField
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 
+from core.constants import UserType
+from core.fields import LabelChoiceField
+from apps.users.tokens import USER_CLAIMS, UserRefreshToken
 from apps.users.models import (
     User,
     EmployeeProfile,
     ShopBranch,
 )
-from apps.product.models import Product
-from apps.order.models import Order
 
 
 class ShopBranchSerializer(serializers.ModelSerializer):
@@ -22,6 +26,8 @@ class ShopBranchSerializer(serializers.ModelSerializer):
 class RegisterEmployeeSerializer(serializers.ModelSerializer):
     """Employee registration serializer"""
 
+    serializer_choice_field = LabelChoiceField
+
     class Meta:
         model = User
         fields = [
@@ -44,12 +50,12 @@ class RegisterEmployeeSerializer(serializers.ModelSerializer):
         }
 
     def create(self, validated_data):
-        user = User.objects.create(
+        user = User(
             phone=validated_data["phone"],
             username=validated_data["username"],
             user_type=validated_data["user_type"],
-            shop_branch=validated_data["shop_branch"],
-            image=validated_data["image"],
+            shop_branch=validated_data.get("shop_branch"),
+            image=validated_data.get("image"),
         )
         user.set_password(validated_data["password"])
         user.save()
@@ -57,9 +63,46 @@ class RegisterEmployeeSerializer(serializers.ModelSerializer):
         return user
 
 
+class EmployeeOnboardingSerializer(serializers.Serializer):
+    """
+    Onboarded employee row serializer, phone uniqueness and shop branch are
+    checked against lookups loaded once for the whole batch
+    """
+
+    username = serializers.CharField(max_length=255)
+    phone = serializers.CharField(max_length=255)
+    password = serializers.CharField(write_only=True)
+    user_type = LabelChoiceField([(value, label) for value, label in UserType.choices if value != UserType.CLIENT])
+    shop_branch = serializers.IntegerField(required=False)
+
+    def validate_phone(self, value):
+        if value in self.context['phones']:
+            raise serializers.ValidationError('Пользователь с таким телефоном уже существует')
+        return value
+
+    def validate_shop_branch(self, value):
+        shop_branch = self.context['shop_branches'].get(value)
+        if shop_branch is None:
+            raise serializers.ValidationError('Филиал не найден')
+        return shop_branch
+
+    def validate(self, attrs):
+        attrs.setdefault('shop_branch', self.context['shop_branch'])
+        return attrs
+
+
+class BulkEmployeeSerializer(serializers.Serializer):
+    """Bulk employee registration serializer, rows are validated one by one on onboarding"""
+
+    employees = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=500)
+    shop_branch = serializers.PrimaryKeyRelatedField(queryset=ShopBranch.objects.all(), required=False)
+
+
 class RegisterClientSerializer(serializers.ModelSerializer):
     """Client registration serializer"""
 
+    serializer_choice_field = LabelChoiceField
+
     class Meta:
         model = User
         fields = [
@@ -93,9 +136,28 @@ class LoginClientSerializer(serializers.ModelSerializer):
         fields = ["phone"]
 
 
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Token refresh serializer reloading user, so inactive users and users
+    whose claims changed since login have to log in again
+    """
+
+    def validate(self, attrs):
+        refresh = UserRefreshToken(attrs['refresh'])
+        user = User.objects.only(*USER_CLAIMS).filter(pk=refresh[api_settings.USER_ID_CLAIM]).first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed('User not found or inactive!')
+        if any(refresh[claim] != getattr(user, claim) for claim in USER_CLAIMS if claim in refresh):
+            raise AuthenticationFailed('User rights changed, log in again!')
+
+        return {'access': str(refresh.access_token)}
+
+
 class UserSerializer(serializers.ModelSerializer):
     """User serializer"""
 
+    serializer_choice_field = LabelChoiceField
+
     shop_branch = PresentablePrimaryKeyRelatedField(
         queryset=ShopBranch.objects.all(),
         presentation_serializer=ShopBranchSerializer
@@ -123,26 +185,47 @@ class EmployeeProfileSerializer(serializers.ModelSerializer):
         model = EmployeeProfile
         fields = '__all__'
 
-    def update(self, instance, validated_data):
-        """Update nested UserSerializer fields """
-
-        if 'user' in validated_data:
-            nested_serializer = self.fields['user']
-            nested_instance = instance.user
-            nested_data = validated_data.pop('user')
+    @staticmethod
+    def save_changed(instance, data, extra_fields=()):
+        """
+        Set changed attributes and save only them
+        :param instance: model instance
+        :param data: dict, validated data
+        :param extra_fields: tuple of fields already changed on instance
+        :return: None
+        """
+
+        changed = [attr for attr, value in data.items() if getattr(instance, attr) != value]
+        for attr in changed:
+            setattr(instance, attr, data[attr])
+        changed += extra_fields
+        if changed:
+            instance.save(update_fields=changed)
 
-            # Runs the update on whatever serializer the nested data belongs to
-            nested_serializer.update(nested_instance, nested_data)
+    def update(self, instance, validated_data):
+        """Update nested UserSerializer fields, user and profile are written only when they change"""
 
-            # Runs the original parent update(), since the nested fields were
-            # "popped" out of the data
-        return super(EmployeeProfileSerializer, self).update(instance, validated_data)
+        user_data = validated_data.pop('user', {})
+        password = user_data.pop('password', None)
+        extra_fields = ()
+        if password:
+            instance.user.set_password(password)
+            extra_fields = ('password',)
+        self.save_changed(instance.user, user_data, extra_fields)
+        self.save_changed(instance, validated_data)
+        return instance
 
 
 class EmployeeProfileStatisticSerializer(EmployeeProfileSerializer):
-    """Employee profile statistic serializer"""
+    """
+    Employee profile statistic serializer.
+    Reads counts and earnings annotated by annotate_employee_statistic and
+    earnings by period passed in context
+    """
 
     orders_quantity = serializers.SerializerMethodField('get_order_quantity')
+    earnings = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    earnings_by_period = serializers.SerializerMethodField()
 
     class Meta:
         model = EmployeeProfile
@@ -150,8 +233,11 @@ class EmployeeProfileStatisticSerializer(EmployeeProfileSerializer):
 
     @staticmethod
     def get_order_quantity(obj):
-        if obj.user.user_type == 'florist':
-            return Product.objects.filter(florist=obj.user.id, status='Продан').count()
+        if obj.user.user_type == UserType.FLORIST:
+            return obj.sold_products
+
+        elif obj.user.user_type == UserType.COURIER:
+            return obj.delivered_orders
 
-        elif obj.user.user_type == 'courier':
-            return Order.objects.filter(courier=obj.user.id, status='Доставлено').count()
+    def get_earnings_by_period(self, obj):
+        return self.context.get('earnings_by_period', {}).get(obj.user_id, [])
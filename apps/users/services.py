@@ -0,0 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Q
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.constants import UserType
+from apps.users.models import ShopBranch, User
+from apps.users.serializers import EmployeeOnboardingSerializer
+
+EMPLOYEE_LOGIN_TYPES = (UserType.FLORIST, UserType.COURIER, UserType.ADMIN)
+# Password hashing releases GIL, so threads hash onboarded passwords in parallel
+ONBOARDING_WORKERS = 4
+# Columns needed to check password and issue tokens, the rest stay deferred
+LOGIN_FIELDS = ('password', 'user_type', 'is_superuser', 'shop_branch_id', 'is_active', 'claims_version')
+
+
+def get_login_user(phone, user_types, superuser=False):
+    """
+    Find user by phone and user type with one lookup on unique phone index
+    :param phone: str
+    :param user_types: tuple of UserType values allowed to log in
+    :param superuser: bool, superusers log in whatever their type
+    :return: User with login fields loaded or None
+    """
+
+    lookup = Q(user_type__in=user_types)
+    if superuser:
+        lookup |= Q(is_superuser=True)
+    try:
+        return User.objects.only(*LOGIN_FIELDS).get(lookup, phone=phone)
+    except User.DoesNotExist:
+        return None
+
+
+def login_employee(phone, password):
+    """
+    Check employee phone and password
+    :param phone: str
+    :param password: str
+    :return: User
+    """
+
+    user = get_login_user(phone, EMPLOYEE_LOGIN_TYPES, superuser=True)
+    if user is None:
+        raise AuthenticationFailed("User not found!")
+    if not user.check_password(password):
+        raise AuthenticationFailed("Incorrect password!")
+    if not user.is_active:
+        raise AuthenticationFailed("User is inactive!")
+    return user
+
+
+def login_client(phone):
+    """
+    Find client by phone
+    :param phone: str
+    :return: User
+    """
+
+    user = get_login_user(phone, (UserType.CLIENT,))
+    if user is None:
+        raise AuthenticationFailed("User not found!")
+    if not user.is_active:
+        raise AuthenticationFailed("User is inactive!")
+    return user
+
+
+def onboard_employees(rows, shop_branch=None, workers=ONBOARDING_WORKERS):
+    """
+    Register employees in bulk. Rows are validated against phones and shop
+    branches loaded with one query each, passwords are hashed in a thread
+    pool and valid users and their profiles are inserted in one transaction
+    :param rows: list of dicts, None for unreadable rows
+    :param shop_branch: ShopBranch of rows without one or None
+    :param workers: int, password hashing threads
+    :return: dict, quantity of created employees and result of every row
+    """
+
+    dict_rows = [row for row in rows if isinstance(row, dict)]
+    context = {
+        'phones': set(User.objects.filter(
+            phone__in=[str(row.get('phone')) for row in dict_rows]
+        ).values_list('phone', flat=True)),
+        'shop_branches': ShopBranch.objects.in_bulk(
+            [row['shop_branch'] for row in dict_rows if str(row.get('shop_branch')).isdigit()]
+        ),
+        'shop_branch': shop_branch,
+    }
+
+    results, valid = [], []
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            results.append({'row': number, 'errors': {'non_field_errors': ['Неверный формат строки']}})
+            continue
+        serializer = EmployeeOnboardingSerializer(data=row, context=context)
+        if not serializer.is_valid():
+            results.append({'row': number, 'errors': serializer.errors})
+            continue
+        data = serializer.validated_data
+        # Repeated phone inside batch is taken by its first row
+        context['phones'].add(data['phone'])
+        result = {'row': number, 'phone': data['phone']}
+        results.append(result)
+        valid.append((result, data))
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        passwords = list(executor.map(make_password, [data['password'] for _, data in valid]))
+
+    users = [
+        User(username=data['username'], phone=data['phone'], user_type=data['user_type'],
+             shop_branch=data['shop_branch'], password=password)
+        for (_, data), password in zip(valid, passwords)
+    ]
+    with transaction.atomic():
+        users = User.objects.bulk_create_users(users)
+    for (result, _), user in zip(valid, users):
+        result['id'] = user.pk
+    return {'created': len(users), 'results': results}
@@ -1,5 +1,6 @@
 import factory
 
+from core.constants import UserType
 from apps.users import models
 
 
@@ -7,12 +8,10 @@ class ShopBranchFactory(factory.django.DjangoModelFactory):
     """Fake ShopBranch model"""
 
     class Meta:
-        model = models.ShopBrnch
+        model = models.ShopBranch
 
     title = 'Юнусалиева 123'
     address = 'Юнусалиева 123'
-    longitude = '123412'
-    latitude = '234235'
     contacts = '0555555555'
     working_schedule = 'пн-пт с 9.00-22.00'
 
@@ -24,6 +23,18 @@ class UserFactory(factory.django.DjangoModelFactory):
         model = models.User
 
     username = 'Anton'
-    phone = '0555643343'
-    user_type = 'florist'
+    phone = factory.Sequence(lambda n: f'0700{n:06}')
+    user_type = UserType.FLORIST
     shop_branch = factory.SubFactory(ShopBranchFactory)
+
+    @classmethod
+    def _create(cls, model_class, *args, **kwargs):
+        return model_class.objects.create_user(*args, **kwargs)
+
+
+class ClientFactory(UserFactory):
+    """Fake client User model"""
+
+    username = 'client'
+    user_type = UserType.CLIENT
+    shop_branch = None
@@ -0,0 +1,239 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.constants import ProductSize, UserType
+from apps.product.models import Product
+from apps.product.tests.factory import ProductTypeFactory
+from apps.users.tests.factory import ClientFactory, ShopBranchFactory, UserFactory
+from apps.users.throttling import PhoneLoginThrottle
+from apps.users.tokens import UserRefreshToken, get_token_user
+
+
+@override_settings(CATALOGUE_CACHE_TIMEOUT=0)
+class TokenClaimsTests(TestCase):
+    """Test users are resolved from JWT claims"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.shop_branch = ShopBranchFactory()
+        self.florist = UserFactory(shop_branch=self.shop_branch)
+        self.product_type = ProductTypeFactory()
+        Product.objects.create(
+            name='Букет', description='Букет', price=100, size=ProductSize.SMALL,
+            product_type=self.product_type, florist=self.florist,
+        )
+
+    def get_user_queries(self, token, method='get', url='/product/list/', data=None):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, format='json')
+        user_queries = [query['sql'] for query in queries if 'FROM "users_user"' in query['sql']]
+        return response, user_queries
+
+    def tearDown(self):
+        cache.clear()
+
+    def refresh(self, token):
+        self.client.credentials()
+        return self.client.post('/api/token/refresh/', {'refresh': str(token)}, format='json')
+
+    def test_token_claims(self):
+        """
+        Test tokens carry user type, superuser flag and shop branch
+        :return: None
+        """
+
+        token = UserRefreshToken.for_user(self.florist)
+        access_token = token.access_token
+
+        self.assertEqual(access_token['user_type'], UserType.FLORIST)
+        self.assertFalse(access_token['is_superuser'])
+        self.assertEqual(access_token['shop_branch_id'], self.shop_branch.pk)
+        self.assertTrue(access_token['is_active'])
+
+    def test_request_without_user_query(self):
+        """
+        Test florist lists and creates products checking only claims version of user
+        :return: None
+        """
+
+        token = UserRefreshToken.for_user(self.florist)
+
+        response, user_queries = self.get_user_queries(token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(len(user_queries), 1)
+        self.assertTrue(user_queries[0].startswith('SELECT (1) AS "a"'), user_queries[0])
+
+        response, user_queries = self.get_user_queries(token, 'post', '/product/list/', {
+            'name': 'Букет', 'description': 'Букет', 'size': 'Маленький',
+            'product_type': self.product_type.pk, 'florist': self.florist.pk,
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Product.objects.filter(florist=self.florist).count(), 2)
+
+    def test_token_without_claims(self):
+        """
+        Test tokens issued before user claims still load user from database
+        :return: None
+        """
+
+        response, user_queries = self.get_user_queries(RefreshToken.for_user(self.florist))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(user_queries), 1)
+
+    def test_deferred_fields_load_together(self):
+        """
+        Test reading a field missing in claims loads user with one query
+        :return: None
+        """
+
+        user = get_token_user(UserRefreshToken.for_user(self.florist).access_token)
+        with self.assertNumQueries(1):
+            self.assertEqual((user.phone, user.username), (self.florist.phone, self.florist.username))
+        self.assertEqual(user, self.florist)
+
+    def test_refresh(self):
+        """
+        Test refreshed access token keeps claims of unchanged user
+        :return: None
+        """
+
+        response = self.refresh(UserRefreshToken.for_user(self.florist))
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/product/list/').status_code, 200)
+        user_queries = [query['sql'] for query in queries if 'FROM "users_user"' in query['sql']]
+        self.assertEqual(len(user_queries), 1)
+        self.assertTrue(user_queries[0].startswith('SELECT (1) AS "a"'), user_queries[0])
+
+    def test_deactivated_user(self):
+        """
+        Test deactivated user loses access and can not refresh token
+        :return: None
+        """
+
+        token = UserRefreshToken.for_user(self.florist)
+        self.florist.is_active = False
+        self.florist.save()
+
+        response, user_queries = self.get_user_queries(token)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(len(user_queries), 2)
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_demoted_user(self):
+        """
+        Test admin demoted to courier loses admin access and can not refresh token
+        :return: None
+        """
+
+        admin = UserFactory(user_type=UserType.ADMIN)
+        token = UserRefreshToken.for_user(admin)
+        response, _ = self.get_user_queries(token, url='/order/employee/export/')
+        self.assertEqual(response.status_code, 200)
+
+        admin.user_type = UserType.COURIER
+        admin.save(update_fields=['user_type'])
+        # Revocation is kept in database, not in process cache
+        cache.clear()
+
+        response, _ = self.get_user_queries(token, url='/order/employee/export/')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.refresh(token).status_code, 401)
+        self.assertEqual(self.refresh(UserRefreshToken.for_user(admin)).status_code, 200)
+
+
+@override_settings(EMPLOYEE_PASSWORD_ITERATIONS=1000)
+class LoginTests(TestCase):
+    """Test login lookup, password hasher cost and rate limiting"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.florist = UserFactory()
+        self.florist.set_password('florist-password')
+        self.florist.save()
+        self.customer = ClientFactory()
+
+    def tearDown(self):
+        cache.clear()
+
+    def login_employee(self, phone, password='florist-password'):
+        return self.client.post('/login/employee/', {'phone': phone, 'password': password}, format='json')
+
+    def test_login_query_count(self):
+        """
+        Test employee and client logins run one user lookup
+        :return: None
+        """
+
+        with self.assertNumQueries(1):
+            response = self.login_employee(self.florist.phone)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user_type'], 'florist')
+
+        with self.assertNumQueries(1):
+            response = self.client.post('/login/client/', {'phone': self.customer.phone}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_login_user_type(self):
+        """
+        Test clients can not log in as employees and employees as clients
+        :return: None
+        """
+
+        self.assertEqual(self.login_employee(self.customer.phone).status_code, 401)
+        self.assertEqual(self.login_employee(self.florist.phone, 'wrong-password').status_code, 401)
+        response = self.client.post('/login/client/', {'phone': self.florist.phone}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_inactive_user_login(self):
+        """
+        Test inactive employees and clients can not log in
+        :return: None
+        """
+
+        get_user_model().objects.filter(pk__in=[self.florist.pk, self.customer.pk]).update(is_active=False)
+
+        self.assertEqual(self.login_employee(self.florist.phone).status_code, 401)
+        response = self.client.post('/login/client/', {'phone': self.customer.phone}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_password_hasher_cost(self):
+        """
+        Test employee passwords are rehashed with changed cost on login
+        :return: None
+        """
+
+        self.assertIn('$1000$', self.florist.password)
+
+        with self.settings(EMPLOYEE_PASSWORD_ITERATIONS=2000):
+            self.assertEqual(self.login_employee(self.florist.phone).status_code, 200)
+
+        self.florist.refresh_from_db()
+        self.assertIn('$2000$', self.florist.password)
+        self.assertTrue(self.florist.check_password('florist-password'))
+
+    @mock.patch.object(PhoneLoginThrottle, 'THROTTLE_RATES', {'login': '2/min'})
+    def test_login_rate_limit(self):
+        """
+        Test login attempts are limited per phone
+        :return: None
+        """
+
+        self.assertEqual(self.login_employee(self.florist.phone, 'wrong-password').status_code, 401)
+        self.assertEqual(self.login_employee(self.florist.phone, 'wrong-password').status_code, 401)
+        self.assertEqual(self.login_employee(self.florist.phone).status_code, 429)
+
+        response = self.client.post('/login/client/', {'phone': self.customer.phone}, format='json')
+        self.assertEqual(response.status_code, 200)
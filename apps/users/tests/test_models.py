@@ -1,6 +1,8 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
+from core.constants import UserType
+
 
 class ModelsTests(TestCase):
     """Test models"""
@@ -66,7 +68,7 @@ class ModelsTests(TestCase):
 
         self.assertTrue(superuser.is_superuser)
         self.assertTrue(superuser.is_staff)
-        self.assertEqual(superuser.user_type, 'admin')
+        self.assertEqual(superuser.user_type, UserType.ADMIN)
 
     def test_models_str_method(self):
         """Test user model str method"""
@@ -0,0 +1,289 @@
+import datetime
+import io
+import os
+import tempfile
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from core.constants import OrderStatus, ProductSize, UserType
+from apps.order.models import Cart, CartProduct, Order
+from apps.order.services import settle_order
+from apps.product.models import Product
+from apps.product.tests.factory import ProductTypeFactory
+from apps.users.models import EmployeeProfile
+from apps.users.tests.factory import ShopBranchFactory, UserFactory
+
+
+class EmployeeProfileStatisticTests(TestCase):
+    """Test employee statistic counts, earnings and query count"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.shop_branch = ShopBranchFactory()
+        self.product_type = ProductTypeFactory(courier_allowance=5)
+        self.florist = UserFactory(shop_branch=self.shop_branch)
+        self.courier = UserFactory(user_type=UserType.COURIER, shop_branch=self.shop_branch)
+
+    def deliver_order(self, prices):
+        cart = Cart.objects.create()
+        for price in prices:
+            product = Product.objects.create(
+                name='Букет', description='Букет', price=price, price_without_allowance=price,
+                size=ProductSize.SMALL, product_type=self.product_type, florist=self.florist,
+            )
+            CartProduct.objects.create(cart=cart, product=product)
+        order = Order.objects.create(
+            cart=cart, address='Юнусалиева 123', received_date=datetime.date.today(),
+            received_time=datetime.time(12, 0), courier=self.courier, status=OrderStatus.COURIER_HAS_ORDER,
+        )
+        settle_order(order)
+        return order
+
+    def get_statistic(self, **params):
+        response = self.client.get('/statistic/employee/', params)
+        self.assertEqual(response.status_code, 200)
+        return {employee['user']['phone']: employee for employee in response.data}
+
+    def test_counts_and_earnings(self):
+        """
+        Test florist sold products, courier delivered orders and their earnings
+        :return: None
+        """
+
+        self.deliver_order([100, 200])
+        self.deliver_order([300])
+
+        statistic = self.get_statistic(period='day')
+
+        florist = statistic[self.florist.phone]
+        self.assertEqual(florist['orders_quantity'], 3)
+        self.assertEqual(Decimal(florist['earnings']), Decimal('60'))
+        self.assertEqual(florist['earnings_by_period'], [
+            {'period': datetime.date.today(), 'earnings': Decimal('60')}
+        ])
+        courier = statistic[self.courier.phone]
+        self.assertEqual(courier['orders_quantity'], 2)
+        self.assertEqual(Decimal(courier['earnings']), Decimal('30'))
+        self.assertEqual(courier['user']['shop_branch']['title'], self.shop_branch.title)
+
+    def test_earnings_of_product_in_other_cart(self):
+        """
+        Test sold product left in cart of other client is counted once
+        :return: None
+        """
+
+        order = self.deliver_order([100])
+        CartProduct.objects.create(cart=Cart.objects.create(), product=order.cart.cartproduct_set.get().product)
+
+        florist = self.get_statistic(period='day')[self.florist.phone]
+        self.assertEqual(Decimal(florist['earnings']), Decimal('10'))
+        self.assertEqual(florist['earnings_by_period'], [
+            {'period': datetime.date.today(), 'earnings': Decimal('10')}
+        ])
+
+    def test_earnings_outside_date_range(self):
+        """
+        Test earnings outside date range are not counted
+        :return: None
+        """
+
+        self.deliver_order([100])
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+
+        statistic = self.get_statistic(date_from=tomorrow, date_to=tomorrow)
+
+        self.assertEqual(statistic[self.florist.phone]['orders_quantity'], 1)
+        self.assertEqual(Decimal(statistic[self.florist.phone]['earnings']), 0)
+        self.assertEqual(statistic[self.florist.phone]['earnings_by_period'], [])
+
+    def test_query_count(self):
+        """
+        Test statistic runs a fixed number of queries whatever employees quantity
+        :return: None
+        """
+
+        self.deliver_order([100])
+        with self.assertNumQueries(3):
+            self.get_statistic()
+
+        UserFactory.create_batch(20, shop_branch=self.shop_branch)
+        UserFactory.create_batch(20, user_type=UserType.COURIER, shop_branch=self.shop_branch)
+        with self.assertNumQueries(3):
+            statistic = self.get_statistic()
+        self.assertEqual(len(statistic), 42)
+
+
+@override_settings(EMPLOYEE_PASSWORD_ITERATIONS=1000)
+class EmployeeProfileTests(TestCase):
+    """Test employee registration and profile update writes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.shop_branch = ShopBranchFactory()
+        self.superuser = get_user_model().objects.create_superuser('admin', '0555000000', 'admin-password')
+        self.client.force_authenticate(self.superuser)
+
+    def register_employee(self, phone):
+        response = self.client.post('/sign-up/employee/', {
+            'username': 'florist', 'phone': phone, 'password': 'florist-password',
+            'user_type': 'florist', 'shop_branch': self.shop_branch.pk,
+        })
+        self.assertEqual(response.status_code, 201)
+        return EmployeeProfile.objects.select_related('user').get(user__phone=phone)
+
+    def test_register_query_count(self):
+        """
+        Test registration inserts user and profile once each, last query reads them back
+        :return: None
+        """
+
+        with self.assertNumQueries(5):
+            profile = self.register_employee('0555000001')
+        self.assertTrue(profile.user.check_password('florist-password'))
+
+    def test_update_profile_query_count(self):
+        """
+        Test profile update writes only changed rows and keeps password
+        :return: None
+        """
+
+        profile = self.register_employee('0555000001')
+        url = f'/employee-profile/{profile.pk}/'
+
+        with self.assertNumQueries(4):
+            response = self.client.patch(url, {'comment': 'Стажер'}, format='json')
+        self.assertEqual(response.data['comment'], 'Стажер')
+
+        with self.assertNumQueries(3):
+            self.client.patch(url, {'comment': 'Стажер'}, format='json')
+
+        with self.assertNumQueries(4):
+            self.client.patch(url, {'user': {'password': 'new-password'}}, format='json')
+
+        profile.refresh_from_db()
+        profile.user.refresh_from_db()
+        self.assertEqual(profile.comment, 'Стажер')
+        self.assertTrue(profile.user.check_password('new-password'))
+
+    def test_bulk_create_users(self):
+        """
+        Test bulk created employees get profiles with one insert
+        :return: None
+        """
+
+        users = [
+            get_user_model()(username=f'user {i}', phone=f'05550001{i:02}', user_type=user_type)
+            for i, user_type in enumerate([UserType.FLORIST, UserType.COURIER, UserType.CLIENT])
+        ]
+        with self.assertNumQueries(2 if connection.features.can_return_rows_from_bulk_insert else 3):
+            users = get_user_model().objects.bulk_create_users(users)
+
+        self.assertEqual(
+            set(EmployeeProfile.objects.filter(user__in=users).values_list('user__phone', flat=True)),
+            {users[0].phone, users[1].phone},
+        )
+
+
+@override_settings(EMPLOYEE_PASSWORD_ITERATIONS=1000)
+class BulkEmployeeRegistrationTests(TestCase):
+    """Test bulk employee onboarding endpoint and command"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.shop_branch = ShopBranchFactory()
+        self.new_shop_branch = ShopBranchFactory(title='Ахунбаева 1', address='Ахунбаева 1')
+        self.superuser = get_user_model().objects.create_superuser('admin', '0555000000', 'admin-password')
+        self.client.force_authenticate(self.superuser)
+
+    @staticmethod
+    def get_row(i, user_type='florist', **kwargs):
+        return {'username': f'employee {i}', 'phone': f'05551000{i:02}', 'password': f'password-{i}',
+                'user_type': user_type, **kwargs}
+
+    def register(self, employees, **data):
+        return self.client.post('/sign-up/employee/bulk/', {'employees': employees, **data}, format='json')
+
+    def test_row_results(self):
+        """
+        Test valid rows are created with profiles and invalid rows get errors
+        :return: None
+        """
+
+        response = self.register([
+            self.get_row(1),
+            self.get_row(2, 'courier', shop_branch=self.shop_branch.pk),
+            self.get_row(3, 'client'),
+            {**self.get_row(4), 'phone': self.superuser.phone},
+            {**self.get_row(5), 'phone': '0555100001'},
+            self.get_row(6, shop_branch=0),
+        ], shop_branch=self.new_shop_branch.pk)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        results = response.data['results']
+        self.assertEqual([result['row'] for result in results], [1, 2, 3, 4, 5, 6])
+        self.assertEqual([list(result.get('errors', {})) for result in results],
+                         [[], [], ['user_type'], ['phone'], ['phone'], ['shop_branch']])
+
+        florist = get_user_model().objects.get(pk=results[0]['id'])
+        self.assertTrue(florist.check_password('password-1'))
+        self.assertEqual(florist.shop_branch, self.new_shop_branch)
+        self.assertEqual(florist.user_type, UserType.FLORIST)
+        courier = get_user_model().objects.get(pk=results[1]['id'])
+        self.assertEqual(courier.shop_branch, self.shop_branch)
+        self.assertEqual(EmployeeProfile.objects.filter(user__in=[florist, courier]).count(), 2)
+
+    def test_query_count(self):
+        """
+        Test onboarding runs a fixed number of queries whatever rows quantity
+        :return: None
+        """
+
+        with CaptureQueriesContext(connection) as few:
+            response = self.register([self.get_row(i) for i in range(3)])
+        self.assertEqual(response.data['created'], 3)
+
+        with CaptureQueriesContext(connection) as many:
+            response = self.register([self.get_row(i) for i in range(10, 40)])
+        self.assertEqual(response.data['created'], 30)
+        self.assertEqual(len(few), len(many))
+
+    def test_nothing_created(self):
+        """
+        Test batch without valid rows returns 400 and non superuser is forbidden
+        :return: None
+        """
+
+        response = self.register([self.get_row(1, 'client')])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], 0)
+
+        self.client.force_authenticate(UserFactory())
+        self.assertEqual(self.register([self.get_row(1)]).status_code, 403)
+
+    def test_command(self):
+        """
+        Test command registers employees from CSV file
+        :return: None
+        """
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'employees.csv')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write('username,phone,password,user_type,shop_branch\n')
+                file.write(f'florist,0555100001,password-1,florist,{self.shop_branch.pk}\n')
+                file.write('courier,0555100002,password-2,courier,\n')
+                file.write('client,0555100003,password-3,client,\n')
+            stdout, stderr = io.StringIO(), io.StringIO()
+            call_command('onboard_employees', path, shop_branch=self.new_shop_branch.pk, stdout=stdout, stderr=stderr)
+
+        self.assertIn('Registered 2 of 3 employees', stdout.getvalue())
+        self.assertIn('Row 3', stderr.getvalue())
+        users = get_user_model().objects.filter(phone__in=['0555100001', '0555100002']).order_by('phone')
+        self.assertEqual([user.shop_branch for user in users], [self.shop_branch, self.new_shop_branch])
@@ -0,0 +1,14 @@
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class PhoneLoginThrottle(SimpleRateThrottle):
+    """Limit login attempts per phone, attempts history is kept in cache"""
+
+    scope = 'login'
+
+    def get_cache_key(self, request, view):
+        phone = request.data.get('phone') if hasattr(request.data, 'get') else None
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': phone if phone else self.get_ident(request),
+        }
@@ -0,0 +1,45 @@
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.users.models import User
+
+USER_CLAIMS = ('user_type', 'is_superuser', 'shop_branch_id', 'is_active', 'claims_version')
+
+
+class UserRefreshToken(RefreshToken):
+    """Refresh token carrying user role claims, copied to its access tokens"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+
+def is_token_revoked(validated_token):
+    """
+    Check whether user claims changed after token was issued with one
+    lookup on primary key, user row itself is not loaded
+    :param validated_token: validated token
+    :return: bool
+    """
+
+    return not User.objects.filter(
+        pk=validated_token[api_settings.USER_ID_CLAIM], claims_version=validated_token['claims_version'],
+    ).exists()
+
+
+def get_token_user(validated_token):
+    """
+    Build user from token claims without database query. Fields missing
+    in claims are deferred, so they are loaded only when they are read
+    :param validated_token: validated access token
+    :return: User
+    """
+
+    values = {claim: validated_token[claim] for claim in USER_CLAIMS}
+    values['id'] = validated_token[api_settings.USER_ID_CLAIM]
+    field_names = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+    return User.from_db(DEFAULT_DB_ALIAS, field_names, [values[field_name] for field_name in field_names])
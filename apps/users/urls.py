@@ -1,9 +1,11 @@
 from django.urls import path, include
 
 from rest_framework.routers import DefaultRouter
+from rest_framework_simplejwt.views import TokenRefreshView
 
 from apps.users.views import (
     RegisterEmployeeView,
+    BulkRegisterEmployeeView,
     RegisterClientView,
     LoginEmployeeView,
     LoginClientView,
@@ -12,7 +14,7 @@ from apps.users.views import (
     EmployeeProfileStatisticView,
 
 )
-
+from apps.users.serializers import UserTokenRefreshSerializer
 
 app_name = "apps.users"
 
@@ -25,11 +27,13 @@ router2.register('', ShopBranchView)
 urlpatterns = [
     path('employee-profile/', include(router.urls)),
     path('shop-branch/', include(router2.urls)),
+    path("sign-up/employee/bulk/", BulkRegisterEmployeeView.as_view(), name="create_employees"),
     path("sign-up/employee/", RegisterEmployeeView.as_view(), name="create_employee"),
     path("sign-up/client/", RegisterClientView.as_view(), name="create_client"),
     path("login/employee/", LoginEmployeeView.as_view(), name="login_employee"),
     path("login/client/", LoginClientView.as_view(), name="login_client"),
     path("statistic/employee/", EmployeeProfileStatisticView.as_view(), name="employee_statistic"),
-    path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("api/token/refresh/", TokenRefreshView.as_view(serializer_class=UserTokenRefreshSerializer),
+         name="token_refresh"),
 
 ]
@@ -1,15 +1,16 @@
-from django.db.models import Q
-from django_filters.rest_framework import DjangoFilterBackend
-
 from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import AllowAny
 from rest_framework.generics import CreateAPIView
+from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
 from rest_framework import mixins, status
 
+from core.constants import UserType
+from core.filters import DjangoFilterBackend
+from core.pagination import KeysetPagination
+from apps.statistic.serializers import StatisticParamsSerializer
+from apps.statistic.services import annotate_employee_statistic, get_employee_earnings
 from apps.users.permissions import (
     IsSuperUser,
     IsSuperUserOrAdminReadOnly,
@@ -19,9 +20,13 @@ from apps.users.models import (
     EmployeeProfile,
     ShopBranch,
 )
+from apps.users.services import login_client, login_employee, onboard_employees
+from apps.users.throttling import PhoneLoginThrottle
+from apps.users.tokens import UserRefreshToken
 from apps.users.serializers import (
     RegisterClientSerializer,
     RegisterEmployeeSerializer,
+    BulkEmployeeSerializer,
     LoginEmployeeSerializer,
     LoginClientSerializer,
     EmployeeProfileSerializer,
@@ -38,6 +43,23 @@ class RegisterEmployeeView(CreateAPIView):
     queryset = User.objects.all()
 
 
+class BulkRegisterEmployeeView(APIView):
+    """
+    Bulk employee registration view, creates every valid row in one
+    transaction and reports id or errors of every row
+    """
+
+    permission_classes = (IsSuperUser,)
+
+    def post(self, request):
+        serializer = BulkEmployeeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = onboard_employees(
+            serializer.validated_data['employees'], serializer.validated_data.get('shop_branch')
+        )
+        return Response(result, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_400_BAD_REQUEST)
+
+
 class RegisterClientView(CreateAPIView):
     """Register client view"""
 
@@ -51,23 +73,14 @@ class LoginEmployeeView(CreateAPIView):
 
     serializer_class = LoginEmployeeSerializer
     permission_classes = (AllowAny,)
+    throttle_classes = (PhoneLoginThrottle,)
 
     def post(self, request, *args, **kwargs):
-        phone = request.data["phone"]
-        password = request.data["password"]
-
-        user = User.objects.filter(Q(phone=phone, user_type='florist') | Q(phone=phone, user_type='courier')
-                                   | Q(phone=phone, user_type='admin') | Q(phone=phone, is_superuser=True)).first()
+        user = login_employee(request.data["phone"], request.data["password"])
 
-        if user is None:
-            raise AuthenticationFailed("User not found!")
-
-        if not user.check_password(password):
-            raise AuthenticationFailed("Incorrect password!")
-
-        refresh = RefreshToken.for_user(user)
+        refresh = UserRefreshToken.for_user(user)
         is_superuser = user.is_superuser
-        user_type = user.user_type
+        user_type = user.get_user_type_display()
 
         return Response(
             {
@@ -85,15 +98,12 @@ class LoginClientView(CreateAPIView):
 
     serializer_class = LoginClientSerializer
     permission_classes = (AllowAny,)
+    throttle_classes = (PhoneLoginThrottle,)
 
     def post(self, request, *args, **kwargs):
-        phone = request.data["phone"]
-        user = User.objects.filter(phone=phone, user_type='client').first()
+        user = login_client(request.data["phone"])
 
-        if user is None:
-            raise AuthenticationFailed("User not found!")
-
-        refresh = RefreshToken.for_user(user)
+        refresh = UserRefreshToken.for_user(user)
 
         return Response(
             {
@@ -114,6 +124,8 @@ class EmployeeProfileView(mixins.RetrieveModelMixin,
     serializer_class = EmployeeProfileSerializer
     queryset = EmployeeProfile.objects.all().order_by('id')
     permission_classes = (IsSuperUserOrAdminReadOnly, )
+    pagination_class = KeysetPagination
+    ordering = ('id',)
     filter_backends = [DjangoFilterBackend]
     filter_fields = ['user__user_type', 'user__is_active', 'user__shop_branch__title', 'user__username', 'user__phone']
 
@@ -125,9 +137,6 @@ class EmployeeProfileView(mixins.RetrieveModelMixin,
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         if serializer.is_valid():
             serializer.save()
-            if instance.user:
-                instance.user.set_password(instance.user.password)
-                instance.user.save()
             return Response(serializer.data)
         return Response(serializer.errors)
 
@@ -148,9 +157,37 @@ class ShopBranchView(ModelViewSet):
 
 
 class EmployeeProfileStatisticView(ListAPIView):
-    """Employee profile statistic view"""
+    """
+    Employee profile statistic view.
+    Accepts date_from, date_to, period (day, week, month, year) and
+    shop_branch params, earnings are counted inside date range
+    """
 
-    queryset = EmployeeProfile.objects.filter(Q(user__user_type='florist') | Q(user__user_type='courier'))
+    queryset = EmployeeProfile.objects.filter(user__user_type__in=[UserType.FLORIST, UserType.COURIER]).order_by('id')
     serializer_class = EmployeeProfileStatisticSerializer
     filter_backends = [DjangoFilterBackend, ]
     filter_fields = ['user__user_type', ]
+    earnings_by_period = None
+
+    def list(self, request, *args, **kwargs):
+        params = StatisticParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        params = params.validated_data
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if 'shop_branch' in params:
+            queryset = queryset.filter(user__shop_branch=params['shop_branch'])
+        employees = list(annotate_employee_statistic(queryset, params['date_from'], params['date_to']))
+        self.earnings_by_period = get_employee_earnings(
+            [employee.user_id for employee in employees], params['date_from'], params['date_to'], params['period']
+        )
+
+        serializer = self.get_serializer(employees, many=True)
+        return Response(serializer.data)
+
+    def get_serializer_context(self):
+        """Pass earnings by period of listed employees to serializer"""
+
+        context = super().get_serializer_context()
+        context['earnings_by_period'] = self.earnings_by_period or {}
+        return context
@@ -0,0 +1,62 @@
+from django.db import models
+
+
+class LabelChoices(models.IntegerChoices):
+    """Integer choices stored in database and shown to API clients by label"""
+
+    @classmethod
+    def from_label(cls, label):
+        """
+        Find choice by label or by its integer value
+        :param label: str
+        :return: choice member
+        """
+
+        for member in cls:
+            if member.label == label or str(member.value) == str(label):
+                return member
+        raise ValueError(f'{label!r} is not a valid {cls.__name__}')
+
+
+class UserType(LabelChoices):
+    CLIENT = 1, 'client'
+    FLORIST = 2, 'florist'
+    COURIER = 3, 'courier'
+    ADMIN = 4, 'admin'
+
+
+class ProductStatus(LabelChoices):
+    ON_SALE = 1, 'На продаже'
+    SOLD = 2, 'Продан'
+    IN_DELIVERY = 3, 'В процессе доставки'
+    DELETED = 4, 'Удален'
+
+
+class ProductSize(LabelChoices):
+    SMALL = 1, 'Маленький'
+    MEDIUM = 2, 'Средний'
+    LARGE = 3, 'Большой'
+
+
+class ProductFreshness(LabelChoices):
+    BLOOMING = 1, 'Цветущий'
+    WILTED = 2, 'Увядший'
+
+
+class FlowerMovementType(LabelChoices):
+    RESERVE = 1, 'Резерв'
+    RELEASE = 2, 'Снятие резерва'
+    CONSUME = 3, 'Продажа'
+    RECEIPT = 4, 'Поступление'
+    WRITE_OFF = 5, 'Списание'
+
+
+class OrderStatus(LabelChoices):
+    UNDER_REVIEW = 1, 'На рассмотрении'
+    WAITING_FOR_COURIER = 2, 'В ожидании курьера'
+    COURIER_ACCEPTED = 3, 'Курьер принял заказ'
+    COURIER_ON_THE_WAY = 4, 'Курьер едет к нам'
+    COURIER_HAS_ORDER = 5, 'Заказ у курьера'
+    IN_TRANSIT = 6, 'Ваш заказ в пути'
+    DELIVERED = 7, 'Доставлено'
+    CANCELED = 8, 'Отменен'
@@ -0,0 +1,25 @@
+from rest_framework import serializers
+
+
+class LabelChoiceField(serializers.ChoiceField):
+    """
+    Choice field reading and writing choice labels, so integer coded
+    choices keep their text values in API
+    """
+
+    def __init__(self, choices, **kwargs):
+        super().__init__(choices, **kwargs)
+        self.label_to_value = {str(label): value for value, label in self.choices.items()}
+
+    def to_internal_value(self, data):
+        if data == '' and self.allow_blank:
+            return ''
+        try:
+            return self.label_to_value[str(data)]
+        except KeyError:
+            return super().to_internal_value(data)
+
+    def to_representation(self, value):
+        if value in ('', None):
+            return value
+        return self.choices.get(value, value)
@@ -0,0 +1,41 @@
+from django.db import models
+from django_filters import rest_framework as filters
+
+
+class LabelChoiceFilter(filters.ChoiceFilter):
+    """Filter integer coded choices by their labels"""
+
+    def __init__(self, *args, choices=(), **kwargs):
+        self.label_to_value = {str(label): value for value, label in choices}
+        super().__init__(*args, choices=[(label, label) for label in self.label_to_value], **kwargs)
+
+    def filter(self, qs, value):
+        return super().filter(qs, self.label_to_value.get(value, value))
+
+
+class LabelMultipleChoiceFilter(filters.MultipleChoiceFilter):
+    """Filter integer coded choices by one or more of their labels"""
+
+    def __init__(self, *args, choices=(), **kwargs):
+        self.label_to_value = {str(label): value for value, label in choices}
+        super().__init__(*args, choices=[(label, label) for label in self.label_to_value], **kwargs)
+
+    def filter(self, qs, value):
+        return super().filter(qs, [self.label_to_value.get(label, label) for label in value])
+
+
+class FilterSet(filters.FilterSet):
+    """FilterSet taking choice labels for integer coded choice fields"""
+
+    @classmethod
+    def filter_for_lookup(cls, field, lookup_type):
+        filter_class, params = super().filter_for_lookup(field, lookup_type)
+        if filter_class is filters.ChoiceFilter and isinstance(field, models.IntegerField):
+            return LabelChoiceFilter, params
+        return filter_class, params
+
+
+class DjangoFilterBackend(filters.DjangoFilterBackend):
+    """DjangoFilterBackend building filter_fields FilterSets from FilterSet above"""
+
+    filterset_base = FilterSet
@@ -0,0 +1,163 @@
+import hashlib
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.utils.module_loading import import_string
+
+from rest_framework import serializers
+from rest_framework.response import Response
+
+
+def get_nested_serializer(field):
+    """
+    Return serializer class used to present related field
+    :param field: serializer field
+    :return: serializer class or None
+    """
+
+    if isinstance(field, serializers.ListSerializer):
+        return field.child.__class__
+    if isinstance(field, serializers.BaseSerializer):
+        return field.__class__
+    presentation_serializer = getattr(field, 'presentation_serializer', None)
+    if isinstance(presentation_serializer, str):
+        presentation_serializer = import_string(presentation_serializer)
+    return presentation_serializer
+
+
+def get_related_lookups(serializer_class, model=None, prefix='', prefetch=False):
+    """
+    Walk serializer tree and collect relations it renders
+    :param serializer_class: ModelSerializer class
+    :param model: model rendered by serializer_class
+    :param prefix: str, lookup of parent relation
+    :param prefetch: bool, parent relation is already prefetched
+    :return: tuple of select_related and prefetch_related lookups
+    """
+
+    model = model or serializer_class.Meta.model
+    select_related = []
+    prefetch_related = []
+
+    for field_name, field in serializer_class._declared_fields.items():
+        nested_serializer = get_nested_serializer(field)
+        if nested_serializer is None:
+            if not isinstance(field, serializers.RelatedField) or field.use_pk_only_optimization():
+                continue
+
+        source = field.source or field_name
+        try:
+            model_field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            continue
+        if not model_field.is_relation:
+            continue
+
+        lookup = prefix + source
+        many = model_field.one_to_many or model_field.many_to_many
+        if prefetch or many:
+            prefetch_related.append(lookup)
+        else:
+            select_related.append(lookup)
+
+        if nested_serializer is not None and hasattr(nested_serializer, 'Meta'):
+            nested_select_related, nested_prefetch_related = get_related_lookups(
+                nested_serializer, model_field.related_model, lookup + '__', prefetch or many
+            )
+            select_related += nested_select_related
+            prefetch_related += nested_prefetch_related
+
+    return select_related, prefetch_related
+
+
+class EagerLoadingMixin:
+    """
+    Join or prefetch every relation rendered by view serializer
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        return self.setup_eager_loading(queryset)
+
+    def setup_eager_loading(self, queryset):
+        select_related, prefetch_related = get_related_lookups(self.get_serializer_class(), queryset.model)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
+
+
+def get_not_modified_response(request, etag, last_modified=None):
+    """
+    Return 304 response when request preconditions match ETag or Last-Modified
+    :param request: Request
+    :param etag: str, quoted ETag
+    :param last_modified: int timestamp or None
+    :return: HttpResponseNotModified or None
+    """
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+class ConditionalListMixin:
+    """
+    Answer list requests with strong ETag and Last-Modified built from
+    update stamps and ids of listed page rows, unchanged pages return 304
+    before prefetching and serializing
+    """
+
+    last_modified_field = 'update_datetime'
+
+    def get_etag_seed(self):
+        return self.request.user.pk
+
+    def get_list_stamp(self, rows):
+        """
+        Build ETag and Last-Modified of listed rows without extra queries
+        :param rows: list of model instances
+        :return: tuple, quoted ETag and int timestamp or None
+        """
+
+        stamps = [getattr(row, self.last_modified_field) for row in rows]
+        last_modified = max(stamps, default=None)
+        seed = ':'.join([
+            self.request.get_full_path(), str(self.get_etag_seed()), str(last_modified),
+            ','.join(str(row.pk) for row in rows),
+        ])
+        if last_modified is not None:
+            if timezone.is_naive(last_modified):
+                last_modified = timezone.make_aware(last_modified)
+            last_modified = int(last_modified.timestamp())
+        return quote_etag(hashlib.md5(seed.encode('utf-8')).hexdigest()), last_modified
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        prefetch_lookups = queryset._prefetch_related_lookups
+        queryset = queryset.prefetch_related(None)
+
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else list(queryset)
+        etag, last_modified = self.get_list_stamp(rows)
+        response = get_not_modified_response(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        prefetch_related_objects(rows, *prefetch_lookups)
+        serializer = self.get_serializer(rows, many=True)
+        if page is not None:
+            response = self.get_paginated_response(serializer.data)
+        else:
+            response = Response(serializer.data)
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
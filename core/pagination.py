@@ -0,0 +1,135 @@
+import base64
+import datetime
+import decimal
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination by the whole ordering tuple, e.g. (creation_date, id).
+
+    Unlike CursorPagination it keeps no offset inside the cursor, so every
+    page starts an index scan at the cursor position whatever its depth.
+    """
+
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.position, self.reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [self.invert_ordering(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(ordering, self.position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_following = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = self.position is not None
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = self.position is not None
+
+        self.display_page_controls = self.has_next or self.has_previous
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        """Take ordering from view ordering attribute, last field must be unique"""
+
+        ordering = getattr(view, 'ordering', None) or self.ordering
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
+
+    @staticmethod
+    def invert_ordering(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def get_keyset_filter(ordering, position):
+        """
+        Build keyset condition (a, b) > (x, y) as
+        a >= x AND ((a > x) OR (a = x AND b > y)). Leading bound is an index
+        range condition, the OR only filters rows equal to x
+        :param ordering: tuple of ordering fields
+        :param position: list of ordering field values of the last seen row
+        :return: Q
+        """
+
+        def get_lookup(field, inclusive=False):
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            return f'{field.lstrip("-")}__{lookup}{"e" if inclusive else ""}'
+
+        condition = Q()
+        for index, field in enumerate(ordering):
+            field_condition = Q(**{get_lookup(field): position[index]})
+            for previous_field, value in zip(ordering[:index], position):
+                field_condition &= Q(**{previous_field.lstrip('-'): value})
+            condition |= field_condition
+        if len(ordering) > 1:
+            condition &= Q(**{get_lookup(ordering[0], inclusive=True): position[0]})
+        return condition
+
+    def get_position(self, instance):
+        position = []
+        for field in self.ordering:
+            value = getattr(instance, field.lstrip('-'))
+            if isinstance(value, (datetime.date, datetime.time)):
+                value = value.isoformat()
+            elif isinstance(value, decimal.Decimal):
+                value = str(value)
+            position.append(value)
+        return position
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.get_position(self.page[0]), reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            position = cursor['p']
+            reverse = bool(cursor.get('r'))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, position, reverse=False):
+        cursor = {'p': position}
+        if reverse:
+            cursor['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
@@ -54,6 +54,7 @@ INSTALLED_APPS = [
     'apps.users',
     'apps.product',
     'apps.order',
+    'apps.statistic',
 ]
 
 MIDDLEWARE = [
@@ -105,6 +106,19 @@ DATABASES = {
 db_from_env = dj_database_url.config(conn_max_age=500)
 DATABASES['default'].update(db_from_env)
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": config("CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": config("CACHE_LOCATION", default=""),
+    },
+}
+
+# Seconds a cached catalogue response lives, product changes drop it earlier, 0 disables the cache
+CATALOGUE_CACHE_TIMEOUT = config("CATALOGUE_CACHE_TIMEOUT", default=300, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -123,6 +137,17 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+PASSWORD_HASHERS = [
+    "apps.users.hashers.EmployeePasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+]
+
+# PBKDF2 iterations of employee passwords, changed cost applies on next login
+EMPLOYEE_PASSWORD_ITERATIONS = config("EMPLOYEE_PASSWORD_ITERATIONS", default=260000, cast=int)
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.0/topics/i18n/
 
@@ -150,13 +175,16 @@ AUTH_USER_MODEL = "users.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.users.authentication.JWTClaimsAuthentication",
         "rest_framework.authentication.BasicAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
     'DEFAULT_FILTER_BACKENDS': [
-        'django_filters.rest_framework.DjangoFilterBackend'
+        'core.filters.DjangoFilterBackend'
     ],
+    'DEFAULT_THROTTLE_RATES': {
+        'login': config("LOGIN_THROTTLE_RATE", default="10/min"),
+    },
     # 'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     # 'PAGE_SIZE': 14
 }
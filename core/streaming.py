@@ -0,0 +1,183 @@
+import codecs
+import csv
+import datetime
+import decimal
+import json
+import re
+import zipfile
+from itertools import chain, islice
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+
+EXPORT_CHUNK_SIZE = 2000
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+XLSX_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+XLSX_SHEET_TAIL = '</sheetData></worksheet>'
+XML_ILLEGAL_CHARACTERS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def iter_chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Echo:
+    """File-like object returning written value, lets csv.writer yield lines"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_jsonl(header, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(header, row)), ensure_ascii=False, default=str) + '\n'
+
+
+class ZipBuffer:
+    """Write-only file collecting zip archive bytes until they are drained"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, value):
+        self.chunks.append(bytes(value))
+        return len(value)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        value = b''.join(self.chunks)
+        self.chunks = []
+        return value
+
+
+def get_xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, (int, float, decimal.Decimal)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    if isinstance(value, (datetime.date, datetime.time)):
+        value = value.isoformat()
+    value = escape(XML_ILLEGAL_CHARACTERS.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t>{value}</t></is></c>'
+
+
+def iter_xlsx(header, rows):
+    """
+    Stream rows as single sheet XLSX workbook, sheet XML is deflated and
+    yielded chunk by chunk with inline strings, so nothing is kept in memory
+    :param header: tuple of column names
+    :param rows: iterable of row tuples
+    :return: generator of bytes
+    """
+
+    buffer = ZipBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(XLSX_SHEET_HEAD.encode('utf-8'))
+            for chunk in iter_chunks(chain([header], rows), EXPORT_CHUNK_SIZE):
+                sheet.write(''.join(
+                    f'<row>{"".join(get_xlsx_cell(value) for value in row)}</row>' for row in chunk
+                ).encode('utf-8'))
+                yield buffer.drain()
+            sheet.write(XLSX_SHEET_TAIL.encode('utf-8'))
+    yield buffer.drain()
+
+
+STREAM_FORMATS = {
+    'csv': (iter_csv, 'text/csv; charset=utf-8'),
+    'jsonl': (iter_jsonl, 'application/x-ndjson; charset=utf-8'),
+    'xlsx': (iter_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+def get_streaming_response(header, rows, file_format, filename):
+    """
+    Stream rows as CSV, JSON lines or XLSX file without holding them in memory
+    :param header: tuple of column names
+    :param rows: iterable of row tuples
+    :param file_format: str, csv, jsonl or xlsx
+    :param filename: str, file name without extension
+    :return: StreamingHttpResponse
+    """
+
+    iter_rows, content_type = STREAM_FORMATS[file_format]
+    response = StreamingHttpResponse(iter_rows(header, rows), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{file_format}"'
+    return response
+
+
+def read_rows(file, file_format):
+    """
+    Read uploaded CSV or JSON lines file row by row.
+    JSON lines which are not objects are yielded as None
+    :param file: binary file-like object
+    :param file_format: str, csv or jsonl
+    :return: generator of dicts
+    """
+
+    lines = codecs.iterdecode(file, 'utf-8-sig')
+    if file_format == 'csv':
+        yield from csv.DictReader(lines)
+        return
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row if isinstance(row, dict) else None
@@ -36,4 +36,5 @@ urlpatterns = [
     path("", include("apps.users.urls")),
     path("", include("apps.product.urls")),
     path("", include("apps.order.urls")),
+    path("", include("apps.statistic.urls")),
 ]